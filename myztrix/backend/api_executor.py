@@ -0,0 +1,164 @@
+import time
+import random
+import socket
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+# Quota cost of each method, in the units Google publishes for the per-user limits.
+# https://developers.google.com/gmail/api/reference/quota
+QUOTA_UNITS = {
+    'gmail.users.getProfile': 1,
+    'gmail.users.history.list': 2,
+    'gmail.users.labels.list': 1,
+    'gmail.users.labels.create': 5,
+    'gmail.users.messages.list': 5,
+    'gmail.users.messages.get': 5,
+    'gmail.users.messages.modify': 5,
+    'gmail.users.messages.batchModify': 50,
+    'calendar.events.insert': 1,
+    'calendar.events.list': 1,
+}
+DEFAULT_UNITS = {'gmail': 5, 'calendar': 1}
+
+# Per-user budgets: Gmail allows 250 units/second, Calendar roughly 600 requests/minute
+QUOTA_RATES = {'gmail': 250.0, 'calendar': 10.0}
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+
+def quota_units(method_id: str) -> int:
+    """Quota cost of a discovery method id such as 'gmail.users.messages.get'."""
+    return QUOTA_UNITS.get(method_id, DEFAULT_UNITS.get(method_id.split('.')[0], 1))
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` units per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, units: float) -> float:
+        """Take `units` tokens and return how many seconds the caller must wait before using them."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= units
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, units: float) -> None:
+        delay = self.reserve(units)
+        if delay:
+            time.sleep(delay)
+
+
+def retry_after_seconds(error: HttpError) -> Optional[float]:
+    value = error.resp.get('retry-after') if error.resp is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ConnectionError, socket.timeout)):
+        return True
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status in RETRYABLE_STATUSES:
+        return True
+    if error.resp.status == 403:
+        return any(detail.get('reason') in RATE_LIMIT_REASONS
+                   for detail in error.error_details or [] if isinstance(detail, dict))
+    return False
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 32.0) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RequestExecutor:
+    """
+    Runs googleapiclient requests under per-API quota buckets, retrying
+    rate-limit and server errors with jittered exponential backoff and
+    honouring Retry-After. Counters are exposed through stats().
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 32.0):
+        self.buckets = {api: TokenBucket(rate) for api, rate in (rates or QUOTA_RATES).items()}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.units = Counter()
+        self.throttled = Counter()
+        self.retries = Counter()
+        self.failures = Counter()
+
+    def reserve(self, method_id: str, calls: int = 1) -> float:
+        """Charge `calls` invocations of method_id and return the wait in seconds."""
+        units = quota_units(method_id) * calls
+        self.units[method_id] += units
+        bucket = self.buckets.get(method_id.split('.')[0])
+        return bucket.reserve(units) if bucket else 0.0
+
+    def acquire(self, method_id: str, calls: int = 1) -> None:
+        delay = self.reserve(method_id, calls)
+        if delay:
+            time.sleep(delay)
+
+    def retry_delay(self, method_id: str, error: Exception, attempt: int) -> Optional[float]:
+        """Record a failed attempt; return how long to wait before retrying, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            self.failures[method_id] += 1
+            return None
+
+        self.retries[method_id] += 1
+        retry_after = retry_after_seconds(error) if isinstance(error, HttpError) else None
+        if isinstance(error, HttpError) and error.resp.status in (403, 429):
+            self.throttled[method_id] += 1
+        return retry_after if retry_after is not None else backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    def execute(self, request, method_id: Optional[str] = None):
+        """Execute a googleapiclient HttpRequest, retrying transient failures."""
+        method_id = method_id or getattr(request, 'methodId', None) or 'unknown'
+        attempt = 0
+        while True:
+            self.acquire(method_id)
+            try:
+                return request.execute()
+            except (HttpError, ConnectionError, socket.timeout) as e:
+                delay = self.retry_delay(method_id, e, attempt)
+                if delay is None:
+                    raise
+                logger.warning(f"{method_id} failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            'units': dict(self.units),
+            'throttled': dict(self.throttled),
+            'retries': dict(self.retries),
+            'failures': dict(self.failures),
+        }
+
+
+# Shared by every module so the quota buckets reflect the whole process
+executor = RequestExecutor()
+
+
+def execute(request, method_id: Optional[str] = None):
+    return executor.execute(request, method_id)
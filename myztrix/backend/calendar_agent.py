@@ -1,15 +1,16 @@
 import os
+import sys
 import json
 import logging
 from datetime import datetime
 from flask import Flask, jsonify, request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
 import getpass
 from pathlib import Path
 import subprocess
-import tzlocal
+
+
+from calendar_batch import batch_insert_events, event_time
+from google_services import services
 
 # === PATHS and CONFIG ===
 BASE_DIR = Path.home() / "myztrix" / "backend"
@@ -99,23 +100,13 @@ def authenticate():
     if not TOKEN_PATH.exists():
         raise FileNotFoundError("Missing token.json. Run OAuth flow first.")
 
-    with open(TOKEN_PATH, 'r') as f:
-        creds = Credentials.from_authorized_user_info(json.load(f), scopes=[
-            "https://www.googleapis.com/auth/calendar",
-            "https://www.googleapis.com/auth/gmail.readonly"
-        ])
-
-    if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        with open(TOKEN_PATH, 'w') as token:
-            token.write(creds.to_json())
-
-    return creds
+    return services.credentials(TOKEN_PATH, [
+        "https://www.googleapis.com/auth/calendar",
+        "https://www.googleapis.com/auth/gmail.readonly"
+    ])
 
 def get_calendar_service():
-    creds = authenticate()
-    service = build("calendar", "v3", credentials=creds)
-    return service
+    return services.calendar(authenticate())
 
 # === PROCESS EVENTS ===
 def process_pending_events():
@@ -132,18 +123,15 @@ def process_pending_events():
             return
 
         service = get_calendar_service()
-        successful = []
-        local_tz = tzlocal.get_localzone()
 
+        calendar_events = {}
         for email_id, event in list(pending_events.items()):
-            start_time = datetime.fromisoformat(event['start_time']).astimezone(local_tz)
-            end_time = datetime.fromisoformat(event['end_time']).astimezone(local_tz)
-
+            # Naive times are UTC here too, as in CalendarManager, so both paths derive the same id
             calendar_event = {
                 'summary': event['title'],
                 'description': event['description'],
-                'start': {'dateTime': start_time.isoformat(), 'timeZone': str(local_tz)},
-                'end': {'dateTime': end_time.isoformat(), 'timeZone': str(local_tz)},
+                'start': event_time(event['start_time'], event.get('timezone')),
+                'end': event_time(event['end_time'], event.get('timezone')),
                 'reminders': {
                     'useDefault': False,
                     'overrides': [
@@ -155,9 +143,13 @@ def process_pending_events():
                 }
             }
 
-            created_event = service.events().insert(calendarId='primary', body=calendar_event).execute()
-            logger.info(f"Created calendar event: {created_event['id']}")
-            successful.append(email_id)
+            calendar_events[email_id] = calendar_event
+
+        # One batch request per chunk of events instead of one insert each
+        created = batch_insert_events(service, calendar_events)
+        successful = [email_id for email_id, created_event in created.items() if created_event]
+        for email_id in successful:
+            logger.info(f"Created calendar event: {created[email_id]['id']}")
 
         # Remove successfully processed events
         for sid in successful:
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from api_executor import execute, executor, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Calendar accepts up to 1000 calls per batch, but large batches are throttled
+# as a burst, so inserts go out in chunks of the size Google recommends.
+MAX_BATCH_SIZE = 1000
+DEFAULT_BATCH_SIZE = 50
+
+
+def _start_key(body: Dict) -> str:
+    """The event start as a UTC instant where it can be parsed, so equal starts give equal ids."""
+    start = body.get('start') or {}
+    value = start.get('dateTime') or start.get('date') or ''
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        if start.get('timeZone', 'UTC') != 'UTC':
+            return value
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def event_time(value: str, time_zone: Optional[str] = None) -> Dict:
+    """
+    Calendar start/end for an ISO datetime. Naive times are read in
+    time_zone, or as UTC without one, on every insert path, so a pending
+    event gets the same time, and the same id, whichever path creates it.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return {'dateTime': parsed.isoformat(), 'timeZone': time_zone or 'UTC'}
+
+
+def event_id(source_id: str, body: Dict) -> str:
+    """
+    Calendar event id derived from the source email id and the event start.
+    Google accepts ids of 5-1024 base32hex characters (0-9, a-v); a sha1 hex
+    digest is one, and it is the same on every retry of the same event.
+    """
+    return hashlib.sha1(f'{source_id}|{_start_key(body)}'.encode('utf-8')).hexdigest()
+
+
+def with_event_id(body: Dict, source_id: Optional[str]) -> Dict:
+    """A copy of body carrying its deterministic id, unless it has an id already."""
+    if body.get('id') or not source_id:
+        return body
+    return dict(body, id=event_id(source_id, body))
+
+
+def is_conflict(error: Exception) -> bool:
+    """409: an event with this id exists, i.e. an earlier attempt already inserted it."""
+    return isinstance(error, HttpError) and error.resp.status == 409
+
+
+def _insert_request(service, body: Dict, calendar_id: str, send_updates: Optional[str]):
+    kwargs = {'calendarId': calendar_id, 'body': body}
+    if send_updates:
+        kwargs['sendUpdates'] = send_updates
+    return service.events().insert(**kwargs)
+
+
+def insert_event(service, body: Dict, calendar_id: str = 'primary',
+                 send_updates: Optional[str] = None) -> Dict:
+    """Insert one event; a conflict on its id counts as success and returns body."""
+    try:
+        return execute(_insert_request(service, body, calendar_id, send_updates))
+    except HttpError as e:
+        if body.get('id') and is_conflict(e):
+            logger.info(f"Calendar event {body['id']} already exists")
+            return body
+        raise
+
+
+def _chunks(items: List[Tuple[str, Dict]], size: int) -> Iterable[List[Tuple[str, Dict]]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def batch_insert_events(service, events: Dict[str, Dict], calendar_id: str = 'primary',
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        send_updates: Optional[str] = None) -> Dict[str, Optional[Dict]]:
+    """
+    Insert Calendar events through batch HTTP requests.
+
+    events maps a caller key (the email id of a pending event) to an event
+    resource. Returns the same keys mapped to the created event, or None
+    for events that could not be inserted, so callers can drop exactly the
+    events that succeeded. Inserts that fail inside a batch with a
+    retryable error are retried one at a time.
+
+    Events without an id get one derived from their key and start, so a run
+    that is retried after partly succeeding does not create duplicates: the
+    events inserted last time come back as conflicts, counted as success.
+    """
+    events = {key: with_event_id(body, key) for key, body in events.items()}
+    items = list(events.items())
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    results: Dict[str, Optional[Dict]] = {key: None for key, _ in items}
+    retry: List[str] = []
+
+    def on_response(request_id, response, exception):
+        if exception is None:
+            results[request_id] = response
+        elif is_conflict(exception):
+            results[request_id] = events[request_id]
+        elif is_retryable(exception):
+            retry.append(request_id)
+        else:
+            logger.error(f"Error creating calendar event for {request_id}: {exception}")
+
+    for chunk in _chunks(items, batch_size):
+        batch = service.new_batch_http_request(callback=on_response)
+        for key, body in chunk:
+            batch.add(_insert_request(service, body, calendar_id, send_updates), request_id=key)
+        try:
+            executor.acquire('calendar.events.insert', len(chunk))
+            batch.execute()
+        except HttpError as e:
+            logger.warning(f"Batch of {len(chunk)} event inserts failed, retrying individually: {e}")
+            retry.extend(key for key, _ in chunk if results[key] is None and key not in retry)
+
+    for key in retry:
+        try:
+            results[key] = insert_event(service, events[key], calendar_id, send_updates)
+        except (HttpError, OSError) as e:
+            logger.error(f"Error creating calendar event for {key}: {e}")
+
+    return results
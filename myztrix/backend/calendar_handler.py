@@ -1,7 +1,8 @@
 import os
 import datetime
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+
+from api_executor import execute
+from google_services import services
 
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
 
@@ -25,36 +26,42 @@ def get_calendar_service(creds=None):
     If creds not provided, tries loading from secure TOKEN_PATH.
     """
     if creds:
-        return build('calendar', 'v3', credentials=creds)
+        return services.calendar(creds)
 
     if not os.path.exists(TOKEN_PATH):
         raise Exception(f"token.json not found in {TOKEN_PATH}. Run OAuth flow first.")
 
-    creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
-    return build('calendar', 'v3', credentials=creds)
+    return services.calendar(services.credentials(TOKEN_PATH, SCOPES))
 
-def create_event_payload(summary, description, event_date, location=''):
+def create_event_payload(summary, description, event_date, location='', end_date=None,
+                         all_day=False, time_zone=None):
     """
     Build the event JSON payload to send to Google Calendar API.
+    Without end_date the event lasts one hour, or the day if all_day.
+    time_zone is the IANA zone of the event; a naive event_date without one is UTC.
     """
-    if event_date.tzinfo is None:
-        event_date = event_date.replace(tzinfo=datetime.timezone.utc)
-
-    start_time = event_date.isoformat()
-    end_time = (event_date + datetime.timedelta(hours=1)).isoformat()
+    if all_day:
+        # All-day ends are exclusive, as in iCalendar
+        first_day = event_date.date()
+        last_day = end_date.date() if end_date else first_day
+        start = {'date': first_day.isoformat()}
+        end = {'date': max(last_day, first_day + datetime.timedelta(days=1)).isoformat()}
+    else:
+        if event_date.tzinfo is None and not time_zone:
+            event_date = event_date.replace(tzinfo=datetime.timezone.utc)
+        if end_date is None:
+            end_date = event_date + datetime.timedelta(hours=1)
+        elif end_date.tzinfo is None:
+            end_date = end_date.replace(tzinfo=event_date.tzinfo)
+        start = {'dateTime': event_date.isoformat(), 'timeZone': time_zone or 'UTC'}
+        end = {'dateTime': end_date.isoformat(), 'timeZone': time_zone or 'UTC'}
 
     return {
         'summary': summary,
         'location': location,
         'description': description,
-        'start': {
-            'dateTime': start_time,
-            'timeZone': 'UTC',
-        },
-        'end': {
-            'dateTime': end_time,
-            'timeZone': 'UTC',
-        },
+        'start': start,
+        'end': end,
         'reminders': {
             'useDefault': True,
         },
@@ -64,10 +71,10 @@ def add_event(service, event_data):
     """
     Add an event to the primary calendar.
     """
-    created_event = service.events().insert(
+    created_event = execute(service.events().insert(
         calendarId='primary',
         body=event_data
-    ).execute()
+    ))
     return created_event
 
 
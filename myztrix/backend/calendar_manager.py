@@ -5,10 +5,12 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from pathlib import Path
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
 
+
+from google_services import services
+from calendar_batch import batch_insert_events, event_time, insert_event, with_event_id
+
 # Define scope explicitly
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
@@ -29,7 +31,7 @@ class CalendarManager:
             token_file = Path(self.token_path)
 
             if token_file.exists():
-                self.credentials = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+                self.credentials = services.credentials(self.token_path, SCOPES)
 
             if not self.credentials or not self.credentials.valid:
                 if self.credentials and self.credentials.expired and self.credentials.refresh_token:
@@ -37,62 +39,61 @@ class CalendarManager:
                 else:
                     raise Exception("No valid credentials found. Authenticate with Gmail first.")
 
-                with open(self.token_path, 'w') as token:
-                    token.write(self.credentials.to_json())
-
-            self.service = build('calendar', 'v3', credentials=self.credentials)
+            self.service = services.calendar(self.credentials)
             return True
 
         except Exception as e:
             logger.error(f"Calendar authentication failed: {str(e)}")
             return False
 
+    def _event_body(self, event_details: Dict) -> Dict:
+        """Calendar event resource with layered reminders for a pending event."""
+        # Parse times safely
+        start_time = datetime.fromisoformat(event_details.get('start_time', datetime.utcnow().isoformat()))
+        end_time = datetime.fromisoformat(
+            event_details.get('end_time', (start_time + timedelta(hours=1)).isoformat())
+        )
+
+        time_zone = event_details.get('timezone')
+        event = {
+            'summary': event_details.get('title', 'New Event'),
+            'description': event_details.get('description', ''),
+            'start': event_time(start_time.isoformat(), time_zone),
+            'end': event_time(end_time.isoformat(), time_zone),
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'email', 'minutes': 24 * 60},  # 1 day before
+                    {'method': 'popup', 'minutes': 120},
+                    {'method': 'popup', 'minutes': 60},
+                    {'method': 'popup', 'minutes': 30},
+                ],
+            },
+        }
+
+        if event_details.get('all_day'):
+            # Invites for a whole day; the end date is exclusive
+            event['start'] = {'date': start_time.date().isoformat()}
+            event['end'] = {'date': max(end_time.date(), start_time.date() + timedelta(days=1)).isoformat()}
+
+        if 'attendees' in event_details:
+            event['attendees'] = [{'email': email.strip()} for email in event_details['attendees']]
+
+        return event
+
     def create_event(self, event_details: Dict) -> Optional[str]:
         """
         Create a calendar event with layered reminders.
-        Returns the event ID if successful, None otherwise.
+        Returns the event ID if successful, None otherwise. Events detected
+        from an email get an id derived from it, so creating one twice is a no-op.
         """
         try:
             if not self.service:
                 if not self.authenticate():
                     return None
 
-            # Parse times safely
-            start_time = datetime.fromisoformat(event_details.get('start_time', datetime.utcnow().isoformat()))
-            end_time = datetime.fromisoformat(
-                event_details.get('end_time', (start_time + timedelta(hours=1)).isoformat())
-            )
-
-            event = {
-                'summary': event_details.get('title', 'New Event'),
-                'description': event_details.get('description', ''),
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': 'UTC',
-                },
-                'end': {
-                    'dateTime': end_time.isoformat(),
-                    'timeZone': 'UTC',
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 24 * 60},  # 1 day before
-                        {'method': 'popup', 'minutes': 120},
-                        {'method': 'popup', 'minutes': 60},
-                        {'method': 'popup', 'minutes': 30},
-                    ],
-                },
-            }
-
-            if 'attendees' in event_details:
-                event['attendees'] = [{'email': email.strip()} for email in event_details['attendees']]
-
-            created_event = self.service.events().insert(
-                calendarId='primary',
-                body=event,
-                sendUpdates='all'
-            ).execute()
+            body = with_event_id(self._event_body(event_details), event_details.get('email_id'))
+            created_event = insert_event(self.service, body, send_updates='all')
 
             logger.info(f"✅ Created calendar event: {created_event['id']}")
             return created_event['id']
@@ -101,7 +102,47 @@ class CalendarManager:
             logger.error(f"Error creating calendar event: {str(e)}")
             return None
 
+    def create_events(self, pending_events: Dict[str, Dict]) -> Dict[str, Optional[str]]:
+        """
+        Create many events through the Calendar batch endpoint.
+        Returns each key of pending_events mapped to the new event ID, or None if it failed.
+        """
+        if not self.service and not self.authenticate():
+            return {key: None for key in pending_events}
+
+        bodies = {}
+        for key, event_details in pending_events.items():
+            try:
+                bodies[key] = self._event_body(event_details)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Skipping pending event {key} with invalid times: {str(e)}")
+
+        created = batch_insert_events(self.service, bodies, send_updates='all')
+        return {key: (created.get(key) or {}).get('id') for key in pending_events}
+
     def process_pending_events(self, pending_events_path: str) -> None:
         """Process all pending events and create them in the calendar."""
         try:
             if not os.path.exists(pending_events_path):
+                return
+
+            with open(pending_events_path, 'r') as f:
+                pending_events = json.load(f)
+
+            if not pending_events:
+                return
+
+            results = self.create_events(pending_events)
+            successful = [email_id for email_id, event_id in results.items() if event_id]
+
+            # Keep failed events pending so the next cycle retries them
+            for email_id in successful:
+                pending_events.pop(email_id, None)
+
+            with open(pending_events_path, 'w') as f:
+                json.dump(pending_events, f, indent=2)
+
+            logger.info(f"Created {len(successful)} of {len(successful) + len(pending_events)} pending events")
+
+        except Exception as e:
+            logger.error(f"Error processing pending events: {str(e)}")
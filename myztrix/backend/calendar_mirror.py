@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import logging
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dateutil import rrule
+from dateutil.tz import gettz
+from googleapiclient.errors import HttpError
+
+from api_executor import execute
+from calendar_batch import event_id
+from fingerprint import SUBJECT_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Largest page events().list returns
+PAGE_SIZE = 2500
+# Only what lookups and /scan need is kept of each event
+MIRROR_FIELDS = ('id', 'iCalUID', 'summary', 'description', 'location', 'start', 'end',
+                 'status', 'recurrence', 'recurringEventId', 'originalStartTime', 'htmlLink', 'updated')
+
+
+def _moment(when: Optional[Dict]) -> Optional[datetime]:
+    """An event start/end as an aware datetime; all-day dates and naive times are taken as UTC."""
+    when = when or {}
+    value = when.get('dateTime') or when.get('date')
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """ISO date or datetime as a UTC timestamp; naive values are taken as UTC."""
+    moment = _moment({'dateTime': value})
+    return moment.timestamp() if moment else None
+
+
+def event_start(event: Dict) -> Optional[float]:
+    moment = _moment(event.get('start'))
+    return moment.timestamp() if moment else None
+
+
+def event_end(event: Dict) -> Optional[float]:
+    moment = _moment(event.get('end'))
+    return moment.timestamp() if moment else event_start(event)
+
+
+def _title(title: Optional[str]) -> str:
+    return SUBJECT_PREFIX.sub('', title or '').strip().casefold()
+
+
+def _series_start(event: Dict) -> Optional[datetime]:
+    """DTSTART for expanding a series: naive for all-day events, else in the event's own zone so DST follows it."""
+    start = event.get('start') or {}
+    if start.get('date'):
+        return datetime.fromisoformat(start['date'])
+    moment = _moment(start)
+    zone = gettz(start['timeZone']) if start.get('timeZone') else None
+    return moment.astimezone(zone) if moment and zone else moment
+
+
+def _when(moment: datetime, all_day: bool, time_zone: Optional[str]) -> Dict:
+    if all_day:
+        return {'date': moment.date().isoformat()}
+    when = {'dateTime': moment.isoformat()}
+    if time_zone:
+        when['timeZone'] = time_zone
+    return when
+
+
+class CalendarMirror:
+    """
+    Local copy of one Google Calendar, kept fresh with syncToken deltas.
+
+    The first sync lists every event; later syncs only fetch what changed
+    since the saved syncToken, usually a single empty page. When Google
+    expires the token (410 Gone) the mirror is rebuilt from a full listing.
+    Events are indexed by start time, for date-range queries, and by
+    iCalUID, so "is this already on the calendar?" never needs an API call.
+    Recurring series are expanded from their RRULE/RDATE/EXDATE when
+    queried; modified and cancelled instances override the occurrence they
+    replace.
+    """
+
+    def __init__(self, path: Optional[str] = None, calendar_id: str = 'primary'):
+        self.path = path
+        self.calendar_id = calendar_id
+        self.sync_token: Optional[str] = None
+        self.synced_at = 0.0
+        self.events: Dict[str, Dict] = {}
+        # (start timestamp, event id), sorted; single events and modified instances
+        self._starts: List[Tuple[float, str]] = []
+        # Longest indexed event, so range queries can find events that began earlier
+        self._longest = 0.0
+        self._by_ical_uid: Dict[str, str] = {}
+        # Series id -> parsed recurrence (None if it could not be parsed)
+        self._series: Dict[str, Optional[rrule.rruleset]] = {}
+        # Series id -> {original start timestamp: id of the instance replacing it}
+        self._overrides: Dict[str, Dict[float, str]] = {}
+        self.stats: Counter = Counter()
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable calendar mirror {self.path}: {e}")
+            return
+        if state.get('calendar_id') != self.calendar_id:
+            return
+        self.sync_token = state.get('sync_token')
+        self.synced_at = state.get('synced_at', 0.0)
+        for event in state.get('events', []):
+            self._upsert(event)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        state = {
+            'calendar_id': self.calendar_id,
+            'sync_token': self.sync_token,
+            'synced_at': self.synced_at,
+            'events': list(self.events.values()),
+        }
+        with open(self.path, 'w') as f:
+            json.dump(state, f)
+
+    def _reset(self) -> None:
+        self.sync_token = None
+        self.events.clear()
+        self._starts.clear()
+        self._longest = 0.0
+        self._by_ical_uid.clear()
+        self._series.clear()
+        self._overrides.clear()
+
+    def _remove(self, eid: str) -> None:
+        event = self.events.pop(eid, None)
+        if event is None:
+            return
+        self._series.pop(eid, None)
+        series_id = event.get('recurringEventId')
+        original = _moment(event.get('originalStartTime'))
+        if series_id and original:
+            overrides = self._overrides.get(series_id, {})
+            if overrides.get(original.timestamp()) == eid:
+                del overrides[original.timestamp()]
+        start = event_start(event)
+        if start is not None:
+            index = bisect_left(self._starts, (start, eid))
+            if index < len(self._starts) and self._starts[index] == (start, eid):
+                del self._starts[index]
+        if self._by_ical_uid.get(event.get('iCalUID')) == eid:
+            del self._by_ical_uid[event['iCalUID']]
+
+    def _upsert(self, event: Dict) -> None:
+        eid = event['id']
+        self._remove(eid)
+        series_id = event.get('recurringEventId')
+        original = _moment(event.get('originalStartTime'))
+        cancelled = event.get('status') == 'cancelled'
+        # A cancelled instance is kept, unindexed, so its occurrence stays skipped
+        if cancelled and not (series_id and original):
+            return
+        event = {field: event[field] for field in MIRROR_FIELDS if field in event}
+        self.events[eid] = event
+        if series_id and original:
+            self._overrides.setdefault(series_id, {})[original.timestamp()] = eid
+        if cancelled:
+            return
+        if event.get('recurrence'):
+            self._series[eid] = self._parse_recurrence(event)
+            if self._series[eid] is None:
+                self._index(eid, event)
+        else:
+            self._index(eid, event)
+        # Exceptions of a recurring series share its iCalUID; the series itself wins
+        if event.get('iCalUID') and not (series_id and event['iCalUID'] in self._by_ical_uid):
+            self._by_ical_uid[event['iCalUID']] = eid
+
+    def _index(self, eid: str, event: Dict) -> None:
+        start = event_start(event)
+        if start is not None:
+            insort(self._starts, (start, eid))
+            self._longest = max(self._longest, event_end(event) - start)
+
+    @staticmethod
+    def _parse_recurrence(event: Dict) -> Optional[rrule.rruleset]:
+        dtstart = _series_start(event)
+        if dtstart is None:
+            return None
+        try:
+            rules = rrule.rrulestr('\n'.join(event['recurrence']), dtstart=dtstart, forceset=True)
+            # Mixed naive and aware dates only fail once iterated
+            next(iter(rules), None)
+            return rules
+        except (ValueError, TypeError) as e:
+            # Indexed as a single event at its first occurrence instead
+            logger.warning(f"Unreadable recurrence on event {event.get('id')}: {e}")
+            return None
+
+    def sync(self, service, max_age: float = 0.0) -> int:
+        """
+        Bring the mirror up to date; returns the number of changed events.
+        Skipped if the last sync is less than max_age seconds old.
+        """
+        if self.sync_token and time.time() - self.synced_at < max_age:
+            return 0
+        if self.sync_token:
+            try:
+                return self._sync(service, self.sync_token)
+            except HttpError as e:
+                # 410 Gone: the sync token expired and only a full sync can recover
+                if e.resp.status != 410:
+                    raise
+                logger.info("Calendar sync token expired, doing a full sync")
+        self._reset()
+        self.stats['full_syncs'] += 1
+        return self._sync(service, None)
+
+    def _sync(self, service, sync_token: Optional[str]) -> int:
+        changed = 0
+        page_token = None
+        while True:
+            kwargs = {'calendarId': self.calendar_id, 'maxResults': PAGE_SIZE}
+            if sync_token:
+                kwargs['syncToken'] = sync_token
+            if page_token:
+                kwargs['pageToken'] = page_token
+            results = execute(service.events().list(**kwargs))
+            for event in results.get('items', []):
+                self._upsert(event)
+                changed += 1
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        self.sync_token = results.get('nextSyncToken')
+        self.synced_at = time.time()
+        self.stats['synced_events'] += changed
+        return changed
+
+    def _occurrences(self, series_id: str, low: float, high: float) -> Iterator[Tuple[float, Dict]]:
+        """Instances of a series overlapping [low, high), minus those replaced by an exception."""
+        rules = self._series[series_id]
+        series = self.events[series_id]
+        first = _series_start(series)
+        duration = timedelta(seconds=event_end(series) - event_start(series))
+        all_day = first.tzinfo is None
+        after = datetime.fromtimestamp(low, timezone.utc) - duration
+        before = datetime.fromtimestamp(high, timezone.utc)
+        if all_day:
+            after, before = after.replace(tzinfo=None), before.replace(tzinfo=None)
+        overrides = self._overrides.get(series_id, {})
+        time_zone = (series.get('start') or {}).get('timeZone')
+        for occurrence in rules.between(after, before, inc=True):
+            moment = occurrence.replace(tzinfo=timezone.utc) if all_day else occurrence
+            start = moment.timestamp()
+            if start >= high or (start < low and start + duration.total_seconds() <= low):
+                continue
+            if start in overrides:
+                continue
+            instance = {field: value for field, value in series.items() if field != 'recurrence'}
+            suffix = occurrence.strftime('%Y%m%d') if all_day else \
+                moment.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+            instance.update(
+                id=f"{series_id}_{suffix}",
+                recurringEventId=series_id,
+                start=_when(occurrence, all_day, time_zone),
+                end=_when(occurrence + duration, all_day, time_zone),
+                originalStartTime=_when(occurrence, all_day, time_zone),
+            )
+            yield start, instance
+
+    def between(self, start: datetime, end: datetime) -> List[Dict]:
+        """
+        Events overlapping [start, end), by start time, with recurring series
+        expanded into their instances. Naive datetimes are taken as UTC.
+        """
+        low, high = (
+            (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+            for moment in (start, end)
+        )
+        found = []
+        index = bisect_left(self._starts, (low - self._longest, ''))
+        while index < len(self._starts) and self._starts[index][0] < high:
+            begins, eid = self._starts[index]
+            event = self.events[eid]
+            if begins >= low or event_end(event) > low:
+                found.append((begins, eid, event))
+            index += 1
+        for series_id, rules in self._series.items():
+            if rules is not None:
+                found.extend((begins, instance['id'], instance)
+                             for begins, instance in self._occurrences(series_id, low, high))
+        found.sort(key=lambda item: item[:2])
+        return [event for _, _, event in found]
+
+    def find(self, ical_uid: str) -> Optional[Dict]:
+        eid = self._by_ical_uid.get(ical_uid)
+        return self.events.get(eid) if eid else None
+
+    def contains(self, event_details: Dict) -> bool:
+        """
+        Whether a detected event is already on the calendar: the same
+        invite (iCalUID), the event created for the same email, or an event
+        (or occurrence of a series) with the same title starting at the
+        same time.
+        """
+        found = self._contains(event_details)
+        self.stats['already_on_calendar' if found else 'not_on_calendar'] += 1
+        return found
+
+    def _contains(self, event_details: Dict) -> bool:
+        if event_details.get('ical_uid') and event_details['ical_uid'] in self._by_ical_uid:
+            return True
+        start_time = event_details.get('start_time')
+        if event_details.get('email_id') and start_time:
+            body = {'start': {'dateTime': start_time, 'timeZone': 'UTC'}}
+            if event_id(event_details['email_id'], body) in self.events:
+                return True
+        start = _timestamp(start_time)
+        if start is None:
+            return False
+        title = _title(event_details.get('title'))
+        moment = datetime.fromtimestamp(start, timezone.utc)
+        return any(
+            event_start(event) == start and _title(event.get('summary')) == title
+            for event in self.between(moment, moment + timedelta(seconds=1))
+        )
@@ -28,22 +28,24 @@ def review_events(events, agent):
 
 def process_events():
     print("🔍 Authenticating and scraping Gmail for event candidates...")
-    agent = GmailAgent(CREDENTIALS_PATH, TOKEN_PATH)
+    agent = GmailAgent(CREDENTIALS_PATH, TOKEN_PATH, defer_writes=True)
     if not agent.authenticate():
         print("❌ Authentication failed. Check your credentials and token.")
         return
 
-    emails = agent.get_unread_emails()
-    if not emails:
-        print("📭 No unread emails found.")
-        return
-
+    # Detection starts on the first page while later pages are still downloading
     events = []
-    for email in emails:
+    email_count = 0
+    for email in agent.iter_unread_emails():
+        email_count += 1
         is_event, confidence, event_details = agent.detect_event(email)
         if is_event and event_details:
             events.append(event_details)
 
+    if not email_count:
+        print("📭 No unread emails found.")
+        return
+
     if not events:
         print("🕵️‍♀️ No event candidates detected.")
         return
@@ -51,15 +53,26 @@ def process_events():
     show_events(events)
     accepted_events = review_events(events, agent)
 
+    added = 0
     for event in accepted_events:
         print(f"\n📆 Adding to Google Calendar: {event.get('title')}")
         success = add_event_to_calendar(event)
         if success:
             agent.mark_as_read(event['email_id'])
             agent.add_label(event['email_id'], "CalendarAdded")
-            print("✅ Event added and email marked.")
+            added += 1
+            print("✅ Event added.")
         else:
             print("⚠️ Failed to add event.")
 
+    # The read/label changes are only sent here, in one batch
+    agent.flush_writes()
+    if added:
+        unwritten = agent.pending_writes()
+        if unwritten:
+            print(f"⚠️ Couldn't mark {unwritten} of {added} emails in Gmail.")
+        else:
+            print(f"📬 Marked {added} emails as read and labelled.")
+
 if __name__ == "__main__":
     process_events()
@@ -0,0 +1,199 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines; only in-process locking there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Refresh this long before expiry so API calls never find the token expired
+REFRESH_MARGIN = timedelta(minutes=5)
+# Wait before retrying a background refresh that failed
+RETRY_DELAY = 60.0
+# Timers for far-off expiries wake up at least this often and re-check
+MAX_TIMER_DELAY = 6 * 3600.0
+
+
+def write_token(path: str, credentials: Credentials) -> None:
+    """Write token.json atomically and readable only by the user."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.token-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(credentials.to_json())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def token_file_lock(path: str):
+    """Lock shared with other processes (the daemon, the Flask apps) refreshing the same token."""
+    if fcntl is None:
+        yield
+        return
+    with open(f'{path}.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ManagedCredentials(Credentials):
+    """
+    OAuth user credentials whose refresh is single-flight.
+
+    Threads that find the token expired at the same time wait on one lock;
+    the first refreshes, the rest see a valid token and return. Across
+    processes, a token another process already refreshed on disk is adopted
+    instead of calling the token endpoint again. Every refresh is written
+    back atomically.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.token_path: Optional[str] = None
+        self._refresh_lock = threading.Lock()
+
+    def needs_refresh(self, margin: timedelta = timedelta(0)) -> bool:
+        if not self.token or self.expiry is None:
+            return not self.token
+        return self.expiry - margin <= datetime.utcnow()
+
+    def refresh(self, request, margin: timedelta = timedelta(0)) -> None:
+        stale_token = self.token
+        with self._refresh_lock:
+            if self.token != stale_token and not self.needs_refresh(margin):
+                return  # refreshed by another thread while we waited
+            if not self.token_path:
+                super().refresh(request)
+                return
+            with token_file_lock(self.token_path):
+                if self._adopt_from_disk(margin):
+                    return
+                super().refresh(request)
+                write_token(self.token_path, self)
+                logger.info(f"Refreshed token, valid until {self.expiry}")
+
+    def _adopt_from_disk(self, margin: timedelta) -> bool:
+        try:
+            with open(self.token_path, 'r') as f:
+                info = json.load(f)
+            on_disk = Credentials.from_authorized_user_info(info, self.scopes)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read {self.token_path}: {e}")
+            return False
+        if on_disk.token == self.token or on_disk.expiry is None \
+                or on_disk.expiry - margin <= datetime.utcnow():
+            return False
+        self.token, self.expiry = on_disk.token, on_disk.expiry
+        if on_disk.refresh_token:
+            self._refresh_token = on_disk.refresh_token
+        return True
+
+
+class CredentialManager:
+    """
+    Process-wide owner of OAuth credentials, one set per token file.
+
+    Credentials stay in memory after the first read. A background timer
+    refreshes each set REFRESH_MARGIN before it expires, so requests find a
+    valid token instead of refreshing synchronously; a request that still
+    finds it expired goes through the single-flight refresh.
+    """
+
+    def __init__(self, margin: timedelta = REFRESH_MARGIN, background: bool = True):
+        self.margin = margin
+        self.background = background
+        self._lock = threading.Lock()
+        self._credentials: Dict[str, ManagedCredentials] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+
+    def get(self, token_path: str, scopes: Optional[List[str]] = None) -> ManagedCredentials:
+        """
+        Credentials for token_path, read from disk once and refreshed if due.
+        Raises FileNotFoundError if the token has not been created yet.
+        """
+        path = os.path.abspath(str(token_path))
+        with self._lock:
+            credentials = self._credentials.get(path)
+            if credentials is None:
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"token.json not found at {path}. Run OAuth flow first.")
+                credentials = ManagedCredentials.from_authorized_user_file(path, scopes)
+                credentials.token_path = path
+                self._credentials[path] = credentials
+
+        if credentials.needs_refresh(self.margin) and credentials.refresh_token:
+            credentials.refresh(Request(), margin=self.margin)
+        self._schedule(path, credentials)
+        return credentials
+
+    def adopt(self, token_path: str, credentials: Credentials) -> ManagedCredentials:
+        """Take over credentials from a fresh OAuth flow, saving them to token_path."""
+        path = os.path.abspath(str(token_path))
+        if not isinstance(credentials, ManagedCredentials):
+            credentials = ManagedCredentials.from_authorized_user_info(json.loads(credentials.to_json()))
+        credentials.token_path = path
+        with token_file_lock(path):
+            write_token(path, credentials)
+        with self._lock:
+            self._credentials[path] = credentials
+        self._schedule(path, credentials)
+        return credentials
+
+    def _schedule(self, path: str, credentials: ManagedCredentials, delay: Optional[float] = None) -> None:
+        if not self.background or not credentials.refresh_token or credentials.expiry is None:
+            return
+        if delay is None:
+            due = credentials.expiry - self.margin - datetime.utcnow()
+            delay = min(max(0.0, due.total_seconds()), MAX_TIMER_DELAY)
+        with self._lock:
+            timer = self._timers.get(path)
+            if timer is not None and timer.is_alive():
+                return
+            timer = threading.Timer(delay, self._refresh_in_background, args=(path, credentials))
+            timer.daemon = True
+            self._timers[path] = timer
+            timer.start()
+
+    def _refresh_in_background(self, path: str, credentials: ManagedCredentials) -> None:
+        with self._lock:
+            self._timers.pop(path, None)
+        try:
+            if credentials.needs_refresh(self.margin):
+                credentials.refresh(Request(), margin=self.margin)
+        except Exception as e:
+            logger.warning(f"Background token refresh failed, retrying in {RETRY_DELAY:.0f}s: {e}")
+            self._schedule(path, credentials, delay=RETRY_DELAY)
+            return
+        self._schedule(path, credentials)
+
+    def clear(self) -> None:
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            self._credentials.clear()
+
+
+# Shared by every module and thread of the process
+credential_manager = CredentialManager()
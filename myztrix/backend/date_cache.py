@@ -0,0 +1,134 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+DEFAULT_MAXSIZE = 4096
+# Pending emails are re-read every five minutes; a day's worth of phrases fits easily
+DEFAULT_TTL = 6 * 3600
+
+# Phrases that resolve against the current time of day would go stale in the cache
+SUB_DAY_RELATIVE = re.compile(r'\b(?:now|ago|hours?|hrs?|minutes?|mins?|seconds?|secs?|in \d+)\b')
+# Dates and clock times written out in the phrase; results containing one are never re-based
+EXPLICIT_DATE_OR_TIME = re.compile(
+    r'\b(?:\d{1,4}[/.-]\d{1,2}(?:[/.-]\d{1,4})?|\d{1,2}(?:st|nd|rd|th)|\d{4}|\d{1,2}:\d{2}'
+    r'|\d{1,2}\s?(?:[ap]m|[ap]\.m\.)|noon|midnight'
+    r'|jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+    r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)(?!\w)'
+)
+WHITESPACE = re.compile(r'\s+')
+
+_MISSING = object()
+
+
+def normalize_phrase(phrase: str) -> str:
+    return WHITESPACE.sub(' ', phrase).strip().lower()
+
+
+def _dateparser_parse(phrase: str, languages: Optional[Sequence[str]], settings: Dict) -> Optional[datetime]:
+    # Imported on first use: dateparser takes a third of a second to load and
+    # the date grammar resolves most phrases without it
+    import dateparser
+    return dateparser.parse(phrase, languages=languages, settings=settings)
+
+
+class DateParseCache:
+    """
+    Bounded LRU in front of dateparser.parse.
+
+    Entries are keyed by the normalized phrase, the reference day, the
+    timezone and the parser settings, so 'tomorrow at 2 PM' is parsed once a
+    day rather than once per email per cycle. Failed parses are cached too.
+    Results whose time of day was taken from the reference ('tomorrow') are
+    stored relative to it and re-based on each hit; phrases that spell out a
+    date or time are stored as parsed, and phrases relative to the current
+    time ('in 2 hours') are never cached.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, phrase: str, reference: datetime, settings: Dict, languages: Optional[Sequence[str]]):
+        timezone = settings.get('TIMEZONE') or (reference.tzname() if reference.tzinfo else time.tzname[0])
+        return (
+            phrase, reference.date(), timezone,
+            tuple(sorted((k, v) for k, v in settings.items() if k != 'RELATIVE_BASE')),
+            tuple(languages) if languages else None,
+        )
+
+    def _get(self, key):
+        """The cached value or _MISSING, counted as a hit or miss under the lock."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def parse(self, phrase: str, reference: Optional[datetime] = None, settings: Optional[Dict] = None,
+              languages: Optional[Sequence[str]] = None) -> Optional[datetime]:
+        reference = reference or datetime.now()
+        settings = dict(settings or {}, RELATIVE_BASE=reference)
+        phrase = normalize_phrase(phrase)
+
+        if SUB_DAY_RELATIVE.search(phrase):
+            with self._lock:
+                self.uncacheable += 1
+            return _dateparser_parse(phrase, languages, settings)
+
+        key = self._key(phrase, reference, settings, languages)
+        cached = self._get(key)
+        if cached is not _MISSING:
+            parsed, relative = cached
+            return reference + parsed if relative else parsed
+
+        parsed = _dateparser_parse(phrase, languages, settings)
+        if parsed is not None and not EXPLICIT_DATE_OR_TIME.search(phrase) \
+                and (parsed.tzinfo is None) == (reference.tzinfo is None) and parsed.time() == reference.time():
+            # Time of day came from the reference, so store the offset instead
+            self._put(key, (parsed - reference, True))
+        else:
+            self._put(key, (parsed, False))
+        return parsed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'uncacheable': self.uncacheable,
+                    'size': len(self._entries)}
+
+
+# Shared by every module so phrases parsed by one detector are hits for the others
+date_cache = DateParseCache()
+
+
+def parse_date(phrase: str, reference: Optional[datetime] = None, settings: Optional[Dict] = None,
+               languages: Optional[Sequence[str]] = None) -> Optional[datetime]:
+    """dateparser.parse through the shared cache."""
+    return date_cache.parse(phrase, reference, settings, languages)
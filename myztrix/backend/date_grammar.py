@@ -0,0 +1,213 @@
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from date_cache import parse_date
+
+WEEKDAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+MONTH_NAMES = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+               'august', 'september', 'october', 'november', 'december')
+
+WEEKDAY = (r'(?:monday|mon|tuesday|tues|tue|wednesday|wed|thursday|thurs|thur|thu'
+           r'|friday|fri|saturday|sat|sunday|sun)')
+# 'sat', 'sun' and 'wed' are ordinary words, so on their own only full names count
+LONE_WEEKDAY = r'(?:monday|mon|tuesday|tues|tue|wednesday|thursday|thurs|thur|thu|friday|fri|saturday|sunday)'
+MONTH = (r'(?:january|jan|february|feb|march|mar|april|apr|may|june|jun|july|jul|august|aug'
+         r'|september|sept|sep|october|oct|november|nov|december|dec)\.?')
+DAYNUM = r'(?:3[01]|[12]\d|0?[1-9])(?:st|nd|rd|th)?'
+YEAR = r'(?:19|20)\d{2}'
+ISO_DATE = r'\d{4}-\d{2}-\d{2}'
+# 6/12/2025, 12.06.2025, 6/12/25
+NUMERIC_DATE = r'\d{1,2}[/.]\d{1,2}[/.](?:\d{4}|\d{2})'
+
+DAY = (
+    rf'(?:{ISO_DATE}'
+    rf'|(?:{WEEKDAY}\.?,?\s+)?(?:{DAYNUM}(?:\s+of)?\s+{MONTH}|{MONTH}\s+{DAYNUM})(?:,?\s+{YEAR})?'
+    rf'|(?:{WEEKDAY}\.?,?\s+)?{NUMERIC_DATE}'
+    rf'|today|tonight|tomorrow'
+    rf'|(?:(?:next|this|coming)\s+)?{LONE_WEEKDAY})'
+)
+
+CLOCK = r'(?:[01]?\d|2[0-3])(?::[0-5]\d)?'
+MERIDIEM = r'\s?[ap]\.?m\.?'
+SINGLE_TIME = rf'(?:{CLOCK}{MERIDIEM}|(?:[01]?\d|2[0-3]):[0-5]\d|noon|midnight)'
+TIME = rf'(?:{CLOCK}(?:{MERIDIEM})?\s?(?:-|–|—|to|until|till)\s?{SINGLE_TIME}|{SINGLE_TIME})'
+
+DAY_TIME_SEP = r'(?:\s*,?\s*(?:at|from|@)?\s*|t)'
+TIME_DAY_SEP = r'\s*,?\s*(?:on\s+)?'
+
+# One pass over the text finds every day/time span; the alternation tries
+# 'day [at] time' first, then 'time [on] day', then either part alone
+GRAMMAR = re.compile(
+    rf'(?<![\w-])(?:(?P<day>{DAY})(?:{DAY_TIME_SEP}(?P<time>{TIME}))?'
+    rf'|(?P<time_first>{TIME})(?:{TIME_DAY_SEP}(?P<day_after>{DAY}))?)(?![\w])'
+)
+
+DAY_FIRST = re.compile(rf'({DAYNUM})(?:\s+of)?\s+({MONTH})')
+MONTH_FIRST = re.compile(rf'({MONTH})\s+({DAYNUM})')
+YEAR_PART = re.compile(rf'\b({YEAR})\b')
+RANGE_SEP = re.compile(r'\s?(?:-|–|—|to|until|till)\s?')
+CLOCK_PART = re.compile(r'^(\d{1,2})(?::(\d{2}))?\s?(?:([ap])\.?m\.?)?$')
+NUMERIC_PART = re.compile(r'(\d{1,2})([/.])(\d{1,2})[/.](\d{4}|\d{2})')
+# Day-like words a span may leave behind; dateparser gets a look at phrases that have them
+DATE_TOKEN = re.compile(rf'(?<![\w-])(?:\d{{1,4}}[/.-]\d{{1,2}}[/.-]\d{{1,4}}|{MONTH}|{LONE_WEEKDAY}'
+                        rf'|today|tonight|tomorrow|week|weeks|days?|months?)(?![\w])')
+FILLER_WORDS = {'at', 'on', 'from', 'by', 'the', 'of', 'a', 'an', 'and', '-', '–', '—', ','}
+
+
+class DateSpan(NamedTuple):
+    start: datetime
+    end: Optional[datetime]
+    text: str
+    offset: int
+    # 2 when the span names both a day and a time, 1 for either alone
+    score: int
+    has_day: bool = True
+
+
+def _weekday_index(word: str) -> int:
+    return next(i for i, name in enumerate(WEEKDAY_NAMES) if name.startswith(word[:3]))
+
+
+def _month_index(word: str) -> int:
+    return next(i for i, name in enumerate(MONTH_NAMES) if name.startswith(word[:3])) + 1
+
+
+def resolve_day(text: str, reference: datetime) -> Optional[date]:
+    """Turn the day part of a span into a date, preferring dates from reference onwards."""
+    today = reference.date()
+    if re.fullmatch(ISO_DATE, text):
+        return date.fromisoformat(text)
+    if text in ('today', 'tonight'):
+        return today
+    if text == 'tomorrow':
+        return today + timedelta(days=1)
+
+    numeric = NUMERIC_PART.search(text)
+    if numeric:
+        first, separator, second, year = numeric.groups()
+        # Slashes read month first, as dateparser does, dots day first; a part over 12 is the day
+        month, day_number = (int(first), int(second)) if separator == '/' else (int(second), int(first))
+        if month > 12:
+            month, day_number = day_number, month
+        return date(int(year) + (2000 if len(year) == 2 else 0), month, day_number)
+
+    match = DAY_FIRST.search(text) or MONTH_FIRST.search(text)
+    if match:
+        day_text, month_text = match.groups() if match.re is DAY_FIRST else match.groups()[::-1]
+        day_number = int(re.match(r'\d+', day_text).group())
+        year = YEAR_PART.search(text)
+        candidate = date(int(year.group(1)) if year else today.year, _month_index(month_text), day_number)
+        if not year and candidate < today:
+            candidate = candidate.replace(year=today.year + 1)
+        return candidate
+
+    # A bare weekday means the next one; on a Monday, 'Monday' is a week away
+    weekday = _weekday_index(text.split()[-1])
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+def _clock(text: str, meridiem: Optional[str] = None) -> Optional[Tuple[int, int, Optional[str]]]:
+    if text == 'noon':
+        return 12, 0, None
+    if text == 'midnight':
+        return 0, 0, None
+    match = CLOCK_PART.match(text)
+    if not match:
+        return None
+    hour, minute, own_meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    return hour, minute, own_meridiem or meridiem
+
+
+def _to_time(hour: int, minute: int, meridiem: Optional[str]) -> Optional[time]:
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == 'p' else 0)
+    return time(hour, minute)
+
+
+def resolve_time(text: str) -> Optional[Tuple[time, Optional[time]]]:
+    """Turn the time part of a span into (start, end); end is None unless it is a range."""
+    parts = RANGE_SEP.split(text, maxsplit=1)
+    end = _clock(parts[1].strip()) if len(parts) == 2 else None
+    start = _clock(parts[0].strip(), end[2] if end else None)
+    if start is None:
+        return None
+
+    start_time = _to_time(*start)
+    if end is None:
+        return (start_time, None) if start_time else None
+
+    end_time = _to_time(*end)
+    if start_time and end_time and start_time > end_time and start[2] == end[2] == 'p' \
+            and not CLOCK_PART.match(parts[0].strip()).group(3):
+        # '11-1pm' runs from 11am
+        start_time = _to_time(start[0], start[1], 'a')
+    if not start_time or not end_time:
+        return None
+    return start_time, end_time
+
+
+def _span(match: re.Match, reference: datetime) -> Optional[DateSpan]:
+    day_text = match.group('day') or match.group('day_after')
+    time_text = match.group('time') or match.group('time_first')
+    try:
+        day = resolve_day(day_text, reference) if day_text else reference.date()
+    except ValueError:
+        # '31 June' and friends
+        return None
+    times = resolve_time(time_text) if time_text else (time(0), None)
+    if day is None or times is None:
+        return None
+
+    start = datetime.combine(day, times[0], tzinfo=reference.tzinfo)
+    end = None
+    if times[1] is not None:
+        end = datetime.combine(day, times[1], tzinfo=reference.tzinfo)
+        if end <= start:
+            end += timedelta(days=1)
+    return DateSpan(start, end, match.group(), match.start(), bool(day_text) + bool(time_text), bool(day_text))
+
+
+def iter_spans(text: str, reference: Optional[datetime] = None) -> Iterator[DateSpan]:
+    """Yield every span the grammar recognises in text, in order."""
+    reference = reference or datetime.now()
+    for match in GRAMMAR.finditer(text.lower()):
+        span = _span(match, reference)
+        if span:
+            yield span
+
+
+def find_spans(text: str, reference: Optional[datetime] = None) -> List[DateSpan]:
+    return list(iter_spans(text, reference))
+
+
+def parse_span(phrase: str, reference: Optional[datetime] = None, settings: Optional[Dict] = None,
+               languages: Optional[Sequence[str]] = None) -> Optional[DateSpan]:
+    """
+    Resolve a short phrase or line to its best span: the grammar first, then
+    the cached dateparser for anything the grammar does not cover. Spans
+    naming both a day and a time beat partial ones; earlier spans win ties.
+    A span without a day, or one that leaves a day-like word unread, is
+    checked against dateparser: 'in 3 days at 3pm' is not today at 3pm.
+    """
+    spans = find_spans(phrase, reference)
+    if not spans:
+        parsed = parse_date(phrase, reference, settings, languages)
+        return DateSpan(parsed, None, phrase, 0, 0, False) if parsed else None
+
+    best = max(spans, key=lambda span: (span.score, -span.offset))
+    leftover = phrase[:best.offset] + ' ' + phrase[best.offset + len(best.text):]
+    unread = [word for word in leftover.lower().split() if word.strip(',;:') not in FILLER_WORDS]
+    if not DATE_TOKEN.search(leftover.lower()) and (best.has_day or not unread):
+        return best
+
+    parsed = parse_date(phrase, reference, settings, languages)
+    if parsed is None:
+        return best
+    end = None
+    if best.end is not None and parsed.time() == best.start.time():
+        # dateparser found the day; the grammar's range still holds
+        end = best.end + (parsed.replace(tzinfo=best.start.tzinfo) - best.start)
+    return DateSpan(parsed, end, phrase, 0, best.score, True)
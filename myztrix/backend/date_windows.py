@@ -0,0 +1,185 @@
+import re
+from datetime import datetime
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from date_grammar import DateSpan, parse_span
+from keywords import KeywordMatcher, matcher_for
+
+# Only the start of a message is scanned; event details live near the top
+MAX_SCAN_CHARS = 64 * 1024
+# At most this many anchors are expanded into windows per email
+MAX_ANCHORS = 24
+# At most this many candidate phrases are handed to dateparser per email
+MAX_PARSES = 4
+# Characters of context taken on each side of an anchor
+WINDOW_CHARS = 48
+# Longest run of date-like tokens treated as one phrase
+MAX_PHRASE_TOKENS = 8
+# Keyword hits within this many characters of a phrase count towards its rank
+KEYWORD_RADIUS = 80
+
+DATEPARSER_SETTINGS = {'PREFER_DATES_FROM': 'future'}
+DATEPARSER_LANGUAGES = ['en']
+
+WEEKDAYS = r'(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day|nesday|sday|rsday|urday)?'
+MONTHS = (r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)')
+DAYS = (rf'{WEEKDAYS}|{MONTHS}|today|tomorrow|tonight'
+        r'|\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/.]\d{1,2}[/.]\d{2,4}|\d{1,2}(?:st|nd|rd|th)')
+TIMES = (r'(?:\d{1,2}(?::\d{2})?(?:[ap]\.?m\.?)?[-–])?(?:\d{1,2}(?::\d{2})?[ap]\.?m\.?|\d{1,2}:\d{2})'
+         r'|noon|midnight')
+# Month and day names that are also ordinary words only count beside a day or time
+AMBIGUOUS = ('may', 'mar', 'march', 'sun', 'sat', 'wed')
+
+# Matched against lowercased text; re.IGNORECASE makes the scan several times slower
+ANCHOR = re.compile(
+    rf'(?<![a-z0-9])(?!(?:{"|".join(AMBIGUOUS)})\b)'
+    rf'(?:{DAYS}|\d{{1,2}}(?::\d{{2}})?\s?[ap]\.?m\b|\d{{1,2}}:\d{{2}}|noon|midnight)\b'
+)
+TOKEN = re.compile(r'\S+')
+DAY_TOKEN = re.compile(rf'^(?:{DAYS})$')
+TIME_TOKEN = re.compile(rf'^(?:{TIMES})$')
+MERIDIEM = re.compile(r'^[ap]\.?m\.?$')
+DOTTED_MERIDIEM = re.compile(r'^[ap]\.m\.?$')
+# Tokens that only count next to a day or time
+WEAK_TOKEN = re.compile(r'^(?:\d{1,4}|[ap]\.?m\.?|next|this|coming|morning|afternoon|evening)$')
+CONNECTORS = {'at', 'on', 'the', 'of', 'from', 'by', '-', '–'}
+MODIFIERS = ('next', 'this', 'coming')
+
+STRIP = ',;:!?()[]"\'<>*'
+
+
+class Candidate(NamedTuple):
+    phrase: str
+    offset: int
+    has_day: bool
+    has_time: bool
+    keyword_distance: int
+
+
+def _classify(word: str) -> str:
+    if word in AMBIGUOUS:
+        return 'weak'
+    if DAY_TOKEN.match(word):
+        return 'day'
+    if TIME_TOKEN.match(word):
+        return 'time'
+    if WEAK_TOKEN.match(word):
+        return 'weak'
+    if word in CONNECTORS:
+        return 'connector'
+    return ''
+
+
+def iter_date_phrases(text: str, base: int = 0) -> Iterator[Tuple[str, int, bool, bool]]:
+    """
+    Yield (phrase, offset, has_day, has_time) for each run of date-like tokens
+    in text, with offsets shifted by base. A run needs at least one day or
+    time token; connectors such as 'at' and 'on' join tokens but never start
+    or end a run.
+    """
+    run: List[list] = []
+
+    def flush():
+        while run and (run[-1][1] == 'connector' or run[-1][0] in MODIFIERS):
+            run.pop()
+        while run and run[0][1] == 'connector':
+            run.pop(0)
+        kinds = {kind for _, kind, _ in run}
+        if kinds & {'day', 'time'}:
+            phrase = ' '.join(raw for raw, _, _ in run[:MAX_PHRASE_TOKENS])
+            return phrase, base + run[0][2], 'day' in kinds, 'time' in kinds
+        return None
+
+    for match in TOKEN.finditer(text):
+        token = match.group()
+        raw = token.strip(STRIP)
+        dotted = DOTTED_MERIDIEM.match(raw.lower())
+        if not dotted:
+            raw = raw.rstrip('.')
+        word = raw.lower()
+        kind = _classify(word) if raw else ''
+        if kind:
+            # '2 pm' is a time even though '2' and 'pm' are weak on their own
+            if MERIDIEM.match(word) and run and run[-1][0].isdigit():
+                run[-1][1] = kind = 'time'
+            run.append([raw, kind, match.start()])
+        # Sentence punctuation closes the run after this token, except in 'p.m.'
+        if not kind or (token[-1] in '.;!?' and not dotted):
+            found = flush()
+            run = []
+            if found:
+                yield found
+    found = flush()
+    if found:
+        yield found
+
+
+def date_candidates(text: str, keywords: Union[KeywordMatcher, Iterable[str]] = ()) -> List[Candidate]:
+    """
+    Lowercased date phrases around the first MAX_ANCHORS date-like anchors in
+    text, best first: phrases with both a day and a time rank above partial
+    ones, and the distance to the nearest keyword breaks ties.
+    """
+    text = text[:MAX_SCAN_CHARS].lower()
+    keyword_offsets = [hit.start for hit in matcher_for(keywords).finditer(text)] if keywords else []
+
+    candidates = {}
+    covered = 0
+    for count, anchor in enumerate(ANCHOR.finditer(text)):
+        if count >= MAX_ANCHORS:
+            break
+        if anchor.start() < covered:
+            continue
+        # Widen the window to whitespace so tokens are not cut in half
+        start = max(covered, anchor.start() - WINDOW_CHARS)
+        if start > covered:
+            start = text.rfind(' ', covered, start) + 1 or start
+        end = text.find(' ', anchor.end() + WINDOW_CHARS)
+        covered = end = len(text) if end == -1 else end
+
+        for phrase, offset, has_day, has_time in iter_date_phrases(text[start:end], start):
+            distance = min((abs(offset - k) for k in keyword_offsets), default=KEYWORD_RADIUS + 1)
+            candidates.setdefault(phrase, Candidate(phrase, offset, has_day, has_time, distance))
+
+    return sorted(candidates.values(), key=lambda c: (
+        -(c.has_day + c.has_time), min(c.keyword_distance, KEYWORD_RADIUS + 1), c.offset
+    ))
+
+
+def parse_phrase(phrase: str, reference: Optional[datetime] = None) -> Optional[DateSpan]:
+    span = parse_span(phrase, reference, DATEPARSER_SETTINGS, DATEPARSER_LANGUAGES)
+    if span is None and phrase.split(' ', 1)[0] in MODIFIERS:
+        # dateparser reads 'Monday at 5 PM' but not 'next Monday at 5 PM'
+        span = parse_span(phrase.split(' ', 1)[1], reference, DATEPARSER_SETTINGS, DATEPARSER_LANGUAGES)
+    return span
+
+
+def find_event_span(text: str, keywords: Union[KeywordMatcher, Iterable[str]] = (),
+                    reference: Optional[datetime] = None) -> Optional[DateSpan]:
+    """
+    Find the most likely event start, and end if the text gives a range.
+
+    Instead of running dateparser over the whole message, date-like anchors
+    are located with one regex scan, short windows around them are split
+    into candidate phrases, and only the best MAX_PARSES phrases are parsed.
+    The first candidate that does not lie in the past wins; otherwise the
+    first that parses at all.
+    """
+    reference = reference or datetime.now()
+    today = reference.replace(hour=0, minute=0, second=0, microsecond=0)
+    fallback = None
+    for candidate in date_candidates(text, keywords)[:MAX_PARSES]:
+        span = parse_phrase(candidate.phrase, reference)
+        if span is None:
+            continue
+        if span.start >= today:
+            return span
+        fallback = fallback or span
+    return fallback
+
+
+def find_event_datetime(text: str, keywords: Union[KeywordMatcher, Iterable[str]] = (),
+                        reference: Optional[datetime] = None) -> Optional[datetime]:
+    span = find_event_span(text, keywords, reference)
+    return span.start if span else None
@@ -0,0 +1,124 @@
+import os
+import atexit
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from date_cache import parse_date
+from event_detector import detect_event
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for detection; 0 or 1 keeps detection in this process
+WORKERS_ENV = 'MYZTRIX_DETECT_WORKERS'
+
+# Below this many emails, pickling and IPC cost more than the parsing saves
+DEFAULT_MIN_BATCH = 64
+# Emails sent to a worker per round trip
+DEFAULT_CHUNKSIZE = 16
+# Emails collected from a stream before they are handed to the pool
+DEFAULT_STREAM_BATCH = 256
+
+Result = Tuple[bool, float, Optional[Dict]]
+
+WARMUP_EMAIL = {
+    'id': 'warmup',
+    'subject': 'Meeting next Tuesday',
+    'body': "Can we meet next Tuesday at 2pm to go over the agenda?\n\nOn Mon, Bob wrote:\n> Sure",
+}
+
+
+def default_workers() -> int:
+    value = os.environ.get(WORKERS_ENV)
+    if value is not None:
+        try:
+            return max(0, int(value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid {WORKERS_ENV}={value!r}")
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def _warm_worker() -> None:
+    """Load dateparser's language data and compile the detection regexes once per worker."""
+    try:
+        parse_date('next tuesday at 2pm', datetime.now())
+        detect_event(WARMUP_EMAIL)
+    except Exception as e:
+        logger.warning(f"Detection worker warm-up failed: {str(e)}")
+
+
+class DetectionExecutor:
+    """
+    Runs event detection over many emails on a pool of worker processes.
+
+    Results come back in input order. Batches smaller than min_batch, or any
+    batch when the pool cannot be started, are detected inline. The pool is
+    created on first use and kept between calls so workers stay warm; their
+    date cache and stripping counters are per process and not merged back.
+    """
+
+    def __init__(self, workers: Optional[int] = None, min_batch: int = DEFAULT_MIN_BATCH,
+                 chunksize: int = DEFAULT_CHUNKSIZE, fn: Callable[[Dict], Result] = detect_event):
+        self.workers = default_workers() if workers is None else workers
+        self.min_batch = min_batch
+        self.chunksize = chunksize
+        self.fn = fn
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 1:
+            return None
+        if self._pool is None:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"Process pool unavailable, detecting inline: {str(e)}")
+                self.workers = 0
+        return self._pool
+
+    def map(self, emails: Iterable[Dict]) -> List[Result]:
+        emails = list(emails)
+        if len(emails) < self.min_batch:
+            return [self.fn(email) for email in emails]
+
+        pool = self._get_pool()
+        if pool is None:
+            return [self.fn(email) for email in emails]
+
+        try:
+            return list(pool.map(self.fn, emails, chunksize=self.chunksize))
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Detection pool failed, detecting inline: {str(e)}")
+            self.shutdown()
+            self.workers = 0
+            return [self.fn(email) for email in emails]
+
+    def detect_stream(self, emails: Iterable[Dict],
+                      batch_size: int = DEFAULT_STREAM_BATCH) -> Iterator[Tuple[Dict, Result]]:
+        """Yield (email, result) pairs, detecting batch_size emails at a time."""
+        batch: List[Dict] = []
+        for email in emails:
+            batch.append(email)
+            if len(batch) >= batch_size:
+                yield from zip(batch, self.map(batch))
+                batch = []
+        if batch:
+            yield from zip(batch, self.map(batch))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self) -> 'DetectionExecutor':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+# Shared by every agent cycle so the pool is started and warmed once per process
+detector = DetectionExecutor()
+atexit.register(detector.shutdown)
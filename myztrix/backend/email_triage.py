@@ -0,0 +1,106 @@
+import re
+import logging
+from typing import Dict, List
+
+from gmail_batch import DEFAULT_BATCH_SIZE, batch_get_messages
+from keywords import TRIAGE
+
+logger = logging.getLogger(__name__)
+
+# Headers requested with format='metadata'; everything else stays on the server
+TRIAGE_HEADERS = [
+    'Subject', 'From', 'Sender', 'Date', 'Content-Type', 'Content-Class',
+    'List-Unsubscribe', 'List-Id', 'Precedence', 'Auto-Submitted'
+]
+TRIAGE_FIELDS = 'id,threadId,labelIds,snippet,sizeEstimate,payload/headers'
+
+# Messages scoring below this never get their full body downloaded
+TRIAGE_THRESHOLD = 0.3
+
+DATE_HINT = re.compile(
+    r"\b(?:today|tomorrow|tonight|next week|"
+    r"mon|tue|wed|thu|fri|sat|sun)(?:day|sday|nesday|rsday|urday)?\b|"
+    r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b|"
+    r"\b\d{1,2}(?::\d{2})?\s?(?:am|pm)\b|\b\d{1,2}:\d{2}\b|\b\d{4}-\d{2}-\d{2}\b",
+    re.IGNORECASE
+)
+
+LARGE_MESSAGE_BYTES = 500_000
+
+# Invites are multipart/mixed or multipart/alternative at the top, so the
+# text/calendar part is invisible in metadata; these signals are not
+INVITE_SUBJECT = re.compile(r'^\s*(?:updated\s+)?invitation(?:\s+to\b|\s*:)', re.IGNORECASE)
+INVITE_SNIPPET = re.compile(r'\binvite\.ics\b|\binvitation from google calendar\b', re.IGNORECASE)
+CALENDAR_SENDERS = ('calendar-notification@google.com', 'calendar-server.bounces.google.com')
+
+
+def _headers(message: Dict) -> Dict[str, str]:
+    return {
+        h['name'].lower(): h['value']
+        for h in message.get('payload', {}).get('headers', [])
+    }
+
+
+def is_invite(message: Dict, headers: Dict[str, str]) -> bool:
+    """Whether metadata shows a calendar invite: Google's and Outlook's headers, subject or snippet."""
+    if 'calendar' in headers.get('content-type', '').lower():
+        return True
+    # Outlook and Exchange mark meeting requests with this header
+    if 'calendarmessage' in headers.get('content-class', '').lower():
+        return True
+    senders = f"{headers.get('from', '')} {headers.get('sender', '')}".lower()
+    if any(sender in senders for sender in CALENDAR_SENDERS):
+        return True
+    return bool(INVITE_SUBJECT.match(headers.get('subject', '')) or INVITE_SNIPPET.search(message.get('snippet', '')))
+
+
+def score_metadata(message: Dict) -> float:
+    """
+    Cheap event likelihood for a message fetched with format='metadata'.
+    Looks only at headers, snippet and size; returns a score in [0, 1].
+    """
+    headers = _headers(message)
+
+    # Calendar invites always pass, so their text/calendar part reaches the parser
+    if is_invite(message, headers):
+        return 1.0
+
+    text = f"{headers.get('subject', '')} {message.get('snippet', '')}".lower()
+    keyword_hits = len(TRIAGE.distinct(text))
+
+    score = min(keyword_hits * 0.25, 0.6)
+    if DATE_HINT.search(text):
+        score += 0.3
+
+    # Mailing lists and automated senders rarely carry invites worth parsing
+    if 'list-unsubscribe' in headers or 'list-id' in headers:
+        score -= 0.3
+    if headers.get('precedence', '').lower() in ('bulk', 'list', 'junk'):
+        score -= 0.2
+    if headers.get('auto-submitted', 'no').lower() != 'no':
+        score -= 0.2
+    if message.get('sizeEstimate', 0) > LARGE_MESSAGE_BYTES and not keyword_hits:
+        score -= 0.1
+
+    return max(0.0, min(score, 1.0))
+
+
+def triage_message_ids(service, message_ids: List[str], threshold: float = TRIAGE_THRESHOLD,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> List[str]:
+    """
+    Fetch metadata for message_ids and return those worth a full download,
+    in their original order. Callers decide what happens to the rest;
+    GmailAgent marks them read like any other email without an event.
+    """
+    if not message_ids:
+        return []
+
+    metadata = batch_get_messages(
+        service, message_ids, format='metadata', batch_size=batch_size,
+        metadata_headers=TRIAGE_HEADERS, fields=TRIAGE_FIELDS
+    )
+    scores = {msg['id']: score_metadata(msg) for msg in metadata}
+    # Messages whose metadata could not be fetched are kept rather than silently dropped
+    passed = [msg_id for msg_id in message_ids if scores.get(msg_id, threshold) >= threshold]
+    logger.info(f"Triage kept {len(passed)} of {len(message_ids)} messages for full download")
+    return passed
@@ -7,6 +7,7 @@ from googleapiclient.errors import HttpError
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from calendar_handler import get_calendar_service
+from api_executor import execute
 
 def add_event_to_calendar(summary, description, location, start_datetime, end_datetime):
     """
@@ -42,7 +43,7 @@ def add_event_to_calendar(summary, description, location, start_datetime, end_da
     }
 
     try:
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
+        created_event = execute(service.events().insert(calendarId='primary', body=event))
         print(f"✅ Event created: {created_event.get('htmlLink')}")
         return created_event.get('id')
     except HttpError as error:
@@ -0,0 +1,70 @@
+import logging
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from date_windows import find_event_span
+from keywords import MEETING
+from reply_stripper import clean_body
+
+logger = logging.getLogger(__name__)
+
+# Confidence at which an email is treated as an event
+EVENT_THRESHOLD = 0.6
+
+
+def detect_event(email: Dict) -> Tuple[bool, float, Optional[Dict]]:
+    """
+    Decide whether a parsed email describes an event.
+    Returns (is_event, confidence, event_details); event_details is None
+    unless is_event. Module-level so detection can run in worker processes.
+    """
+    invite = email.get('calendar_event')
+    if invite and not invite.get('actionable', True):
+        # Cancellations and replies to an invite are about an event, not a new one
+        return False, 0.0, None
+    if invite:
+        # Calendar invites state the event exactly, so skip the keyword/date heuristics
+        return True, 1.0, {
+            'title': invite['title'] or email['subject'],
+            'start_time': invite['start_time'].isoformat(),
+            'end_time': invite['end_time'].isoformat(),
+            'description': invite['description'] or email['body'],
+            'location': invite['location'],
+            'ical_uid': invite['uid'],
+            'all_day': invite.get('all_day', False),
+            'timezone': invite.get('timezone'),
+            'sender': email.get('sender', ''),
+            'thread_id': email.get('thread_id'),
+            'email_id': email['id']
+        }
+
+    try:
+        # Quoted history and footers only add cost and stale dates
+        text = f"{email['subject']} {clean_body(email['body'])}"
+        keyword_matches = MEETING.count(text)
+        keyword_score = min(keyword_matches / 3, 1.0)
+
+        # Only short windows around date-like anchors are parsed, so long bodies stay cheap
+        span = find_event_span(text, MEETING)
+        parsed_date = span.start if span else None
+        date_score = 1.0 if parsed_date else 0.0
+
+        confidence = (keyword_score * 0.6) + (date_score * 0.4)
+
+        if confidence >= EVENT_THRESHOLD and parsed_date:
+            event_details = {
+                'title': email['subject'],
+                'start_time': parsed_date.isoformat(),
+                'end_time': (span.end or parsed_date + timedelta(hours=1)).isoformat(),
+                'description': email['body'],
+                'sender': email.get('sender', ''),
+                'thread_id': email.get('thread_id'),
+                'email_id': email['id']
+            }
+            return True, confidence, event_details
+
+        return False, confidence, None
+
+    except Exception as e:
+        logger.error(f"Error detecting event: {str(e)}")
+        return False, 0.0, None
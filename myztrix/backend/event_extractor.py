@@ -3,17 +3,20 @@ import re
 from datetime import datetime, timedelta
 import dateutil.parser
 
-EVENT_KEYWORDS = ["meeting", "call", "appointment", "talk", "trip", "event", "conference", "flight", "webinar", "presentation"]
+from date_grammar import find_spans
+from keywords import EVENTS
+from reply_stripper import clean_body
+
 
 def extract_event_candidates(emails):
     events = []
 
     for email in emails:
         subject = email['subject'].lower()
-        body = email['body'].lower()
+        body = clean_body(email['body']).lower()
         text = subject + ' ' + body
 
-        if any(keyword in text for keyword in EVENT_KEYWORDS):
+        if EVENTS.search(text):
             possible_times = extract_times(text)
             for time in possible_times:
                 events.append({
@@ -27,6 +30,11 @@ def extract_event_candidates(emails):
     return events
 
 def extract_times(text):
+    # The compiled grammar covers the common formats in one pass; dateutil handles the rest
+    spans = find_spans(text)
+    if spans:
+        return [span.start for span in spans]
+
     time_matches = []
     try:
         potential_dates = re.findall(r'\b(?:on )?(?:next )?\w+\s\d{1,2}(?:st|nd|rd|th)?(?:,?\s\d{4})?', text)
@@ -0,0 +1,364 @@
+"""
+Local stand-in for the parts of Gmail v1 and Calendar v3 the agent uses, for
+offline benchmarking and tests.
+
+    python fake_google_api.py --messages 500 --latency 0.05 --error-rate 0.01
+    MYZTRIX_GOOGLE_API_ROOT=http://127.0.0.1:8099/ python run_agent.py
+
+Implements messages list/get/modify/batchModify, labels, history, getProfile,
+events insert/list/delete and the batch endpoints of both APIs. Every
+request can be delayed and a fraction of them failed on purpose.
+"""
+import re
+import copy
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from synthetic_mailbox import generate_mailbox
+
+GMAIL = '/gmail/v1/users/<user_id>'
+CALENDAR = '/calendar/v3/calendars/<calendar_id>/events'
+# Client-supplied event ids: base32hex characters, 5-1024 long
+EVENT_ID = re.compile(r'[0-9a-v]{5,1024}')
+BATCH_PART_HEADER = 'X-Fake-Batch-Part'
+
+SYSTEM_LABELS = ['INBOX', 'UNREAD', 'STARRED', 'IMPORTANT', 'SENT', 'TRASH', 'SPAM']
+
+
+def google_error(status: int, message: str, reason: str):
+    body = {'error': {'code': status, 'message': message, 'errors': [{'reason': reason, 'message': message}]}}
+    return jsonify(body), status
+
+
+class FakeGoogleState:
+    """Mailbox, labels, history and calendar held in memory behind one lock."""
+
+    def __init__(self, messages: Optional[List[Dict]] = None, latency: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, seed: int = 0,
+                 history_retention: int = 10000, error_reason: str = 'backendError'):
+        self.lock = threading.RLock()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_reason = error_reason
+        self.rng = random.Random(seed)
+        self.history_retention = history_retention
+
+        self.messages: Dict[str, Dict] = {}
+        self.order: List[str] = []
+        self.labels = {name: {'id': name, 'name': name, 'type': 'system'} for name in SYSTEM_LABELS}
+        self.history: List[Dict] = []
+        self.history_id = 1000
+
+        self.events: Dict[str, Dict] = {}
+        self.event_seq = 0
+        self.requests = 0
+
+        for message in reversed(messages or []):
+            self.add_message(message)
+
+    def add_message(self, message: Dict) -> None:
+        """Deliver a message, newest first, and record it in the history log."""
+        with self.lock:
+            self.history_id += 1
+            message = dict(message, historyId=str(self.history_id))
+            self.messages[message['id']] = message
+            self.order.insert(0, message['id'])
+            stub = {'id': message['id'], 'threadId': message['threadId'], 'labelIds': list(message['labelIds'])}
+            self.history.append({'id': str(self.history_id), 'messages': [stub], 'messagesAdded': [{'message': stub}]})
+            del self.history[:-self.history_retention]
+
+    def modify(self, msg_id: str, add: List[str], remove: List[str]) -> Dict:
+        with self.lock:
+            message = self.messages[msg_id]
+            labels = [label for label in message['labelIds'] if label not in remove]
+            labels += [label for label in add if label not in labels]
+            message['labelIds'] = labels
+            self.history_id += 1
+            message['historyId'] = str(self.history_id)
+            return message
+
+    def touch_event(self, event: Dict) -> None:
+        self.event_seq += 1
+        event['_seq'] = self.event_seq
+        event['updated'] = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def message_view(message: Dict, format: str, metadata_headers: List[str]) -> Dict:
+    view = {key: value for key, value in message.items() if key != 'payload'}
+    if format == 'minimal':
+        return view
+    if format == 'metadata':
+        wanted = {name.lower() for name in metadata_headers}
+        headers = [h for h in message['payload'].get('headers', []) if not wanted or h['name'].lower() in wanted]
+        view['payload'] = {'mimeType': message['payload'].get('mimeType'), 'headers': headers}
+        return view
+    view['payload'] = copy.deepcopy(message['payload'])
+    return view
+
+
+def _event_start(event: Dict) -> str:
+    start = event.get('start', {})
+    return start.get('dateTime') or start.get('date') or ''
+
+
+def create_app(state: FakeGoogleState) -> Flask:
+    app = Flask(__name__)
+    app.config['fake_state'] = state
+
+    @app.before_request
+    def simulate_network():
+        # Sub-requests of a batch share the latency and fate of the outer request
+        if request.headers.get(BATCH_PART_HEADER):
+            return None
+        with state.lock:
+            state.requests += 1
+        if state.latency:
+            time.sleep(state.latency)
+        if state.error_rate and state.rng.random() < state.error_rate:
+            return google_error(state.error_status, 'Injected failure', state.error_reason)
+        return None
+
+    # --- Gmail ---
+
+    @app.get(f'{GMAIL}/profile')
+    def get_profile(user_id):
+        return jsonify({'emailAddress': 'me@example.com', 'messagesTotal': len(state.messages),
+                        'historyId': str(state.history_id)})
+
+    @app.get(f'{GMAIL}/messages')
+    def list_messages(user_id):
+        label_ids = set(request.args.getlist('labelIds'))
+        if 'in:inbox' in request.args.get('q', ''):
+            label_ids.add('INBOX')
+        max_results = min(int(request.args.get('maxResults', 100)), 500)
+        offset = int(request.args.get('pageToken') or 0)
+
+        with state.lock:
+            matching = [msg_id for msg_id in state.order
+                        if label_ids.issubset(state.messages[msg_id]['labelIds'])]
+            page = matching[offset:offset + max_results]
+            body = {
+                'messages': [{'id': msg_id, 'threadId': state.messages[msg_id]['threadId']} for msg_id in page],
+                'resultSizeEstimate': len(matching),
+            }
+        if offset + max_results < len(matching):
+            body['nextPageToken'] = str(offset + max_results)
+        if not page:
+            body.pop('messages')
+        return jsonify(body)
+
+    @app.get(f'{GMAIL}/messages/<msg_id>')
+    def get_message(user_id, msg_id):
+        with state.lock:
+            message = state.messages.get(msg_id)
+            if message is None:
+                return google_error(404, 'Requested entity was not found.', 'notFound')
+            return jsonify(message_view(
+                message, request.args.get('format', 'full'), request.args.getlist('metadataHeaders')
+            ))
+
+    @app.post(f'{GMAIL}/messages/<msg_id>/modify')
+    def modify_message(user_id, msg_id):
+        body = request.get_json(force=True) or {}
+        if msg_id not in state.messages:
+            return google_error(404, 'Requested entity was not found.', 'notFound')
+        message = state.modify(msg_id, body.get('addLabelIds', []), body.get('removeLabelIds', []))
+        return jsonify({'id': msg_id, 'threadId': message['threadId'], 'labelIds': message['labelIds']})
+
+    @app.post(f'{GMAIL}/messages/batchModify')
+    def batch_modify(user_id):
+        body = request.get_json(force=True) or {}
+        ids = body.get('ids', [])
+        if len(ids) > 1000:
+            return google_error(400, 'Too many ids', 'invalidArgument')
+        unknown = set(body.get('addLabelIds', [])) - set(state.labels)
+        if unknown:
+            return google_error(400, f'Invalid label: {sorted(unknown)[0]}', 'invalidArgument')
+        for msg_id in ids:
+            if msg_id in state.messages:
+                state.modify(msg_id, body.get('addLabelIds', []), body.get('removeLabelIds', []))
+        return '', 204
+
+    @app.get(f'{GMAIL}/labels')
+    def list_labels(user_id):
+        with state.lock:
+            return jsonify({'labels': list(state.labels.values())})
+
+    @app.post(f'{GMAIL}/labels')
+    def create_label(user_id):
+        name = (request.get_json(force=True) or {}).get('name')
+        with state.lock:
+            if any(label['name'] == name for label in state.labels.values()):
+                return google_error(409, 'Label name exists or conflicts', 'duplicate')
+            label = {'id': f'Label_{len(state.labels) + 1}', 'name': name, 'type': 'user'}
+            state.labels[label['id']] = label
+        return jsonify(label)
+
+    @app.get(f'{GMAIL}/history')
+    def list_history(user_id):
+        start = int(request.args['startHistoryId'])
+        label_id = request.args.get('labelId')
+        max_results = min(int(request.args.get('maxResults', 100)), 500)
+        offset = int(request.args.get('pageToken') or 0)
+
+        with state.lock:
+            oldest = int(state.history[0]['id']) if state.history else state.history_id
+            if start < oldest - 1:
+                return google_error(404, 'Requested entity was not found.', 'notFound')
+            records = [
+                record for record in state.history
+                if int(record['id']) > start and (
+                    not label_id or any(label_id in m['message']['labelIds'] for m in record['messagesAdded'])
+                )
+            ]
+            body = {'history': records[offset:offset + max_results], 'historyId': str(state.history_id)}
+        if offset + max_results < len(records):
+            body['nextPageToken'] = str(offset + max_results)
+        if not body['history']:
+            body.pop('history')
+        return jsonify(body)
+
+    # --- Calendar ---
+
+    @app.post(CALENDAR)
+    def insert_event(calendar_id):
+        body = request.get_json(force=True) or {}
+        with state.lock:
+            event_id = body.get('id') or uuid.uuid4().hex
+            if not EVENT_ID.fullmatch(event_id):
+                return google_error(400, 'Invalid resource id value.', 'invalid')
+            if event_id in state.events:
+                return google_error(409, 'The requested identifier already exists.', 'duplicate')
+            event = dict(body, id=event_id, status='confirmed', kind='calendar#event')
+            event.setdefault('iCalUID', f'{event_id}@google.com')
+            state.touch_event(event)
+            state.events[event_id] = event
+            return jsonify({k: v for k, v in event.items() if k != '_seq'})
+
+    @app.delete(f'{CALENDAR}/<event_id>')
+    def delete_event(calendar_id, event_id):
+        with state.lock:
+            event = state.events.get(event_id)
+            if event is None or event['status'] == 'cancelled':
+                return google_error(410, 'Resource has been deleted', 'deleted')
+            event['status'] = 'cancelled'
+            state.touch_event(event)
+        return '', 204
+
+    @app.get(CALENDAR)
+    def list_events(calendar_id):
+        sync_token = request.args.get('syncToken')
+        max_results = min(int(request.args.get('maxResults', 250)), 2500)
+        offset = int(request.args.get('pageToken') or 0)
+
+        with state.lock:
+            events = sorted(state.events.values(), key=lambda e: e['_seq'])
+            if sync_token:
+                if not sync_token.isdigit() or int(sync_token) > state.event_seq:
+                    return google_error(410, 'Sync token is no longer valid', 'fullSyncRequired')
+                events = [e for e in events if e['_seq'] > int(sync_token)]
+            else:
+                events = [e for e in events if e['status'] != 'cancelled']
+                time_min, time_max = request.args.get('timeMin'), request.args.get('timeMax')
+                if time_min:
+                    events = [e for e in events if _event_start(e) >= time_min]
+                if time_max:
+                    events = [e for e in events if _event_start(e) < time_max]
+            page = [{k: v for k, v in e.items() if k != '_seq'} for e in events[offset:offset + max_results]]
+            body = {'kind': 'calendar#events', 'items': page}
+            if offset + max_results < len(events):
+                body['nextPageToken'] = str(offset + max_results)
+            else:
+                body['nextSyncToken'] = str(state.event_seq)
+        return jsonify(body)
+
+    # --- Batch ---
+
+    def run_part(raw: bytes) -> Tuple[int, str, bytes]:
+        head, _, body = raw.replace(b'\r\n', b'\n').partition(b'\n\n')
+        request_line, *header_lines = head.decode('utf-8').split('\n')
+        method, target, _ = request_line.split(' ', 2)
+        headers = dict(line.split(':', 1) for line in header_lines if ':' in line)
+        headers = {name.strip(): value.strip() for name, value in headers.items()}
+        headers[BATCH_PART_HEADER] = '1'
+        with app.test_client() as client:
+            response = client.open(target, method=method, headers=headers, data=body)
+        return response.status_code, response.status, response.get_data()
+
+    def handle_batch():
+        envelope = b'Content-Type: ' + request.headers['Content-Type'].encode() + b'\r\n\r\n'
+        multipart = BytesParser(policy=HTTP).parsebytes(envelope + request.get_data())
+        boundary = f'batch_{uuid.uuid4().hex}'
+        chunks = []
+        for part in multipart.iter_parts():
+            content_id = part['Content-ID'].strip('<>')
+            status_code, status, body = run_part(part.get_payload(decode=True))
+            if (state.error_rate and status_code < 400
+                    and state.rng.random() < state.error_rate):
+                status, body = f'{state.error_status} Injected failure', json.dumps(
+                    {'error': {'code': state.error_status, 'message': 'Injected failure',
+                               'errors': [{'reason': state.error_reason}]}}).encode()
+            chunks.append(
+                f'--{boundary}\r\nContent-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n'
+                f'HTTP/1.1 {status}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n'.encode()
+                + body + b'\r\n'
+            )
+        payload = b''.join(chunks) + f'--{boundary}--\r\n'.encode()
+        return app.response_class(payload, mimetype=f'multipart/mixed; boundary={boundary}')
+
+    # Parts carry their own paths, so one handler serves every batch endpoint
+    app.add_url_rule('/batch', 'batch', handle_batch, methods=['POST'])
+    app.add_url_rule('/batch/gmail/v1', 'gmail_batch', handle_batch, methods=['POST'])
+    app.add_url_rule('/batch/calendar/v3', 'calendar_batch', handle_batch, methods=['POST'])
+
+    return app
+
+
+def serve(state: FakeGoogleState, host: str = '127.0.0.1', port: int = 0):
+    """
+    Start the fake API on a background thread and return the server; its
+    root URL is http://{host}:{server.server_port}/. Call server.shutdown()
+    when done.
+    """
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server(host, port, create_app(state), threaded=True)
+    threading.Thread(target=server.serve_forever, name='fake-google-api', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Gmail/Calendar API for offline benchmarks')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--messages', type=int, default=200, help='size of the synthetic mailbox')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--error-reason', default='backendError', help='e.g. rateLimitExceeded with 403')
+    args = parser.parse_args()
+
+    state = FakeGoogleState(
+        generate_mailbox(args.messages, seed=args.seed), latency=args.latency,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed,
+        error_reason=args.error_reason
+    )
+    print(f"Serving {args.messages} synthetic messages; set MYZTRIX_GOOGLE_API_ROOT=http://127.0.0.1:{args.port}/")
+    make_server('127.0.0.1', args.port, create_app(state), threaded=True).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
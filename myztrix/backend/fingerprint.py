@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from reply_stripper import strip_quoted
+from text_tokens import tokenize
+from thread_collapse import CONFIRMED, DECLINED
+
+logger = logging.getLogger(__name__)
+
+BITS = 64
+# Differing bits at which two fingerprints still count as the same email (about 95% similar)
+DEFAULT_MAX_DISTANCE = 3
+SHINGLE_SIZE = 3
+# Enough of the body to tell invites apart without hashing whole newsletters
+MAX_BODY_CHARS = 4000
+# Fingerprints kept on disk; the oldest are dropped first
+MAX_ENTRIES = 20000
+
+SUBJECT_PREFIX = re.compile(r'^(?:\s*(?:re|fwd?|aw|tr|wg|updated invitation|invitation)\s*:)+\s*', re.IGNORECASE)
+# From:/Date:/Subject:/To: lines of a forward header differ between copies of the same mail
+FORWARD_FIELD = re.compile(r'^\s*\*?(?:from|sent|date|to|cc|subject):\*?\s.*$', re.IGNORECASE | re.MULTILINE)
+FORWARD_MARKER = re.compile(r'^\s*(?:-{2,}\s*forwarded message\s*-{2,}|begin forwarded message:)\s*$',
+                            re.IGNORECASE | re.MULTILINE)
+
+# Tokens that place an email in time; copies must agree on all of them
+TEMPORAL_WORDS = frozenset(
+    'mon tue tues wed thu thur thurs fri sat sun monday tuesday wednesday thursday friday saturday sunday '
+    'jan feb mar apr jun jul aug sep sept oct nov dec january february march april may june july '
+    'august september october november december today tomorrow tonight noon midnight'.split()
+)
+
+
+def normalize(subject: str, body: str) -> List[str]:
+    """Tokens that identical invites share across forwards, resends and list copies."""
+    subject = SUBJECT_PREFIX.sub('', subject or '')
+    body = (body or '')[:MAX_BODY_CHARS]
+    # A forward's own note is not part of the email being forwarded
+    markers = list(FORWARD_MARKER.finditer(body))
+    if markers:
+        body = FORWARD_FIELD.sub('', body[markers[-1].end():])
+    body = strip_quoted(body)[0]
+    return tokenize(f'{subject} {body}')
+
+
+def temporal_key(tokens: List[str]) -> int:
+    """Hash of the date and time tokens, so a rescheduled copy never matches the original."""
+    temporal = sorted({t for t in tokens if t in TEMPORAL_WORDS or any(c.isdigit() for c in t)})
+    return zlib.crc32(' '.join(temporal).encode('utf-8'))
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(tokens: List[str]) -> int:
+    """64-bit SimHash of the token shingles; near-identical texts differ in few bits."""
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = [' '.join(tokens)] if tokens else []
+    else:
+        shingles = [' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+    counts = [0] * BITS
+    for shingle, weight in Counter(shingles).items():
+        value = _hash64(shingle)
+        for bit in range(BITS):
+            counts[bit] += weight if value >> bit & 1 else -weight
+
+    fingerprint = 0
+    for bit in range(BITS):
+        if counts[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def email_fingerprint(email: Dict) -> Tuple[int, int]:
+    """(SimHash, temporal key) of an email."""
+    tokens = normalize(email.get('subject', ''), email.get('body', ''))
+    return simhash(tokens), temporal_key(tokens)
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class FingerprintIndex:
+    """
+    SimHash index of decided emails with banded lookup.
+
+    The 64 bits are split into max_distance + 1 bands, so any fingerprint
+    within max_distance bits of a stored one matches it exactly on at least
+    one band; a lookup is a few dict probes plus a popcount per candidate.
+    A match must also agree exactly on its date and time tokens. An email
+    close enough to a decided one inherits its decision, and the user's
+    answers override what detection decided.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = -(-BITS // self.bands)
+        # email_id -> {'fingerprint', 'temporal', 'decision', 'updated'}
+        self.entries: Dict[str, Dict] = {}
+        self.buckets: List[Dict[int, Set[str]]] = [{} for _ in range(self.bands)]
+        self.stats: Counter = Counter()
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable fingerprint index {self.path}: {e}")
+            return
+        for email_id, entry in entries.items():
+            fingerprint = (int(entry['fingerprint'], 16), entry.get('temporal', 0))
+            self._insert(email_id, fingerprint, entry['decision'], entry.get('updated', 0))
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        newest = sorted(self.entries.items(), key=lambda item: item[1]['updated'])[-MAX_ENTRIES:]
+        data = {
+            email_id: {'fingerprint': f"{entry['fingerprint']:016x}", 'temporal': entry['temporal'],
+                       'decision': entry['decision'], 'updated': entry['updated']}
+            for email_id, entry in newest
+        }
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+
+    def _band_keys(self, fingerprint: int):
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, fingerprint >> (band * self.band_bits) & mask
+
+    def _insert(self, email_id: str, fingerprint: Tuple[int, int], decision: str, updated: float) -> None:
+        self._remove(email_id)
+        simhash_value, temporal = fingerprint
+        self.entries[email_id] = {
+            'fingerprint': simhash_value, 'temporal': temporal, 'decision': decision, 'updated': updated
+        }
+        for band, key in self._band_keys(simhash_value):
+            self.buckets[band].setdefault(key, set()).add(email_id)
+
+    def _remove(self, email_id: str) -> None:
+        entry = self.entries.pop(email_id, None)
+        if not entry:
+            return
+        for band, key in self._band_keys(entry['fingerprint']):
+            bucket = self.buckets[band].get(key)
+            if bucket:
+                bucket.discard(email_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+    def nearest(self, fingerprint: Tuple[int, int]) -> Optional[str]:
+        """Id of the closest stored email within max_distance bits and with the same dates, if any."""
+        simhash_value, temporal = fingerprint
+        best, best_distance = None, self.max_distance + 1
+        for band, key in self._band_keys(simhash_value):
+            for email_id in self.buckets[band].get(key, ()):
+                entry = self.entries[email_id]
+                if entry['temporal'] != temporal:
+                    continue
+                d = distance(simhash_value, entry['fingerprint'])
+                if d < best_distance:
+                    best, best_distance = email_id, d
+        return best
+
+    def lookup(self, email: Dict) -> Optional[str]:
+        """
+        Decision inherited from a near-duplicate of email, or None when it is new.
+        The fingerprint is kept so record() can store the decision taken for email.
+        """
+        fingerprint = email_fingerprint(email)
+        match = self.nearest(fingerprint)
+        if match is None or match == email['id']:
+            self._pending[email['id']] = fingerprint
+            return None
+        decision = self.entries[match]['decision']
+        self.stats[f'inherited_{decision}'] += 1
+        return decision
+
+    def record(self, email: Dict, decision: str) -> None:
+        fingerprint = self._pending.pop(email['id'], None)
+        if fingerprint is None:
+            fingerprint = email_fingerprint(email)
+        self._insert(email['id'], fingerprint, decision, datetime.now().timestamp())
+
+    def record_answers(self, confirmed: Dict[str, Dict], declined: Dict[str, Dict]) -> None:
+        """Apply the user's confirm/decline answers to the emails already indexed."""
+        for events, decision in ((confirmed, CONFIRMED), (declined, DECLINED)):
+            if not isinstance(events, dict):
+                continue
+            for email_id in events:
+                entry = self.entries.get(email_id)
+                if entry and entry['decision'] != decision:
+                    entry.update(decision=decision, updated=datetime.now().timestamp())
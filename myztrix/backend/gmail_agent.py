@@ -1,20 +1,25 @@
 import os
-import json
 import logging
-import base64
-from typing import Dict, List, Optional, Tuple
+import queue
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 import pathlib
 
-import dateparser
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+
+
+from api_executor import execute
+from google_services import services
+from gmail_batch import DEFAULT_BATCH_SIZE, batch_get_messages
+from gmail_sync import HistorySync
+from thread_collapse import ThreadDecisions
+from gmail_labels import LabelRegistry, ModifyBatcher
+from gmail_message import parse_message
+from email_triage import TRIAGE_THRESHOLD, triage_message_ids
+from event_detector import detect_event
+from calendar_batch import event_time, insert_event, with_event_id
 
 # Logging setup
 logging.basicConfig(
@@ -34,51 +39,56 @@ BASE_DIR = pathlib.Path(__file__).parent.resolve()  # Adjust if needed
 TOKEN_PATH = str(BASE_DIR / "credentials" / "token.json")
 CREDS_PATH = str(BASE_DIR / "credentials" / "credentials.json")
 
-MEETING_KEYWORDS = {
-    'meeting', 'call', 'appointment', 'schedule', 'calendar',
-    'invite', 'invitation', 'conference', 'discussion'
-}
+# Messages listed per page; Gmail allows up to 500
+UNREAD_PAGE_SIZE = 100
+
+# Mailbox address per token file, so each process asks Gmail once
+_account_emails: Dict[str, str] = {}
 
 class GmailAgent:
-    def __init__(self, credentials_path: str = CREDS_PATH, token_path: str = TOKEN_PATH):
+    def __init__(self, credentials_path: str = CREDS_PATH, token_path: str = TOKEN_PATH,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 triage_threshold: Optional[float] = TRIAGE_THRESHOLD,
+                 defer_writes: bool = False):
         self.credentials_path = credentials_path
         self.token_path = token_path
+        # Messages fetched per Gmail batch request; 1 falls back to one get per message
+        self.batch_size = batch_size
+        # Minimum metadata score before a full download; None downloads every message
+        self.triage_threshold = triage_threshold
+        # Queue read/label changes until flush_writes() instead of one modify per call
+        self.defer_writes = defer_writes
         self.credentials = None
         self.service = None
-
-        # NLTK setup — ensure required data is available
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-
-        self.stopwords = set(stopwords.words('english'))
+        self.labels: Optional[LabelRegistry] = None
+        self.modifications: Optional[ModifyBatcher] = None
+        self._account_email: Optional[str] = None
+        # Older messages of each collapsed thread, until its newest message has been analysed
+        self.held_back: Dict[str, List[str]] = {}
+        # Messages dealt with this cycle: marked read, or already decided; the rest are retried
+        self.settled: set = set()
 
     def authenticate(self) -> bool:
         try:
             if os.path.exists(self.token_path):
                 try:
-                    # This works better for token.json created by to_json()
-                    self.credentials = Credentials.from_authorized_user_file(self.token_path, SCOPES)
-                except Exception as e:
+                    # Read once per process; later agents reuse the shared, refreshed credentials
+                    self.credentials = services.credentials(self.token_path, SCOPES)
+                except ValueError as e:
                     logger.warning(f"Corrupted token.json. Re-authenticating. Cause: {str(e)}")
                     self.credentials = None
 
             if not self.credentials or not self.credentials.valid:
                 if self.credentials and self.credentials.expired and self.credentials.refresh_token:
+                    # Single-flight: saves the token, and waits instead of racing other refreshes
                     self.credentials.refresh(Request())
                 else:
                     flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, SCOPES)
-                    self.credentials = flow.run_local_server(port=0)
-
-                with open(self.token_path, 'w') as token:
-                    token.write(self.credentials.to_json())
+                    self.credentials = services.set_credentials(self.token_path, flow.run_local_server(port=0))
 
-            self.service = build('gmail', 'v1', credentials=self.credentials)
+            self.service = services.gmail(self.credentials)
+            self.labels = LabelRegistry(self.service)
+            self.modifications = ModifyBatcher(self.service, self.labels)
             logger.info("Authentication successful.")
             return True
 
@@ -86,128 +96,235 @@ class GmailAgent:
             logger.error(f"Authentication failed: {str(e)}")
             return False
 
-    def get_unread_emails(self) -> List[Dict]:
-        try:
-            results = self.service.users().messages().list(
-                userId='me',
-                labelIds=['UNREAD'],
-                q='in:inbox'
-            ).execute()
+    def account_email(self) -> str:
+        """Address of the authenticated mailbox, fetched once per process and token file."""
+        if not self._account_email:
+            if not _account_emails.get(self.token_path):
+                profile = execute(self.service.users().getProfile(userId='me'))
+                _account_emails[self.token_path] = profile.get('emailAddress', '')
+            self._account_email = _account_emails[self.token_path]
+        return self._account_email
 
-            messages = results.get('messages', [])
+    def get_unread_emails(self, on_triaged_out: Optional[Callable[[str], None]] = None) -> List[Dict]:
+        try:
             emails = []
-
-            for message in messages:
-                msg = self.service.users().messages().get(
-                    userId='me',
-                    id=message['id'],
-                    format='full'
-                ).execute()
-
-                headers = msg['payload'].get('headers', [])
-                subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
-                sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
-                date = next((h['value'] for h in headers if h['name'] == 'Date'), '')
-
-                body = ''
-                # Defensive checks for multipart or single-part emails
-                if 'parts' in msg['payload']:
-                    for part in msg['payload']['parts']:
-                        if part.get('mimeType') == 'text/plain':
-                            body_data = part.get('body', {}).get('data')
-                            if body_data:
-                                body = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-                            break
-                else:
-                    body_data = msg['payload'].get('body', {}).get('data')
-                    if body_data:
-                        body = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-
-                emails.append({
-                    'id': message['id'],
-                    'subject': subject,
-                    'sender': sender,
-                    'date': date,
-                    'body': body
-                })
-
+            for page, triaged_out in self._iter_unread_pages(self.service):
+                emails.extend(page)
+                for msg_id in triaged_out if on_triaged_out else []:
+                    on_triaged_out(msg_id)
             return emails
 
         except Exception as e:
             logger.error(f"Error fetching unread emails: {str(e)}")
             return []
 
-    def detect_event(self, email: Dict) -> Tuple[bool, float, Optional[Dict]]:
-        try:
-            text = f"{email['subject']} {email['body']}"
-            tokens = word_tokenize(text.lower())
-            tokens = [t for t in tokens if t not in self.stopwords]
-
-            keyword_matches = sum(1 for t in tokens if t in MEETING_KEYWORDS)
-            keyword_score = min(keyword_matches / 3, 1.0)
-
-            parsed_date = dateparser.parse(text, fuzzy=True)
-            date_score = 1.0 if parsed_date else 0.0
-
-            confidence = (keyword_score * 0.6) + (date_score * 0.4)
-
-            if confidence >= 0.6 and parsed_date:
-                event_details = {
-                    'title': email['subject'],
-                    'start_time': parsed_date.isoformat(),
-                    'end_time': (parsed_date + timedelta(hours=1)).isoformat(),
-                    'description': email['body'],
-                    'email_id': email['id']
-                }
-                return True, confidence, event_details
+    def iter_unread_emails(self, page_size: int = UNREAD_PAGE_SIZE, prefetch_pages: int = 1,
+                           on_triaged_out: Optional[Callable[[str], None]] = None) -> Iterator[Dict]:
+        """
+        Yield every unread inbox email, page by page. on_triaged_out is
+        called, on the caller's thread, with each id triage kept from
+        downloading; listing alone writes nothing to the mailbox.
+
+        A background thread lists and downloads up to prefetch_pages pages
+        ahead of the caller, so detection can start on the first page while
+        later ones are still in flight and at most a few pages are held in
+        memory. The thread uses its own Gmail service because the httplib2
+        transport behind self.service is not thread-safe.
+        """
+        pages: queue.Queue = queue.Queue(maxsize=max(1, prefetch_pages))
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
 
-            return False, confidence, None
+        def produce():
+            try:
+                service = services.gmail(self.credentials)
+                for page in self._iter_unread_pages(service, page_size):
+                    if not put(page):
+                        return
+                put(done)
+            except Exception as e:
+                put(e)
+
+        threading.Thread(target=produce, name='gmail-prefetch', daemon=True).start()
+        try:
+            while True:
+                page = pages.get()
+                if page is done:
+                    return
+                if isinstance(page, Exception):
+                    logger.error(f"Error fetching unread emails: {str(page)}")
+                    return
+                page, triaged_out = page
+                for msg_id in triaged_out if on_triaged_out else []:
+                    on_triaged_out(msg_id)
+                yield from page
+        finally:
+            stop.set()
+
+    def _iter_unread_pages(self, service, page_size: int = UNREAD_PAGE_SIZE) -> Iterator[Tuple[List[Dict], List[str]]]:
+        """(emails, triaged-out ids) per page of unread inbox mail."""
+        page_token = None
+        while True:
+            results = execute(service.users().messages().list(
+                userId='me',
+                labelIds=['UNREAD'],
+                q='in:inbox',
+                maxResults=page_size,
+                pageToken=page_token
+            ))
+
+            message_ids = [m['id'] for m in results.get('messages', [])]
+            if message_ids:
+                messages, triaged_out = self._fetch_messages(message_ids, service)
+                yield [parse_message(msg) for msg in messages], triaged_out
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    def get_new_emails(self, sync: HistorySync, threads: Optional[ThreadDecisions] = None,
+                       on_triaged_out: Optional[Callable[[str], None]] = None) -> List[Dict]:
+        """
+        Return unread emails added since the sync checkpoint (all unread mail on a full scan).
+        on_triaged_out is called with each id triage kept from downloading.
+        """
+        return list(self.iter_new_emails(sync, threads, on_triaged_out))
+
+    def iter_new_emails(self, sync: HistorySync, threads: Optional[ThreadDecisions] = None,
+                        on_triaged_out: Optional[Callable[[str], None]] = None) -> Iterator[Dict]:
+        """Like get_new_emails, but downloads and yields one batch at a time."""
+        try:
+            message_ids = sync.list_new_message_ids(self.service)
+            if threads is not None:
+                message_ids = self.collapse_threads(message_ids, sync.thread_ids, threads)
+            yield from self._iter_batches(message_ids, on_triaged_out)
 
         except Exception as e:
-            logger.error(f"Error detecting event: {str(e)}")
-            return False, 0.0, None
+            logger.error(f"Error syncing new emails: {str(e)}")
+            sync.rollback()
+
+    def collapse_threads(self, message_ids: List[str], thread_ids: Dict[str, str],
+                         threads: ThreadDecisions) -> List[str]:
+        """
+        Reduce message_ids to the newest message of each thread not declined before.
+        Declined threads are marked read without being downloaded. Older
+        messages are held back until resolve_thread() knows whether the
+        newest one carried the thread's event.
+        """
+        to_fetch, skipped = threads.filter(message_ids, thread_ids)
+        kept_threads = {thread_ids.get(msg_id) for msg_id in to_fetch} - {None}
+        for msg_id in skipped:
+            thread_id = thread_ids.get(msg_id)
+            if thread_id in kept_threads:
+                self.held_back.setdefault(thread_id, []).append(msg_id)
+            else:
+                self.mark_as_read(msg_id)
+        return to_fetch
+
+    def resolve_thread(self, thread_id: Optional[str], found_event: bool) -> None:
+        """
+        Settle the messages held back for thread_id once its newest message
+        was analysed: marked read unseen if that message held the event, else
+        left for iter_held_back_emails(), because a reply quotes away the
+        invite it answers.
+        """
+        if found_event and thread_id:
+            for msg_id in self.held_back.pop(thread_id, []):
+                self.mark_as_read(msg_id)
+
+    def iter_held_back_emails(self, on_triaged_out: Optional[Callable[[str], None]] = None) -> Iterator[Dict]:
+        """Download the held-back messages of threads whose newest message yielded no event."""
+        message_ids = [msg_id for older in self.held_back.values() for msg_id in older]
+        self.held_back = {}
+        yield from self._iter_batches(message_ids, on_triaged_out)
+
+    def _iter_batches(self, message_ids: List[str],
+                      on_triaged_out: Optional[Callable[[str], None]]) -> Iterator[Dict]:
+        step = max(1, self.batch_size)
+        for start in range(0, len(message_ids), step):
+            messages, triaged_out = self._fetch_messages(message_ids[start:start + step])
+            for msg_id in triaged_out if on_triaged_out else []:
+                on_triaged_out(msg_id)
+            for msg in messages:
+                yield parse_message(msg)
+
+    def _fetch_messages(self, message_ids: List[str], service=None) -> Tuple[List[Dict], List[str]]:
+        """
+        Full messages for the ids that pass triage, and the ids triaged out.
+        Writes nothing: this also runs on the prefetch thread, which must not
+        touch self.service or the queued modifications.
+        """
+        service = service or self.service
+        triaged_out: List[str] = []
+        if self.triage_threshold is not None:
+            passed = triage_message_ids(
+                service, message_ids, threshold=self.triage_threshold, batch_size=max(1, self.batch_size)
+            )
+            kept = set(passed)
+            triaged_out = [msg_id for msg_id in message_ids if msg_id not in kept]
+            message_ids = passed
+
+        if self.batch_size > 1:
+            return batch_get_messages(service, message_ids, format='full', batch_size=self.batch_size), triaged_out
+
+        return [
+            execute(service.users().messages().get(userId='me', id=msg_id, format='full'))
+            for msg_id in message_ids
+        ], triaged_out
+
+    def detect_event(self, email: Dict) -> Tuple[bool, float, Optional[Dict]]:
+        return detect_event(email)
 
     def mark_as_read(self, email_id: str) -> bool:
+        done = self._modify(email_id, remove_label_ids=['UNREAD'], action='marking email as read')
+        if done:
+            self.settled.add(email_id)
+        return done
+
+    def add_label(self, email_id: str, label_name: str) -> bool:
         try:
-            self.service.users().messages().modify(
-                userId='me',
-                id=email_id,
-                body={'removeLabelIds': ['UNREAD']}
-            ).execute()
-            return True
+            label_id = self.labels.get_id(label_name)
         except Exception as e:
-            logger.error(f"Error marking email as read: {str(e)}")
+            logger.error(f"Error adding label: {str(e)}")
             return False
+        return self._modify(email_id, add_label_ids=[label_id], action='adding label')
+
+    def _modify(self, email_id: str, add_label_ids: Optional[List[str]] = None,
+                remove_label_ids: Optional[List[str]] = None, action: str = 'modifying email') -> bool:
+        if self.defer_writes:
+            self.modifications.add(email_id, add_label_ids or [], remove_label_ids or [])
+            return True
 
-    def add_label(self, email_id: str, label_name: str) -> bool:
         try:
-            labels_response = self.service.users().labels().list(userId='me').execute()
-            labels = labels_response.get('labels', [])
-            label_id = None
-
-            for label in labels:
-                if label.get('name') == label_name:
-                    label_id = label.get('id')
-                    break
-
-            if not label_id:
-                created_label = self.service.users().labels().create(
-                    userId='me',
-                    body={'name': label_name}
-                ).execute()
-                label_id = created_label.get('id')
-
-            self.service.users().messages().modify(
+            execute(self.service.users().messages().modify(
                 userId='me',
                 id=email_id,
-                body={'addLabelIds': [label_id]}
-            ).execute()
+                body={'addLabelIds': add_label_ids or [], 'removeLabelIds': remove_label_ids or []}
+            ))
             return True
-
         except Exception as e:
-            logger.error(f"Error adding label: {str(e)}")
+            logger.error(f"Error {action}: {str(e)}")
             return False
 
+    def flush_writes(self) -> int:
+        """Send the read/label changes queued while defer_writes is on; returns messages written."""
+        if not self.modifications:
+            return 0
+        return self.modifications.flush()
+
+    def pending_writes(self) -> int:
+        """Messages whose queued changes have not been written, e.g. after a failed flush."""
+        return len(self.modifications) if self.modifications else 0
+
 
 def add_event_to_calendar(event: Dict) -> bool:
     try:
@@ -215,15 +332,7 @@ def add_event_to_calendar(event: Dict) -> bool:
             logger.error("Token file not found for calendar access.")
             return False
 
-        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
-
-        if creds and creds.expired and creds.refresh_token:
-            logger.info("[INFO] Refreshing expired token...")
-            creds.refresh(Request())
-            with open(TOKEN_PATH, "w") as token:
-                token.write(creds.to_json())
-
-        service = build("calendar", "v3", credentials=creds)
+        service = services.calendar(services.credentials(TOKEN_PATH, SCOPES))
 
         start_time = event.get("start_time") or datetime.utcnow().isoformat() + 'Z'
         end_time = event.get("end_time") or (datetime.utcnow() + timedelta(hours=1)).isoformat() + 'Z'
@@ -232,17 +341,12 @@ def add_event_to_calendar(event: Dict) -> bool:
             "summary": event.get("title", "New Event"),
             "location": event.get("location", ""),
             "description": event.get("description", ""),
-            "start": {
-                "dateTime": start_time,
-                "timeZone": "UTC",
-            },
-            "end": {
-                "dateTime": end_time,
-                "timeZone": "UTC",
-            },
+            "start": event_time(start_time, event.get("timezone")),
+            "end": event_time(end_time, event.get("timezone")),
         }
 
-        service.events().insert(calendarId="primary", body=calendar_event).execute()
+        # Re-adding the same detected event is a conflict on its id, not a duplicate
+        insert_event(service, with_event_id(calendar_event, event.get("email_id")))
         logger.info(f"✅ Event added to calendar: {calendar_event['summary']}")
         return True
 
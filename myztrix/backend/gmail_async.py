@@ -0,0 +1,236 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import aiohttp
+from google.auth.transport.requests import Request
+
+from api_executor import RATE_LIMIT_REASONS, RETRYABLE_STATUSES, backoff_delay, executor
+from gmail_message import parse_message
+from email_triage import TRIAGE_FIELDS, TRIAGE_HEADERS, TRIAGE_THRESHOLD, score_metadata
+from google_services import api_root
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 20
+DEFAULT_TIMEOUT = 30.0
+
+
+def gmail_api_root() -> str:
+    """Base URL of the Gmail user endpoints, read when a client is made so MYZTRIX_GOOGLE_API_ROOT applies."""
+    return (api_root() or 'https://gmail.googleapis.com/') + 'gmail/v1/users/me'
+
+
+async def _is_rate_limited(resp: aiohttp.ClientResponse) -> bool:
+    """403 with a rate-limit reason, which api_executor.is_retryable also retries."""
+    try:
+        error = (await resp.json(content_type=None)).get('error', {})
+    except (ValueError, aiohttp.ClientError):
+        return False
+    details = (error.get('errors') or []) + (error.get('details') or [])
+    return any(isinstance(detail, dict) and detail.get('reason') in RATE_LIMIT_REASONS for detail in details)
+
+
+class AsyncGmailClient:
+    """
+    asyncio Gmail client for the list/get/modify calls the agent makes.
+
+    Requests share one pooled aiohttp session, at most `concurrency` are in
+    flight at once, and each is bounded by `timeout` seconds. Use it as an
+    async context manager so the connection pool is closed afterwards.
+    """
+
+    def __init__(self, credentials, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT, api_root: Optional[str] = None):
+        self.credentials = credentials
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.api_root = (api_root or gmail_api_root()).rstrip('/')
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> 'AsyncGmailClient':
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._refresh_lock = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def _refresh_token(self, force: bool = False) -> None:
+        async with self._refresh_lock:
+            if force or not self.credentials.valid:
+                # google-auth refreshes synchronously; keep it off the event loop
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.credentials.refresh, Request())
+
+    async def _request(self, method: str, path: str, method_id: str,
+                       params=None, json: Optional[Dict] = None) -> Dict:
+        if not self.credentials.valid:
+            await self._refresh_token()
+
+        attempt = 0
+        refreshed = False
+        async with self._semaphore:
+            while True:
+                # Share the process-wide quota buckets with the synchronous clients
+                delay = executor.reserve(method_id)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                headers = {'Authorization': f'Bearer {self.credentials.token}'}
+                try:
+                    async with self._session.request(
+                        method, f'{self.api_root}/{path}', params=params, json=json, headers=headers
+                    ) as resp:
+                        if resp.status == 401 and not refreshed:
+                            refreshed = True
+                            await self._refresh_token(force=True)
+                            continue
+                        retryable = resp.status in RETRYABLE_STATUSES or (
+                            resp.status == 403 and await _is_rate_limited(resp))
+                        if not retryable or attempt >= executor.max_retries:
+                            resp.raise_for_status()
+                            return await resp.json()
+                        retry_after = resp.headers.get('Retry-After')
+                        retry_delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+                        if resp.status in (403, 429):
+                            executor.throttled[method_id] += 1
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                    # Timeouts and dropped connections are retried like 5xx responses
+                    if attempt >= executor.max_retries:
+                        raise
+                    logger.warning(f"{method_id} failed ({type(e).__name__}), retrying")
+                    retry_delay = None
+                executor.retries[method_id] += 1
+                attempt += 1
+
+                await asyncio.sleep(retry_delay if retry_delay is not None else backoff_delay(attempt - 1))
+
+    async def list_message_ids(self, label_ids: List[str], q: Optional[str] = None,
+                               page_size: int = 100) -> AsyncIterator[str]:
+        page_token = None
+        while True:
+            params = [('labelIds', label) for label in label_ids] + [('maxResults', str(page_size))]
+            if q:
+                params.append(('q', q))
+            if page_token:
+                params.append(('pageToken', page_token))
+
+            results = await self._request('GET', 'messages', 'gmail.users.messages.list', params=params)
+            for message in results.get('messages', []):
+                yield message['id']
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    async def get_message(self, msg_id: str, format: str = 'full',
+                          metadata_headers: Optional[List[str]] = None,
+                          fields: Optional[str] = None) -> Dict:
+        params = [('format', format)]
+        params += [('metadataHeaders', header) for header in metadata_headers or []]
+        if fields:
+            params.append(('fields', fields))
+        return await self._request('GET', f'messages/{msg_id}', 'gmail.users.messages.get', params=params)
+
+    async def modify_message(self, msg_id: str, add_label_ids: Optional[List[str]] = None,
+                             remove_label_ids: Optional[List[str]] = None) -> Dict:
+        body = {'addLabelIds': add_label_ids or [], 'removeLabelIds': remove_label_ids or []}
+        return await self._request('POST', f'messages/{msg_id}/modify', 'gmail.users.messages.modify', json=body)
+
+    async def _gather_messages(self, message_ids: List[str], **kwargs) -> List[Dict]:
+        results = await asyncio.gather(
+            *(self.get_message(msg_id, **kwargs) for msg_id in message_ids),
+            return_exceptions=True
+        )
+        messages = []
+        for msg_id, result in zip(message_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching message {msg_id}: {str(result)}")
+            else:
+                messages.append(result)
+        return messages
+
+    async def fetch_emails(self, message_ids: List[str],
+                           triage_threshold: Optional[float] = TRIAGE_THRESHOLD,
+                           on_triaged_out: Optional[Callable[[str], None]] = None) -> List[Dict]:
+        """
+        Download message_ids concurrently and return email dicts in input order.
+        on_triaged_out is called with each id that triage keeps from downloading.
+        """
+        if triage_threshold is not None:
+            metadata = await self._gather_messages(
+                message_ids, format='metadata', metadata_headers=TRIAGE_HEADERS, fields=TRIAGE_FIELDS
+            )
+            scores = {msg['id']: score_metadata(msg) for msg in metadata}
+            passed = [m for m in message_ids if scores.get(m, triage_threshold) >= triage_threshold]
+            if on_triaged_out:
+                kept = set(passed)
+                for msg_id in message_ids:
+                    if msg_id not in kept:
+                        on_triaged_out(msg_id)
+            message_ids = passed
+
+        return [parse_message(msg) for msg in await self._gather_messages(message_ids, format='full')]
+
+    async def fetch_unread_emails(self, triage_threshold: Optional[float] = TRIAGE_THRESHOLD) -> List[Dict]:
+        """Async equivalent of GmailAgent.get_unread_emails."""
+        message_ids = [msg_id async for msg_id in self.list_message_ids(['UNREAD'], q='in:inbox')]
+        return await self.fetch_emails(message_ids, triage_threshold=triage_threshold)
+
+
+def fetch_emails(credentials, message_ids: List[str], concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT, **kwargs) -> List[Dict]:
+    """Fetch message_ids on a private event loop; for synchronous callers such as run_agent."""
+    async def run():
+        async with AsyncGmailClient(credentials, concurrency=concurrency, timeout=timeout) as client:
+            return await client.fetch_emails(message_ids, **kwargs)
+
+    return asyncio.run(run())
+
+
+def iter_emails(credentials, message_ids: List[str], chunk_size: int = DEFAULT_CONCURRENCY,
+                concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DEFAULT_TIMEOUT,
+                **kwargs) -> Iterator[Dict]:
+    """
+    Like fetch_emails, but downloads chunk_size messages at a time and
+    yields each chunk before fetching the next, so detection starts on the
+    first chunk and only one chunk of bodies is held in memory. One event
+    loop and connection pool serve every chunk.
+    """
+    async def chunks():
+        async with AsyncGmailClient(credentials, concurrency=concurrency, timeout=timeout) as client:
+            step = max(1, chunk_size)
+            for start in range(0, len(message_ids), step):
+                yield await client.fetch_emails(message_ids[start:start + step], **kwargs)
+
+    loop = asyncio.new_event_loop()
+    pending = chunks()
+    try:
+        while True:
+            try:
+                chunk = loop.run_until_complete(pending.__anext__())
+            except StopAsyncIteration:
+                return
+            yield from chunk
+    finally:
+        # Closes the session even when the caller stops early
+        loop.run_until_complete(pending.aclose())
+        loop.close()
+
+
+def fetch_unread_emails(credentials, concurrency: int = DEFAULT_CONCURRENCY,
+                        timeout: float = DEFAULT_TIMEOUT, **kwargs) -> List[Dict]:
+    """Drop-in replacement for GmailAgent.get_unread_emails backed by AsyncGmailClient."""
+    async def run():
+        async with AsyncGmailClient(credentials, concurrency=concurrency, timeout=timeout) as client:
+            return await client.fetch_unread_emails(**kwargs)
+
+    return asyncio.run(run())
@@ -0,0 +1,73 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from api_executor import execute, executor
+
+logger = logging.getLogger(__name__)
+
+# Gmail rejects batches of more than 100 calls and starts rate limiting well
+# before that, so 50 is the size Google recommends.
+MAX_BATCH_SIZE = 100
+DEFAULT_BATCH_SIZE = 50
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _get_request(service, msg_id: str, format: str, metadata_headers: Optional[List[str]],
+                 fields: Optional[str]):
+    kwargs = {'userId': 'me', 'id': msg_id, 'format': format}
+    if metadata_headers:
+        kwargs['metadataHeaders'] = metadata_headers
+    if fields:
+        kwargs['fields'] = fields
+    return service.users().messages().get(**kwargs)
+
+
+def batch_get_messages(service, message_ids: Iterable[str], format: str = 'full',
+                       batch_size: int = DEFAULT_BATCH_SIZE,
+                       metadata_headers: Optional[List[str]] = None,
+                       fields: Optional[str] = None) -> List[Dict]:
+    """
+    Fetch Gmail messages through batch HTTP requests.
+
+    Returns the message resources in the order of message_ids. Sub-requests
+    that fail inside a batch are retried one at a time so a single bad
+    message never costs the rest of the batch; messages that still fail
+    are logged and left out. fields is passed through as a partial-response
+    mask to trim what Gmail sends back.
+    """
+    ids = list(dict.fromkeys(message_ids))
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    fetched: Dict[str, Dict] = {}
+    failed: List[str] = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            failed.append(request_id)
+        else:
+            fetched[request_id] = response
+
+    for chunk in _chunks(ids, batch_size):
+        batch = service.new_batch_http_request(callback=on_response)
+        for msg_id in chunk:
+            batch.add(_get_request(service, msg_id, format, metadata_headers, fields), request_id=msg_id)
+        try:
+            # Every call inside a batch is charged against the quota individually
+            executor.acquire('gmail.users.messages.get', len(chunk))
+            batch.execute()
+        except HttpError as e:
+            logger.warning(f"Batch of {len(chunk)} message gets failed, retrying individually: {e}")
+            failed.extend(msg_id for msg_id in chunk if msg_id not in fetched and msg_id not in failed)
+
+    for msg_id in failed:
+        try:
+            fetched[msg_id] = execute(_get_request(service, msg_id, format, metadata_headers, fields))
+        except (HttpError, OSError) as e:
+            logger.error(f"Error fetching message {msg_id}: {e}")
+
+    return [fetched[msg_id] for msg_id in ids if msg_id in fetched]
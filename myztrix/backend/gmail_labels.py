@@ -0,0 +1,106 @@
+import time
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from api_executor import execute
+
+logger = logging.getLogger(__name__)
+
+# batchModify accepts at most 1000 message ids per call
+MAX_BATCH_MODIFY_IDS = 1000
+LABEL_CACHE_TTL = 3600
+
+
+class LabelRegistry:
+    """
+    Caches Gmail label name -> id mappings so labelling a message costs one
+    labels().list per TTL instead of one per call. Labels that do not exist
+    yet are created on first use.
+    """
+
+    def __init__(self, service, ttl: float = LABEL_CACHE_TTL):
+        self.service = service
+        self.ttl = ttl
+        self._ids: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+
+    def refresh(self) -> None:
+        response = execute(self.service.users().labels().list(userId='me'))
+        self._ids = {label['name']: label['id'] for label in response.get('labels', [])}
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Drop the cache, e.g. after a label was renamed or deleted elsewhere."""
+        self._ids = {}
+        self._loaded_at = None
+
+    def get_id(self, name: str, create: bool = True) -> Optional[str]:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh()
+
+        if name not in self._ids and create:
+            created = execute(self.service.users().labels().create(userId='me', body={'name': name}))
+            self._ids[name] = created['id']
+
+        return self._ids.get(name)
+
+
+class ModifyBatcher:
+    """
+    Collects read-state and label changes during a cycle and writes them with
+    messages().batchModify, one call per distinct (add, remove) label set.
+    """
+
+    def __init__(self, service, labels: Optional[LabelRegistry] = None):
+        self.service = service
+        self.labels = labels
+        self._changes: Dict[str, Tuple[set, set]] = {}
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def add(self, msg_id: str, add_label_ids: Iterable[str] = (), remove_label_ids: Iterable[str] = ()) -> None:
+        add, remove = self._changes.setdefault(msg_id, (set(), set()))
+        # The most recent request for a label wins
+        for label_id in add_label_ids:
+            add.add(label_id)
+            remove.discard(label_id)
+        for label_id in remove_label_ids:
+            remove.add(label_id)
+            add.discard(label_id)
+
+    def _groups(self) -> Dict[Tuple[FrozenSet[str], FrozenSet[str]], List[str]]:
+        groups: Dict[Tuple[FrozenSet[str], FrozenSet[str]], List[str]] = {}
+        for msg_id, (add, remove) in self._changes.items():
+            groups.setdefault((frozenset(add), frozenset(remove)), []).append(msg_id)
+        return groups
+
+    def flush(self) -> int:
+        """
+        Write all queued changes; returns the number of messages modified.
+        Groups that fail stay queued for the next flush.
+        """
+        modified = 0
+        self._changes = {msg_id: change for msg_id, change in self._changes.items() if any(change)}
+        for (add, remove), msg_ids in self._groups().items():
+            for start in range(0, len(msg_ids), MAX_BATCH_MODIFY_IDS):
+                chunk = msg_ids[start:start + MAX_BATCH_MODIFY_IDS]
+                try:
+                    execute(self.service.users().messages().batchModify(
+                        userId='me',
+                        body={'ids': chunk, 'addLabelIds': sorted(add), 'removeLabelIds': sorted(remove)}
+                    ))
+                except HttpError as e:
+                    logger.error(f"Error modifying {len(chunk)} messages: {str(e)}")
+                    # A stale label id is the usual cause of a 400 here
+                    if e.resp.status == 400 and self.labels:
+                        self.labels.invalidate()
+                    continue
+
+                for msg_id in chunk:
+                    self._changes.pop(msg_id, None)
+                modified += len(chunk)
+
+        return modified
@@ -0,0 +1,27 @@
+from typing import Dict
+
+from ics_parser import parse_vevent
+from mime_walker import extract_calendar, extract_text
+
+
+def parse_message(msg: Dict) -> Dict:
+    """Turn a Gmail message resource fetched with format='full' into the agent's email dict."""
+    headers = msg['payload'].get('headers', [])
+    subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
+    sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
+    date = next((h['value'] for h in headers if h['name'] == 'Date'), '')
+
+    body = extract_text(msg['payload'])
+    # Invites carry exact times in a text/calendar part; detection uses it instead of NLP
+    ics = extract_calendar(msg['payload'])
+    calendar_event = parse_vevent(ics) if ics else None
+
+    return {
+        'id': msg['id'],
+        'thread_id': msg.get('threadId'),
+        'subject': subject,
+        'sender': sender,
+        'date': date,
+        'body': body,
+        'calendar_event': calendar_event
+    }
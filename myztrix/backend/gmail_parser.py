@@ -1,21 +1,16 @@
 # gmail_parser.py
 import os
-import json
 import logging
-import base64
-from typing import Dict, List, Optional, Tuple
+from typing import Dict
 from datetime import datetime, timedelta
 import pathlib
 
-import dateparser
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+
+
+from google_services import services
+from calendar_batch import event_time, insert_event, with_event_id
 
 logging.basicConfig(
     level=logging.INFO,
@@ -35,11 +30,6 @@ SCOPES = [
 TOKEN_PATH = BASE_DIR / 'credentials' / 'token.json'
 CREDS_PATH = BASE_DIR / 'Config' / 'credentials.json'
 
-MEETING_KEYWORDS = {
-    'meeting', 'call', 'appointment', 'schedule', 'calendar',
-    'invite', 'invitation', 'conference', 'discussion'
-}
-
 class GmailAgent:
     def __init__(self, credentials_path: pathlib.Path = CREDS_PATH, token_path: pathlib.Path = TOKEN_PATH):
         self.credentials_path = credentials_path
@@ -47,25 +37,12 @@ class GmailAgent:
         self.credentials = None
         self.service = None
 
-        # NLTK setup
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-
-        self.stopwords = set(stopwords.words('english'))
-
     def authenticate(self) -> bool:
         try:
             if self.token_path.exists():
                 try:
-                    with open(self.token_path, 'r') as token_file:
-                        self.credentials = Credentials.from_authorized_user_info(json.load(token_file), SCOPES)
-                except Exception as e:
+                    self.credentials = services.credentials(self.token_path, SCOPES)
+                except ValueError as e:
                     logger.warning(f"Corrupted token.json. Re-authenticating. Cause: {str(e)}")
                     self.credentials = None
 
@@ -74,13 +51,9 @@ class GmailAgent:
                     self.credentials.refresh(Request())
                 else:
                     flow = InstalledAppFlow.from_client_secrets_file(str(self.credentials_path), SCOPES)
-                    self.credentials = flow.run_local_server(port=0)
-
-                # Save new token
-                with open(self.token_path, 'w') as token_file:
-                    token_file.write(self.credentials.to_json())
+                    self.credentials = services.set_credentials(self.token_path, flow.run_local_server(port=0))
 
-            self.service = build('gmail', 'v1', credentials=self.credentials)
+            self.service = services.gmail(self.credentials)
             logger.info("Authentication successful.")
             return True
 
@@ -92,37 +65,22 @@ class GmailAgent:
 
 def add_event_to_calendar(event: Dict) -> bool:
     try:
-        creds = None
-
-        if TOKEN_PATH.exists():
-            creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), ["https://www.googleapis.com/auth/calendar"])
-
-        if creds and creds.expired and creds.refresh_token:
-            logger.info("[INFO] Refreshing expired token...")
-            creds.refresh(Request())
-            with open(TOKEN_PATH, "w") as token_file:
-                token_file.write(creds.to_json())
-
-        service = build("calendar", "v3", credentials=creds)
+        service = services.calendar(services.credentials(TOKEN_PATH, ["https://www.googleapis.com/auth/calendar"]))
 
-        start_time = event.get("start_time") or datetime.now().isoformat()
-        end_time = event.get("end_time") or (datetime.now() + timedelta(hours=1)).isoformat()
+        start_time = event.get("start_time") or datetime.utcnow().isoformat()
+        end_time = event.get("end_time") or (datetime.utcnow() + timedelta(hours=1)).isoformat()
 
         calendar_event = {
             "summary": event.get("title", "New Event"),
             "location": event.get("location", ""),
             "description": event.get("description", ""),
-            "start": {
-                "dateTime": start_time,
-                "timeZone": "Africa/Johannesburg",  # Adjust to your actual timezone or make configurable
-            },
-            "end": {
-                "dateTime": end_time,
-                "timeZone": "Africa/Johannesburg",
-            },
+            # Naive times are UTC, as on every other insert path
+            "start": event_time(start_time, event.get("timezone")),
+            "end": event_time(end_time, event.get("timezone")),
         }
 
-        created_event = service.events().insert(calendarId="primary", body=calendar_event).execute()
+        # Re-adding the same detected event is a conflict on its id, not a duplicate
+        created_event = insert_event(service, with_event_id(calendar_event, event.get("email_id")))
         logger.info(f"Event created: {created_event.get('htmlLink')}")
         return True
 
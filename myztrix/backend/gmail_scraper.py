@@ -1,74 +1,47 @@
-import base64
 import datetime
-from googleapiclient.discovery import build
 from email import message_from_bytes
-from bs4 import BeautifulSoup
-import dateparser
 import os
-
-TRIGGER_KEYWORDS = ['meeting', 'call', 'talk', 'presentation', 'event', 'trip', 'flight', 'reservation']
+import itertools
+
+from api_executor import execute
+from date_cache import parse_date
+from date_grammar import find_spans, parse_span
+from google_services import services
+from ics_parser import parse_vevent
+from mime_walker import extract_calendar, extract_text
+from gmail_batch import DEFAULT_BATCH_SIZE, batch_get_messages
+from email_triage import TRIAGE_THRESHOLD, triage_message_ids
+from keywords import TRIGGERS
+from reply_stripper import clean_body
 
 def get_gmail_service(creds=None):
     """
     Return the Gmail API service object.
     If creds provided, use them; else load from token.json.
     """
-    from google.oauth2.credentials import Credentials
-
     if creds:
-        return build('gmail', 'v1', credentials=creds)
+        return services.gmail(creds)
 
     if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file(
-            'token.json',
-            ['https://www.googleapis.com/auth/gmail.readonly']
-        )
-        return build('gmail', 'v1', credentials=creds)
+        creds = services.credentials('token.json', ['https://www.googleapis.com/auth/gmail.readonly'])
+        return services.gmail(creds)
     else:
         raise Exception("token.json not found. Run OAuth flow first.")
 
 def extract_email_text(message_payload):
     """Extract plain text or fallback from HTML from Gmail message payload."""
-    if not message_payload:
-        return ''
-    parts = message_payload.get('parts', [])
-    if not parts:
-        # Sometimes message body is directly in 'body'
-        if 'body' in message_payload and 'data' in message_payload['body']:
-            data = message_payload['body']['data']
-            text = base64.urlsafe_b64decode(data).decode('utf-8')
-            return text
-        return ''
-
-    for part in parts:
-        mime = part.get('mimeType', '')
-        data = part.get('body', {}).get('data', None)
-        if not data:
-            continue
-        decoded_bytes = base64.urlsafe_b64decode(data)
-        if mime == 'text/plain':
-            return decoded_bytes.decode('utf-8', errors='ignore')
-        elif mime == 'text/html':
-            html = decoded_bytes.decode('utf-8', errors='ignore')
-            soup = BeautifulSoup(html, 'html.parser')
-            return soup.get_text()
-    return ''
+    return extract_text(message_payload)
 
 def extract_event_candidates(text):
-    """Return list of lines containing any trigger keyword (case-insensitive)."""
+    """Return list of lines containing any trigger keyword (case-insensitive), ignoring quoted history."""
     if not text:
         return []
-    lines = text.splitlines()
-    event_lines = []
-    for line in lines:
-        if any(keyword in line.lower() for keyword in TRIGGER_KEYWORDS):
-            event_lines.append(line.strip())
-    return event_lines
+    return TRIGGERS.matching_lines(clean_body(text))
 
 def parse_event_details(event_line):
     """Parse date/time from line; return event dict or None."""
-    parsed_date = dateparser.parse(event_line, settings={'PREFER_DATES_FROM': 'future'})
-    if not parsed_date:
+    span = parse_span(event_line, settings={'PREFER_DATES_FROM': 'future'})
+    if not span:
         return None
 
     summary = (event_line[:80] + '...') if len(event_line) > 80 else event_line
@@ -76,46 +49,113 @@ def parse_event_details(event_line):
         'summary': summary,
         'description': event_line,
         'location': '',
-        'start_time': parsed_date,
-        'end_time': parsed_date + datetime.timedelta(hours=1),
+        'start_time': span.start,
+        'end_time': span.end or span.start + datetime.timedelta(hours=1),
     }
 
-def list_unread_messages(service, max_results=10):
+def parse_calendar_invite(message_payload):
     """
-    Return a list of unread Gmail messages from the inbox.
+    Return an event dict straight from a text/calendar part, or None.
+    Invites carry exact DTSTART/DTEND, so no text parsing is needed.
+    Cancellations and replies come back with actionable False: the email
+    is about an event, but there is nothing to add.
     """
-    results = service.users().messages().list(
-        userId='me',
-        labelIds=['INBOX', 'UNREAD'],
-        maxResults=max_results
-    ).execute()
+    ics = extract_calendar(message_payload)
+    invite = parse_vevent(ics) if ics else None
+    if not invite:
+        return None
 
-    messages = results.get('messages', [])
-    return messages
+    return {
+        'summary': invite['title'],
+        'description': invite['description'],
+        'location': invite['location'],
+        'start_time': invite['start_time'],
+        'end_time': invite['end_time'],
+        'ical_uid': invite['uid'],
+        'all_day': invite['all_day'],
+        'timezone': invite['timezone'],
+        'actionable': invite['actionable'],
+    }
+
+def iter_unread_messages(service, page_size=100):
+    """
+    Yield unread Gmail message stubs ({'id', 'threadId'}) from the inbox,
+    following nextPageToken until every page has been read.
+    """
+    page_token = None
+    while True:
+        results = execute(service.users().messages().list(
+            userId='me',
+            labelIds=['INBOX', 'UNREAD'],
+            maxResults=page_size,
+            pageToken=page_token
+        ))
+
+        yield from results.get('messages', [])
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return
+
+def list_unread_messages(service, max_results=None):
+    """
+    Return a list of unread Gmail messages from the inbox.
+    max_results=None returns every unread message.
+    """
+    return list(itertools.islice(iter_unread_messages(service), max_results))
 
 def get_message(service, msg_id, format='full'):
     """
     Fetch a Gmail message by ID.
     """
-    message = service.users().messages().get(
+    message = execute(service.users().messages().get(
         userId='me',
         id=msg_id,
         format=format
-    ).execute()
+    ))
     return message
 
-def scan_recent_messages(creds, max_results=10):
+def get_messages(service, msg_ids, format='full', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Fetch several Gmail messages by ID using batch requests.
+    Messages that cannot be fetched are left out of the result.
+    """
+    return batch_get_messages(service, msg_ids, format=format, batch_size=batch_size)
+
+def iter_messages(service, messages, format='full', batch_size=DEFAULT_BATCH_SIZE,
+                  triage_threshold=TRIAGE_THRESHOLD):
+    """
+    Download messages from an iterable of stubs one batch at a time,
+    yielding each full message as soon as its batch arrives.
+    Unless triage_threshold is None, a cheap metadata pass decides which
+    messages are worth downloading in full.
+    """
+    stubs = iter(messages)
+    while True:
+        chunk = [msg['id'] for msg in itertools.islice(stubs, batch_size)]
+        if not chunk:
+            return
+        if triage_threshold is not None:
+            chunk = triage_message_ids(service, chunk, threshold=triage_threshold, batch_size=batch_size)
+        yield from get_messages(service, chunk, format=format, batch_size=batch_size)
+
+def scan_recent_messages(creds, max_results=None, batch_size=DEFAULT_BATCH_SIZE):
     service = get_gmail_service(creds)
     """
     Scan inbox, extract and parse event candidates from unread emails.
     """
-    messages = list_unread_messages(service, max_results=max_results)
+    messages = itertools.islice(iter_unread_messages(service), max_results)
 
     candidates = []
 
-    for msg in messages:
-        msg_data = get_message(service, msg['id'], format='full')
+    for msg_data in iter_messages(service, messages, batch_size=batch_size):
         payload = msg_data.get('payload', {})
+        invite = parse_calendar_invite(payload)
+        if invite:
+            if invite['actionable']:
+                candidates.append(invite)
+            continue
+
         text = extract_email_text(payload)
         if not text:
             continue
@@ -136,10 +176,13 @@ def find_event_triggers(text):
     triggers = []
     lines = extract_event_candidates(text)
     for line in lines:
-        parsed_date = dateparser.parse(line, settings={'PREFER_DATES_FROM': 'future'})
+        dates = [span.start for span in find_spans(line)]
+        if not dates:
+            parsed_date = parse_date(line, settings={'PREFER_DATES_FROM': 'future'})
+            dates = [parsed_date] if parsed_date else []
         triggers.append({
             'text': line,
-            'dates': [parsed_date] if parsed_date else []
+            'dates': dates
         })
     return triggers
 
@@ -147,9 +190,9 @@ def mark_as_read(service, msg_id):
     """
     Mark a Gmail message as read by removing the UNREAD label.
     """
-    service.users().messages().modify(
+    execute(service.users().messages().modify(
         userId='me',
         id=msg_id,
         body={'removeLabelIds': ['UNREAD']}
-    ).execute()
+    ))
 
@@ -0,0 +1,154 @@
+import os
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from googleapiclient.errors import HttpError
+
+from api_executor import execute
+
+logger = logging.getLogger(__name__)
+
+# Cycles a message that could not be processed is listed again before it is given up on
+MAX_RETRY_CYCLES = 5
+
+
+def list_unread_messages(service) -> List[Dict]:
+    """Return {'id', 'threadId'} for every unread message in the inbox, following all pages."""
+    messages = []
+    page_token = None
+    while True:
+        results = execute(service.users().messages().list(
+            userId='me',
+            labelIds=['UNREAD'],
+            q='in:inbox',
+            pageToken=page_token
+        ))
+        messages.extend(results.get('messages', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return messages
+
+
+def list_unread_message_ids(service) -> List[str]:
+    """Return the ids of every unread message in the inbox, following all pages."""
+    return [m['id'] for m in list_unread_messages(service)]
+
+
+class HistorySync:
+    """
+    Incremental mailbox sync based on Gmail historyId checkpoints.
+
+    The first run (or any run after the history window expired) does a full
+    scan of unread inbox mail; after that only messages added since the saved
+    historyId are listed. The new checkpoint is held back until commit() is
+    called, so a cycle that fails halfway is simply replayed. Messages the
+    cycle could not process (a failed download or notification) are saved
+    with the checkpoint and listed again on the next cycles, since the
+    history after the checkpoint will not mention them.
+    """
+
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self.state = self._load_state()
+        self.pending_history_id: Optional[str] = None
+        # threadId of each message returned by the last listing
+        self.thread_ids: Dict[str, str] = {}
+        # Every id the last listing returned, retries included
+        self.listed_ids: List[str] = []
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable sync state {self.state_path}: {e}")
+        return {}
+
+    @property
+    def history_id(self) -> Optional[str]:
+        return self.state.get('history_id')
+
+    def list_new_message_ids(self, service) -> List[str]:
+        """
+        Return ids of unread inbox messages that arrived since the last
+        commit, after the ids left unprocessed by earlier cycles.
+        """
+        ids = self._list_new(service)
+        retry = self.state.get('retry', {})
+        for msg_id, entry in retry.items():
+            if entry.get('thread_id'):
+                self.thread_ids.setdefault(msg_id, entry['thread_id'])
+        self.listed_ids = list(dict.fromkeys(list(retry) + ids))
+        return self.listed_ids
+
+    def _list_new(self, service) -> List[str]:
+        if self.history_id:
+            try:
+                return self._list_history(service, self.history_id)
+            except HttpError as e:
+                # Gmail answers 404 once startHistoryId falls outside its history window
+                if e.resp.status != 404:
+                    raise
+                logger.info("Gmail history checkpoint expired, falling back to a full scan")
+        return self._full_scan(service)
+
+    def _full_scan(self, service) -> List[str]:
+        # Read the checkpoint first so mail arriving during the scan is picked up next cycle
+        profile = execute(service.users().getProfile(userId='me'))
+        messages = list_unread_messages(service)
+        self.thread_ids = {m['id']: m['threadId'] for m in messages if m.get('threadId')}
+        self.pending_history_id = profile.get('historyId')
+        return [m['id'] for m in messages]
+
+    def _list_history(self, service, start_history_id: str) -> List[str]:
+        ids = []
+        self.thread_ids = {}
+        page_token = None
+        while True:
+            response = execute(service.users().history().list(
+                userId='me',
+                startHistoryId=start_history_id,
+                historyTypes=['messageAdded'],
+                labelId='INBOX',
+                pageToken=page_token
+            ))
+
+            for record in response.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message = added.get('message', {})
+                    if 'UNREAD' in message.get('labelIds', []):
+                        ids.append(message['id'])
+                        if message.get('threadId'):
+                            self.thread_ids[message['id']] = message['threadId']
+
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                self.pending_history_id = response.get('historyId', start_history_id)
+                return list(dict.fromkeys(ids))
+
+    def rollback(self) -> None:
+        """Forget the checkpoint of a listing whose messages could not be processed."""
+        self.pending_history_id = None
+
+    def commit(self, unprocessed: Iterable[str] = ()) -> None:
+        """
+        Persist the checkpoint reached by the last list_new_message_ids call,
+        with the listed ids that were not processed, to be listed again.
+        """
+        if not self.pending_history_id:
+            return
+        previous = self.state.get('retry', {})
+        retry = {}
+        for msg_id in unprocessed:
+            attempts = previous.get(msg_id, {}).get('attempts', 0) + 1
+            if attempts > MAX_RETRY_CYCLES:
+                logger.warning(f"Giving up on message {msg_id} after {MAX_RETRY_CYCLES} cycles")
+                continue
+            retry[msg_id] = {'thread_id': self.thread_ids.get(msg_id), 'attempts': attempts}
+        self.state['history_id'] = self.pending_history_id
+        self.state['retry'] = retry
+        with open(self.state_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        self.pending_history_id = None
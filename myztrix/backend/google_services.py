@@ -0,0 +1,135 @@
+import os
+import json
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest, build_http
+
+from credential_manager import CredentialManager, ManagedCredentials, credential_manager
+
+# Points every Google client at another host, e.g. the local fake API server
+API_ROOT_ENV = 'MYZTRIX_GOOGLE_API_ROOT'
+
+
+def api_root() -> str:
+    """The root URL override with a trailing slash, or '' when talking to Google."""
+    root = os.environ.get(API_ROOT_ENV, '')
+    return root.rstrip('/') + '/' if root else ''
+
+
+@lru_cache(maxsize=None)
+def discovery_document(api: str, version: str, root: str = '') -> str:
+    """
+    The static discovery document bundled with googleapiclient, read once
+    per process. A root override rewrites rootUrl/baseUrl, because batch
+    requests are sent to the document's rootUrl rather than client_options.
+    Kept as JSON text: clients modify the dict they are built from, so each
+    build parses its own copy.
+    """
+    document = get_static_doc(api, version)
+    if document is None:
+        raise ValueError(f"No static discovery document for {api} {version}")
+    if root:
+        document = json.loads(document)
+        document['rootUrl'] = root
+        document['baseUrl'] = root + document.get('servicePath', '')
+        document = json.dumps(document)
+    return document
+
+
+def build_service(api: str, version: str, credentials, request_builder=HttpRequest):
+    """build() from the cached discovery document, honouring MYZTRIX_GOOGLE_API_ROOT."""
+    return build_from_document(discovery_document(api, version, api_root()), credentials=credentials,
+                               requestBuilder=request_builder)
+
+
+def build_resources(resource, description: Dict) -> None:
+    """
+    Instantiate every nested resource once. googleapiclient completes the
+    shared method descriptions the first time a resource is built, so after
+    this, threads sharing the client only read them.
+    """
+    for name, nested in description.get('resources', {}).items():
+        build_resources(getattr(resource, name)(), nested)
+
+
+class ThreadTransport:
+    """
+    requestBuilder that sends each request over the calling thread's own
+    authorised httplib2 transport, so one client can be shared by threads.
+    A thread keeps its transport (and its open connections) while it lives.
+    """
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self._local = threading.local()
+
+    def http(self) -> AuthorizedHttp:
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.credentials, http=build_http())
+        return http
+
+    def __call__(self, http, *args, **kwargs) -> HttpRequest:
+        return HttpRequest(self.http(), *args, **kwargs)
+
+
+class ServiceContainer:
+    """
+    Process-wide home of Google credentials and API clients.
+
+    Credentials come from the credential manager, which reads each token
+    file once and keeps it refreshed. Clients are built lazily from the
+    cached discovery documents, once per process, and shared by every
+    thread: the httplib2 transport is not thread-safe, so each client sends
+    requests through a ThreadTransport. Short-lived threads such as Flask's
+    per-request ones reuse the client and only open a new transport.
+    """
+
+    def __init__(self, manager: CredentialManager = credential_manager):
+        self.manager = manager
+        self._clients: Dict[Tuple[str, str, str, int], Tuple[object, object]] = {}
+        self._lock = threading.Lock()
+
+    def set_credentials(self, token_path: str, credentials: Credentials) -> ManagedCredentials:
+        """Save credentials from a fresh OAuth flow and return the managed copy to use."""
+        return self.manager.adopt(token_path, credentials)
+
+    def credentials(self, token_path: str, scopes: Optional[List[str]] = None) -> ManagedCredentials:
+        """
+        Shared credentials for token_path, kept refreshed ahead of expiry.
+        Raises FileNotFoundError if the token has not been created yet.
+        """
+        return self.manager.get(token_path, scopes)
+
+    def get(self, api: str, version: str, credentials) -> object:
+        """The shared client for api/version authorised by credentials, built on first use."""
+        key = (api, version, api_root(), id(credentials))
+        with self._lock:
+            cached = self._clients.get(key)
+            # The credentials are kept alongside so a recycled id() never returns a stale client
+            if cached is None or cached[0] is not credentials:
+                client = build_service(api, version, credentials, ThreadTransport(credentials))
+                build_resources(client, client._rootDesc)
+                cached = self._clients[key] = (credentials, client)
+        return cached[1]
+
+    def gmail(self, credentials):
+        return self.get('gmail', 'v1', credentials)
+
+    def calendar(self, credentials):
+        return self.get('calendar', 'v3', credentials)
+
+    def clear(self) -> None:
+        """Forget every client."""
+        with self._lock:
+            self._clients.clear()
+
+
+# Shared by every module so each process reads tokens and discovery documents once
+services = ServiceContainer()
@@ -0,0 +1,195 @@
+import re
+import logging
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+# iTIP methods that put an event on the calendar; a document without METHOD is a plain export
+ACTIONABLE_METHODS = ('', 'REQUEST', 'PUBLISH')
+
+# Outlook and Exchange name zones the Windows way; the usual ones mapped to IANA
+WINDOWS_ZONES = {
+    'UTC': 'UTC',
+    'GMT Standard Time': 'Europe/London',
+    'Greenwich Standard Time': 'Atlantic/Reykjavik',
+    'W. Europe Standard Time': 'Europe/Berlin',
+    'Central Europe Standard Time': 'Europe/Budapest',
+    'Central European Standard Time': 'Europe/Warsaw',
+    'Romance Standard Time': 'Europe/Paris',
+    'E. Europe Standard Time': 'Europe/Chisinau',
+    'FLE Standard Time': 'Europe/Kiev',
+    'GTB Standard Time': 'Europe/Bucharest',
+    'Russian Standard Time': 'Europe/Moscow',
+    'South Africa Standard Time': 'Africa/Johannesburg',
+    'Egypt Standard Time': 'Africa/Cairo',
+    'Israel Standard Time': 'Asia/Jerusalem',
+    'Arabian Standard Time': 'Asia/Dubai',
+    'India Standard Time': 'Asia/Kolkata',
+    'China Standard Time': 'Asia/Shanghai',
+    'Singapore Standard Time': 'Asia/Singapore',
+    'Tokyo Standard Time': 'Asia/Tokyo',
+    'Korea Standard Time': 'Asia/Seoul',
+    'AUS Eastern Standard Time': 'Australia/Sydney',
+    'New Zealand Standard Time': 'Pacific/Auckland',
+    'Eastern Standard Time': 'America/New_York',
+    'Central Standard Time': 'America/Chicago',
+    'Mountain Standard Time': 'America/Denver',
+    'US Mountain Standard Time': 'America/Phoenix',
+    'Pacific Standard Time': 'America/Los_Angeles',
+    'Alaskan Standard Time': 'America/Anchorage',
+    'Hawaiian Standard Time': 'Pacific/Honolulu',
+    'Atlantic Standard Time': 'America/Halifax',
+    'E. South America Standard Time': 'America/Sao_Paulo',
+}
+
+DURATION = re.compile(r'^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+def unfold(text: str) -> List[str]:
+    """Split iCalendar text into logical lines, joining folded continuation lines (RFC 5545 3.1)."""
+    lines: List[str] = []
+    for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if line[:1] in (' ', '\t') and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def unescape(value: str) -> str:
+    return (value.replace('\\n', '\n').replace('\\N', '\n')
+            .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\'))
+
+
+def parse_property(line: str) -> Tuple[str, Dict[str, str], str]:
+    """Split 'NAME;PARAM=x:value' into its name, parameters and value."""
+    head, _, value = line.partition(':')
+    name, *params = head.split(';')
+    parameters = {}
+    for param in params:
+        key, _, param_value = param.partition('=')
+        parameters[key.upper()] = param_value.strip('"')
+    return name.upper(), parameters, value
+
+
+def is_all_day(value: str, params: Dict[str, str]) -> bool:
+    return params.get('VALUE') == 'DATE' or len(value) == 8
+
+
+def zone_name(tzid: str) -> Optional[str]:
+    """The IANA name for a TZID, translating Windows zone names; None if unknown."""
+    tzid = tzid.strip()
+    name = WINDOWS_ZONES.get(tzid, tzid)
+    if ZoneInfo is None:
+        return None
+    try:
+        ZoneInfo(name)
+    except Exception:
+        return None
+    return name
+
+
+def _zone(tzid: str) -> Optional[tzinfo]:
+    name = zone_name(tzid)
+    return ZoneInfo(name) if name else None
+
+
+def parse_ics_datetime(value: str, params: Dict[str, str]) -> datetime:
+    if is_all_day(value, params):
+        return datetime.strptime(value[:8], '%Y%m%d')
+
+    parsed = datetime.strptime(value.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+    if value.endswith('Z'):
+        return parsed.replace(tzinfo=timezone.utc)
+    if params.get('TZID'):
+        zone = _zone(params['TZID'])
+        if zone is None:
+            # Left as floating time in the invite's zone rather than read as UTC
+            logger.warning(f"Unknown TZID {params['TZID']!r} in invite")
+            return parsed
+        return parsed.replace(tzinfo=zone)
+    return parsed
+
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    match = DURATION.match(value)
+    if not match:
+        return None
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == '-' else delta
+
+
+def parse_vevent(ics_text: str) -> Optional[Dict]:
+    """
+    Parse the first VEVENT of an iCalendar document.
+    Returns title, start_time, end_time (datetimes), location, description,
+    uid, method, status, all_day, timezone (IANA name, if any) and
+    actionable, or None if there is no VEVENT with a usable DTSTART.
+    Only actionable invites describe an event to add: cancellations and
+    replies ('Accepted: ...') carry the event's times too.
+    """
+    props: Dict[str, Tuple[Dict[str, str], str]] = {}
+    method = ''
+    depth = 0
+    in_event = False
+    for line in unfold(ics_text):
+        name, params, value = parse_property(line)
+        if name == 'METHOD' and not in_event:
+            method = value.strip().upper()
+        elif name == 'BEGIN':
+            if value.upper() == 'VEVENT' and not in_event:
+                in_event = True
+                depth = 0
+            elif in_event:
+                # Skip nested components such as VALARM
+                depth += 1
+        elif name == 'END' and in_event:
+            if depth:
+                depth -= 1
+            elif value.upper() == 'VEVENT':
+                break
+        elif in_event and not depth and name not in props:
+            props[name] = (params, value)
+
+    if 'DTSTART' not in props:
+        return None
+
+    start_params, start_value = props['DTSTART']
+    all_day = is_all_day(start_value, start_params)
+    try:
+        start = parse_ics_datetime(start_value, start_params)
+        if 'DTEND' in props:
+            end = parse_ics_datetime(props['DTEND'][1], props['DTEND'][0])
+        elif 'DURATION' in props and parse_duration(props['DURATION'][1]) is not None:
+            end = start + parse_duration(props['DURATION'][1])
+        else:
+            # RFC 5545 3.6.1: an all-day event without an end lasts the day
+            end = start + (timedelta(days=1) if all_day else timedelta(hours=1))
+    except ValueError:
+        return None
+
+    def text(name: str) -> str:
+        return unescape(props[name][1]) if name in props else ''
+
+    status = text('STATUS').strip().upper()
+    return {
+        'title': text('SUMMARY'),
+        'start_time': start,
+        'end_time': end,
+        'location': text('LOCATION'),
+        'description': text('DESCRIPTION'),
+        'uid': text('UID'),
+        'method': method,
+        'status': status,
+        'all_day': all_day,
+        'timezone': None if all_day else zone_name(start_params.get('TZID', '')) or None,
+        'actionable': method in ACTIONABLE_METHODS and status != 'CANCELLED',
+    }
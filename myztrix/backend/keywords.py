@@ -0,0 +1,105 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Mapping, NamedTuple, Set, Union
+
+# Keywords each detector looks for. One vocabulary so the detectors agree on
+# what counts as an event word; the weights let a matcher favour strong words.
+MEETING_KEYWORDS = frozenset({
+    'meeting', 'call', 'appointment', 'schedule', 'calendar',
+    'invite', 'invitation', 'conference', 'discussion'
+})
+TRIGGER_KEYWORDS = frozenset({
+    'meeting', 'call', 'talk', 'presentation', 'event', 'trip', 'flight', 'reservation'
+})
+EVENT_KEYWORDS = frozenset({
+    'meeting', 'call', 'appointment', 'talk', 'trip', 'event', 'conference', 'flight', 'webinar', 'presentation'
+})
+TRIAGE_KEYWORDS = MEETING_KEYWORDS | TRIGGER_KEYWORDS | EVENT_KEYWORDS | {'rsvp', 'booking'}
+
+# Simple inflections; the old substring checks matched 'meetings' and 'invited' too
+SUFFIXES = r'(?:s|es|ed|d|ing)?'
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    start: int
+    end: int
+    weight: float
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword in a text with one compiled alternation, on word
+    boundaries, instead of one substring scan per keyword per line.
+    Matching is case-insensitive; the text is lowercased once per call.
+    """
+
+    def __init__(self, keywords: Union[Mapping[str, float], Iterable[str]]):
+        if not isinstance(keywords, Mapping):
+            keywords = dict.fromkeys(keywords, 1.0)
+        self.weights: Dict[str, float] = {k.lower(): w for k, w in keywords.items()}
+        # Longest first so 'invitation' is not cut short by 'invite'
+        alternation = '|'.join(re.escape(k) for k in sorted(self.weights, key=len, reverse=True))
+        self.pattern = re.compile(rf'\b({alternation}){SUFFIXES}\b')
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword.lower() in self.weights
+
+    def finditer(self, text: str) -> Iterator[KeywordHit]:
+        """Hits in order; offsets index the lowercased text."""
+        for match in self.pattern.finditer(text.lower()):
+            keyword = match.group(1)
+            yield KeywordHit(keyword, match.start(), match.end(), self.weights[keyword])
+
+    def hits(self, text: str) -> List[KeywordHit]:
+        return list(self.finditer(text))
+
+    def search(self, text: str) -> bool:
+        return self.pattern.search(text.lower()) is not None
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in self.pattern.finditer(text.lower()))
+
+    def score(self, text: str) -> float:
+        return sum(hit.weight for hit in self.finditer(text))
+
+    def distinct(self, text: str) -> Set[str]:
+        return {match.group(1) for match in self.pattern.finditer(text.lower())}
+
+    def matching_lines(self, text: str) -> List[str]:
+        """The stripped lines of text that contain a keyword, in order, found in one pass."""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters change length when lowercased, so offsets would drift
+            return [line.strip() for line in text.splitlines() if self.search(line)]
+
+        lines = []
+        position = 0
+        while True:
+            match = self.pattern.search(lowered, position)
+            if not match:
+                return lines
+            line_start = text.rfind('\n', 0, match.start()) + 1
+            line_end = text.find('\n', match.end())
+            if line_end == -1:
+                line_end = len(text)
+            lines.append(text[line_start:line_end].strip())
+            position = line_end + 1
+
+
+@lru_cache(maxsize=32)
+def _cached_matcher(keywords: FrozenSet[str]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def matcher_for(keywords: Union[KeywordMatcher, Iterable[str]]) -> KeywordMatcher:
+    """A matcher for keywords, compiled once per distinct keyword set."""
+    if isinstance(keywords, KeywordMatcher):
+        return keywords
+    return _cached_matcher(frozenset(keywords))
+
+
+MEETING = KeywordMatcher(MEETING_KEYWORDS)
+TRIGGERS = KeywordMatcher(TRIGGER_KEYWORDS)
+EVENTS = KeywordMatcher(EVENT_KEYWORDS)
+TRIAGE = KeywordMatcher(TRIAGE_KEYWORDS)
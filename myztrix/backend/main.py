@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import threading
 
 # Add backend folder to sys.path BEFORE any imports that rely on it
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,11 +19,13 @@ import tzlocal  # grab local timezone
 
 from gmail_scraper import (
     get_gmail_service,
-    list_unread_messages,
-    get_message,
+    iter_unread_messages,
+    iter_messages,
     extract_email_text,
+    parse_calendar_invite,
     mark_as_read,
-    parse_event_details
+    parse_event_details,
+    extract_event_candidates
 )
 
 from calendar_handler import (
@@ -32,11 +35,15 @@ from calendar_handler import (
 )
 
 from event_creator import add_event_to_calendar
+from calendar_mirror import CalendarMirror
 from notifications import schedule_notifications
 
 DECLINED_FILE = os.path.join(BASE_DIR, 'declined_events.json')
 PENDING_FILE = os.path.join(BASE_DIR, 'pending_events.json')
-EVENTS_FILE = os.path.join(BASE_DIR, 'events.json')
+CALENDAR_MIRROR_FILE = os.path.join(BASE_DIR, 'calendar_mirror.json')
+# /scan re-syncs the mirror at most this often, and lists this many days by default
+MIRROR_MAX_AGE = 60
+SCAN_DAYS = 7
 
 app = Flask(
     __name__,
@@ -60,16 +67,40 @@ def save_json(file, data):
     with open(file, 'w') as f:
         json.dump(data, f, indent=2)
 
+calendar_mirror = CalendarMirror(CALENDAR_MIRROR_FILE)
+mirror_lock = threading.Lock()
+
 
 @app.route('/')
 def home():
     pending_events = load_json(PENDING_FILE)
     return render_template('index.html', events=pending_events)
 
+def scan_entry(event):
+    """A mirrored Google event in the shape the index page and /confirm use."""
+    start, end = event.get('start') or {}, event.get('end') or {}
+    return {
+        'id': event.get('id'),
+        'summary': event.get('summary', ''),
+        'description': event.get('description', ''),
+        'location': event.get('location', ''),
+        'start_time': start.get('dateTime') or start.get('date'),
+        'end_time': end.get('dateTime') or end.get('date'),
+        'html_link': event.get('htmlLink'),
+        # Listed from the calendar itself, so there is nothing left to confirm
+        'on_calendar': True,
+    }
+
 @app.route('/scan', methods=['GET'])
 def scan_events():
     try:
-        events = load_json(EVENTS_FILE)
+        # ?start=&end= are ISO datetimes; the default is the coming week
+        start = dateutil.parser.isoparse(request.args['start']) if 'start' in request.args else datetime.now(pytz.UTC)
+        end = dateutil.parser.isoparse(request.args['end']) if 'end' in request.args else start + timedelta(days=SCAN_DAYS)
+        with mirror_lock:
+            if calendar_mirror.sync(get_calendar_service(), max_age=MIRROR_MAX_AGE):
+                calendar_mirror.save()
+            events = [scan_entry(event) for event in calendar_mirror.between(start, end)]
         return jsonify({'status': 'success', 'events': events}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -80,50 +111,61 @@ def check_emails():
         calendar_service = get_calendar_service()
         creds = calendar_service._credentials
         gmail_service = get_gmail_service(creds)
-        messages = list_unread_messages(gmail_service)
+        fetched = iter_messages(gmail_service, iter_unread_messages(gmail_service))
     except Exception as e:
         return jsonify({"error": f"Failed to connect to Google APIs: {e}"}), 500
 
     flagged_events = []
     pending = load_json(PENDING_FILE)
 
-    for msg in messages:
-        try:
-            msg_data = get_message(gmail_service, msg['id'])
-            text = extract_email_text(msg_data['payload'])
-            event_lines = [
-                line for line in text.splitlines()
-                if any(k in line.lower() for k in ['meeting', 'call', 'talk', 'presentation', 'event', 'trip', 'flight', 'reservation'])
-            ]
-
-            for line in event_lines:
-                parsed_event = parse_event_details(line)
-                if not parsed_event:
-                    continue
-
-                subject = parsed_event['summary']
-                description = parsed_event['description']
-                start_time = parsed_event['start_time']
-
-                event_payload = create_event_payload(subject, description, start_time)
-                added_event = add_event(calendar_service, event_data=event_payload)
-                mark_as_read(gmail_service, msg['id'])
-
-                flagged_event = {
-                    "summary": subject,
-                    "description": description,
-                    "start_time": start_time.isoformat(),
-                    "calendar_event_id": added_event.get('id', 'unknown')
-                }
-
-                flagged_events.append(flagged_event)
-                pending.append(flagged_event)
-
-                break  # One event per message
-
-        except Exception as e:
-            print(f"Skipping message {msg['id']} due to error: {e}")
-            continue
+    # Pages are listed and downloaded lazily, so API errors can surface mid-scan
+    try:
+        for msg_data in fetched:
+            try:
+                invite = parse_calendar_invite(msg_data['payload'])
+                if invite:
+                    # A cancelled invite or an 'Accepted:' reply adds nothing
+                    parsed_events = [invite] if invite['actionable'] else []
+                else:
+                    text = extract_email_text(msg_data['payload'])
+                    event_lines = extract_event_candidates(text)
+                    parsed_events = (parse_event_details(line) for line in event_lines)
+
+                for parsed_event in parsed_events:
+                    if not parsed_event:
+                        continue
+
+                    subject = parsed_event['summary']
+                    description = parsed_event['description']
+                    start_time = parsed_event['start_time']
+
+                    event_payload = create_event_payload(
+                        subject, description, start_time,
+                        location=parsed_event['location'], end_date=parsed_event['end_time'],
+                        all_day=parsed_event.get('all_day', False), time_zone=parsed_event.get('timezone')
+                    )
+                    added_event = add_event(calendar_service, event_data=event_payload)
+                    mark_as_read(gmail_service, msg_data['id'])
+
+                    flagged_event = {
+                        "summary": subject,
+                        "description": description,
+                        "start_time": start_time.isoformat(),
+                        "calendar_event_id": added_event.get('id', 'unknown')
+                    }
+
+                    flagged_events.append(flagged_event)
+                    pending.append(flagged_event)
+
+                    break  # One event per message
+
+            except Exception as e:
+                print(f"Skipping message {msg_data['id']} due to error: {e}")
+                continue
+    except Exception as e:
+        if not flagged_events:
+            return jsonify({"error": f"Failed to connect to Google APIs: {e}"}), 500
+        print(f"Stopped scanning unread emails early due to error: {e}")
 
     if flagged_events:
         save_json(PENDING_FILE, pending)
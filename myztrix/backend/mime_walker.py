@@ -0,0 +1,114 @@
+import re
+import base64
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup
+
+# Bodies longer than this are truncated; event details live near the top of a message
+MAX_BODY_BYTES = 256 * 1024
+
+BODY_PREFERENCE = ('text/plain', 'text/html')
+CALENDAR_TYPES = ('text/calendar', 'application/ics')
+
+CHARSET = re.compile(r'charset="?([\w.:-]+)"?', re.IGNORECASE)
+
+
+def iter_parts(payload: Dict) -> Iterator[Dict]:
+    """
+    Yield the leaf parts of a Gmail message payload depth-first, in document order.
+    Nested multipart containers are expanded lazily, so callers that stop early
+    never touch the rest of the tree.
+    """
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get('parts')
+        if children:
+            stack.extend(reversed(children))
+        else:
+            yield part
+
+
+def is_inline_body(part: Dict) -> bool:
+    """True for parts whose data came back inline rather than as a separate attachment."""
+    return bool(part.get('body', {}).get('data')) and not part.get('filename')
+
+
+def find_part(payload: Dict, mime_types: Sequence[str]) -> Optional[Dict]:
+    """Return the first inline part of the most preferred mime type present, or None."""
+    found: Dict[str, Dict] = {}
+    for part in iter_parts(payload):
+        # A part without a Content-Type is text/plain (RFC 2045)
+        mime = part.get('mimeType', 'text/plain').lower()
+        if mime in mime_types and mime not in found and is_inline_body(part):
+            if mime == mime_types[0]:
+                return part
+            found[mime] = part
+    return next((found[mime] for mime in mime_types if mime in found), None)
+
+
+def decode_part(part: Dict, max_bytes: int = MAX_BODY_BYTES) -> memoryview:
+    """
+    Base64url-decode at most max_bytes of a part's body. Only the prefix of the
+    encoded data that is needed is decoded.
+    """
+    data = part.get('body', {}).get('data', '')
+    # Every 4 base64 characters carry 3 bytes
+    data = data[:((max_bytes + 2) // 3) * 4]
+    data += '=' * (-len(data) % 4)
+    return memoryview(base64.urlsafe_b64decode(data))[:max_bytes]
+
+
+def part_charset(part: Dict) -> str:
+    for header in part.get('headers', []):
+        if header.get('name', '').lower() == 'content-type':
+            match = CHARSET.search(header.get('value', ''))
+            if match:
+                return match.group(1)
+    return 'utf-8'
+
+
+def decode_text(body: memoryview, charset: str) -> str:
+    try:
+        return str(body, charset, errors='ignore')
+    except LookupError:
+        return str(body, 'utf-8', errors='ignore')
+
+
+def select_body(payload: Dict, preference: Sequence[str] = BODY_PREFERENCE,
+                max_bytes: int = MAX_BODY_BYTES) -> Tuple[Optional[str], memoryview, str]:
+    """
+    Pick the message body by mime type preference and decode only that part.
+    Returns (mime type, raw bytes, charset); the mime type is None when no
+    suitable part exists.
+    """
+    if not payload:
+        return None, memoryview(b''), 'utf-8'
+    part = find_part(payload, preference)
+    if part is None:
+        return None, memoryview(b''), 'utf-8'
+    return part.get('mimeType', 'text/plain').lower(), decode_part(part, max_bytes), part_charset(part)
+
+
+def extract_calendar(payload: Dict, max_bytes: int = MAX_BODY_BYTES) -> str:
+    """
+    Return the iCalendar text of an invite, or '' when the message has none.
+    Invites often arrive as an .ics attachment, so named parts count too as
+    long as Gmail returned their data inline.
+    """
+    for part in iter_parts(payload or {}):
+        mime = part.get('mimeType', '').lower()
+        if mime in CALENDAR_TYPES and part.get('body', {}).get('data'):
+            return decode_text(decode_part(part, max_bytes), part_charset(part))
+    return ''
+
+
+def extract_text(payload: Dict, max_bytes: int = MAX_BODY_BYTES) -> str:
+    """Return the message body as text: text/plain if present, else text/html stripped of markup."""
+    mime, body, charset = select_body(payload, max_bytes=max_bytes)
+    if mime is None:
+        return ''
+    text = decode_text(body, charset)
+    if mime == 'text/html':
+        return BeautifulSoup(text, 'html.parser').get_text()
+    return text
@@ -0,0 +1,202 @@
+import os
+import re
+import json
+import math
+import zlib
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+from text_tokens import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 'off' disables the pre-filter, 'shadow' scores every email but gates nothing,
+# 'on' skips detection for emails the trained model scores below the threshold
+MODE_ENV = 'MYZTRIX_PREFILTER'
+MODES = ('off', 'shadow', 'on')
+DEFAULT_MODE = 'shadow'
+
+# Relative to the working directory, like the agent's other state files
+MODEL_DIR = 'prefilter_models'
+
+# Feature space of the hashing trick; collisions are rare at this size and the model stays sparse
+HASH_BITS = 18
+# Only the start of the body is scored, like Gmail's snippet
+SNIPPET_CHARS = 300
+LEARNING_RATE = 0.1
+L2 = 1e-5
+# Below this probability an email skips detection once the model is trusted
+SKIP_THRESHOLD = 0.05
+# Decisions needed before 'on' mode gates anything
+MIN_EXAMPLES = 50
+# Email ids remembered so a decision is learned once
+MAX_SEEN = 5000
+
+ADDRESS = re.compile(r'[\w.+-]+@([\w-]+(?:\.[\w-]+)+)')
+
+
+def default_mode() -> str:
+    mode = os.environ.get(MODE_ENV, DEFAULT_MODE).lower()
+    if mode not in MODES:
+        logger.warning(f"Unknown {MODE_ENV}={mode!r}, using {DEFAULT_MODE!r}")
+        return DEFAULT_MODE
+    return mode
+
+
+def model_path(account: str, model_dir: str = MODEL_DIR) -> str:
+    """Per-user model file; the account address is reduced to a safe file name."""
+    name = re.sub(r'[^A-Za-z0-9._-]', '_', account.lower()) or 'default'
+    return os.path.join(model_dir, f'{name}.json')
+
+
+def _hash(feature: str) -> int:
+    # crc32 is stable across processes, unlike hash() on str
+    return zlib.crc32(feature.encode('utf-8')) & ((1 << HASH_BITS) - 1)
+
+
+def features(subject: str, sender: str, body: str) -> List[int]:
+    """Hashed indices of the subject, sender and snippet features of an email."""
+    names = {'bias'}
+    names.update(f's:{token}' for token in tokenize(subject or ''))
+    names.update(f'b:{token}' for token in tokenize((body or '')[:SNIPPET_CHARS]))
+    sender = (sender or '').lower()
+    match = ADDRESS.search(sender)
+    if match:
+        names.add(f'f:{match.group(0)}')
+        names.add(f'd:{match.group(1)}')
+    elif sender:
+        names.add(f'f:{sender}')
+    return sorted({_hash(name) for name in names})
+
+
+class PreFilter:
+    """
+    Logistic regression over hashed subject, sender and snippet features.
+
+    Learns online from the user's decisions only: confirmed events are
+    positives and declined events negatives. Detector verdicts are never
+    learned, so the model does not train on its own pipeline's guesses and
+    only user answers count towards min_examples. Scoring an
+    email costs a tokenize and a few dict lookups, so it can decide which
+    emails are worth the full date parsing pipeline. Shadow mode scores
+    every email and reports how much parsing would have been skipped, and
+    how many events that would have missed, without skipping anything.
+    """
+
+    def __init__(self, path: Optional[str] = None, mode: Optional[str] = None,
+                 threshold: float = SKIP_THRESHOLD, min_examples: int = MIN_EXAMPLES):
+        self.path = path
+        self.mode = mode or default_mode()
+        self.threshold = threshold
+        self.min_examples = min_examples
+        self.weights: Dict[int, float] = {}
+        self.examples = 0
+        self.seen: 'OrderedDict[str, None]' = OrderedDict()
+        self.stats: Counter = Counter()
+        self._skippable: Dict[str, bool] = {}
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable pre-filter model {self.path}: {e}")
+            return
+        self.weights = {int(index): weight for index, weight in state.get('weights', {}).items()}
+        self.examples = state.get('examples', 0)
+        self.seen = OrderedDict.fromkeys(state.get('seen', []))
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = {
+            'hash_bits': HASH_BITS,
+            'examples': self.examples,
+            'weights': {str(index): round(weight, 6) for index, weight in self.weights.items() if weight},
+            'seen': list(self.seen),
+        }
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def trusted(self) -> bool:
+        return self.examples >= self.min_examples
+
+    def _probability(self, indices: List[int]) -> float:
+        z = sum(self.weights.get(index, 0.0) for index in indices)
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def score(self, email: Dict) -> float:
+        """Probability that the user would want an event from this email."""
+        return self._probability(features(email.get('subject', ''), email.get('sender', ''), email.get('body', '')))
+
+    def learn(self, subject: str, sender: str, body: str, label: bool) -> None:
+        indices = features(subject, sender, body)
+        gradient = float(label) - self._probability(indices)
+        for index in indices:
+            weight = self.weights.get(index, 0.0)
+            self.weights[index] = weight + LEARNING_RATE * (gradient - L2 * weight)
+        self.examples += 1
+
+    def _remember(self, email_id: str) -> bool:
+        """True the first time email_id is seen."""
+        if not email_id or email_id in self.seen:
+            return False
+        self.seen[email_id] = None
+        while len(self.seen) > MAX_SEEN:
+            self.seen.popitem(last=False)
+        return True
+
+    def learn_decisions(self, confirmed: Dict[str, Dict], declined: Dict[str, Dict]) -> int:
+        """
+        Learn the confirmed and declined events not learned before; returns how many.
+        confirmed must only hold events the user accepted: pending_events.json
+        also holds detector output nobody has answered, and learning that
+        would train the model on its own guesses.
+        """
+        learned = 0
+        for events, label in ((confirmed, True), (declined, False)):
+            if not isinstance(events, dict):
+                continue
+            for email_id, details in events.items():
+                if self._remember(email_id):
+                    self.learn(details.get('title', ''), details.get('sender', ''),
+                               details.get('description', ''), label)
+                    learned += 1
+        return learned
+
+    def admit(self, email: Dict) -> bool:
+        """Whether email should go through detection. Always True unless mode is 'on'."""
+        if self.mode == 'off':
+            return True
+        skippable = self.trusted and self.score(email) < self.threshold
+        self.stats['scored'] += 1
+        if not skippable:
+            return True
+        self.stats['would_skip'] += 1
+        self.stats['would_skip_bytes'] += len(email.get('body') or '')
+        if self.mode == 'on':
+            self.stats['skipped'] += 1
+            return False
+        # Shadow mode: remember the verdict so observe() can count the events it would have missed
+        self._skippable[email['id']] = True
+        return True
+
+    def observe(self, email: Dict, is_event: bool) -> None:
+        """Record a detection result against the shadow verdict; nothing is learned from it."""
+        if self.mode == 'off':
+            return
+        if self._skippable.pop(email['id'], False) and is_event:
+            self.stats['would_miss'] += 1
+
+    def report(self) -> Dict:
+        return dict(self.stats, mode=self.mode, examples=self.examples)
@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Reply headers: "On Tue, 3 Jun 2025 at 09:12, Alice <a@example.com> wrote:"
+QUOTE_HEADER = re.compile(
+    r'^(?:on\s.{1,300}\swrote|le\s.{1,300}\sa écrit|am\s.{1,300}\sschrieb|el\s.{1,300}\sescribió)\s?:$',
+    re.IGNORECASE
+)
+ORIGINAL_MESSAGE = re.compile(r'^-{2,}\s*original message\s*-{2,}$', re.IGNORECASE)
+# Forwarded content is kept, including the From:/Date: block that introduces it
+FORWARDED = re.compile(r'^(?:-{2,}\s*forwarded message\s*-{2,}|begin forwarded message:)$', re.IGNORECASE)
+# Outlook quotes the previous message under a From:/Sent: block, often after a rule
+OUTLOOK_FROM = re.compile(r'^\*?from:\*?\s', re.IGNORECASE)
+OUTLOOK_FIELD = re.compile(r'^\*?(?:sent|date|to|subject):\*?\s', re.IGNORECASE)
+RULE = re.compile(r'^_{10,}$')
+SIGNATURE = re.compile(r'^--\s?$')
+MOBILE_SIGNATURE = re.compile(r'^(?:sent from my|get outlook for)\s', re.IGNORECASE)
+DISCLAIMER = re.compile(
+    r'^(?:confidentiality notice|disclaimer|this (?:e-?mail|message|communication)\b.{0,80}'
+    r'\b(?:confidential|privileged|intended (?:solely |only )?for)'
+    r'|the information (?:contained )?in this (?:e-?mail|message))',
+    re.IGNORECASE
+)
+
+# Lines an Outlook header block may span before we stop looking for Sent:/Date:
+OUTLOOK_LOOKAHEAD = 4
+# A disclaimer only ends the message if its paragraph starts this close to the end
+DISCLAIMER_TAIL_LINES = 15
+
+stats: Counter = Counter()
+
+
+def _is_outlook_header(lines: List[str], index: int) -> bool:
+    if not OUTLOOK_FROM.match(lines[index].strip()):
+        return False
+    following = lines[index + 1:index + 1 + OUTLOOK_LOOKAHEAD]
+    return any(OUTLOOK_FIELD.match(line.strip()) for line in following)
+
+
+def _is_quote_header(lines: List[str], index: int) -> bool:
+    line = lines[index].strip()
+    if QUOTE_HEADER.match(line):
+        return True
+    # Mail clients wrap long headers, leaving 'wrote:' on the next line
+    return (index + 1 < len(lines) and line[:3].lower() == 'on '
+            and QUOTE_HEADER.match(f'{line} {lines[index + 1].strip()}') is not None)
+
+
+def _next_content_line(lines: List[str], index: int) -> str:
+    for following in range(index + 1, len(lines)):
+        if lines[following].strip():
+            return lines[following].strip()
+    return ''
+
+
+def _is_trailing_block(lines: List[str], index: int, kept: List[str]) -> bool:
+    """Whether lines[index] opens a paragraph after the body and near the end of the message."""
+    if not any(line.strip() for line in kept) or index < len(lines) - DISCLAIMER_TAIL_LINES:
+        return False
+    previous = lines[index - 1].strip()
+    return not previous or bool(RULE.match(previous))
+
+
+def strip_quoted(text: str) -> Tuple[str, int]:
+    """
+    Remove quoted history, signatures and legal disclaimers from an email body.
+
+    One forward pass over the lines: '>' quoted lines are dropped wherever
+    they appear, and the first reply header whose quote is not '>'-prefixed,
+    Outlook From:/Sent: block, '-- ' signature delimiter or mobile signature
+    ends the message. So does a disclaimer, but only one that opens a later
+    paragraph in the last DISCLAIMER_TAIL_LINES lines; earlier, the same
+    wording ('this email is intended for the team') is part of the body.
+    Forwarded messages are kept. Returns the remaining text and the number
+    of UTF-8 bytes removed.
+    """
+    if not text:
+        return text, 0
+
+    lines = text.splitlines()
+    kept: List[str] = []
+    forward_header = False
+    skip = 0
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if skip:
+            skip -= 1
+            continue
+        if stripped.startswith('>'):
+            continue
+        if _is_quote_header(lines, index):
+            # Interleaved replies keep going after a '>' quote; anything else is history
+            wrapped = not QUOTE_HEADER.match(stripped)
+            if _next_content_line(lines, index + wrapped).startswith('>'):
+                skip = int(wrapped)
+                continue
+            break
+        if FORWARDED.match(stripped):
+            forward_header = True
+        elif not stripped:
+            forward_header = False
+        elif not forward_header and _is_outlook_header(lines, index):
+            break
+        if (ORIGINAL_MESSAGE.match(stripped) or SIGNATURE.match(line) or MOBILE_SIGNATURE.match(stripped)
+                or (DISCLAIMER.match(stripped) and _is_trailing_block(lines, index, kept))):
+            break
+        kept.append(line)
+
+    while kept and (not kept[-1].strip() or RULE.match(kept[-1].strip())):
+        kept.pop()
+
+    cleaned = '\n'.join(kept)
+    return cleaned, len(text.encode('utf-8')) - len(cleaned.encode('utf-8'))
+
+
+def clean_body(text: str) -> str:
+    """strip_quoted for detection, recording how much text it saved the parsers."""
+    cleaned, removed = strip_quoted(text)
+    stats['messages'] += 1
+    stats['bytes_in'] += len(text.encode('utf-8')) if text else 0
+    stats['bytes_removed'] += removed
+    return cleaned
+
+
+def stripping_stats() -> Dict[str, int]:
+    return dict(stats)
@@ -0,0 +1,150 @@
+import base64
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+SENDERS = [
+    'Alice Moyo <alice@example.com>',
+    'Bongani Dlamini <bongani@example.org>',
+    'Chen Wei <chen.wei@example.net>',
+    'Dana Smit <dana@example.com>',
+]
+NEWSLETTER_SENDERS = ['Deals Weekly <news@shop.example>', 'Tech Digest <digest@news.example>']
+
+MEETING_TEMPLATES = [
+    ('Project meeting', 'Hi,\n\nCan we have a meeting {when} to go over the roadmap?\n\nThanks'),
+    ('Quick call', 'Are you free for a call {when}? It should take 30 minutes.'),
+    ('Conference invitation', 'You are invited to the partner conference {when} in the main hall.'),
+    ('Flight reservation', 'Your flight reservation is confirmed. Departure {when} from gate 12.'),
+]
+WHEN_PHRASES = [
+    'tomorrow at 2 PM', 'next Monday at 5 PM', 'Friday at 10 AM', 'on June 12th at 3pm',
+    'on 2025-07-01 at 09:30', 'Mon 12 Jun 14:00', 'today 2-3pm',
+]
+NEWSLETTER_BODIES = [
+    '<h1>This week only</h1><p>Save 20% on everything in store.</p>',
+    '<h1>Top stories</h1><p>Ten things you missed this week.</p>',
+]
+CHATTER = [
+    ('Re: lunch', 'Sounds good, thanks!'),
+    ('Invoice attached', 'Please find the invoice for last month attached.'),
+    ('Photos', 'Here are the photos from the weekend.'),
+]
+QUOTED_TAIL = (
+    '\n\nOn Tue, 3 Jun 2025 at 09:12, Someone <someone@example.com> wrote:\n'
+    + '> Earlier message about a meeting on May 2nd at 4 PM.\n' * 20
+)
+
+
+def _encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def _part(mime: str, text: str, filename: str = '') -> Dict:
+    data = _encode(text)
+    return {'mimeType': mime, 'filename': filename, 'headers': [], 'body': {'size': len(text), 'data': data}}
+
+
+def _headers(subject: str, sender: str, sent: datetime, extra: Optional[Dict[str, str]] = None) -> List[Dict]:
+    headers = {
+        'Subject': subject,
+        'From': sender,
+        'To': 'me@example.com',
+        'Date': sent.strftime('%a, %d %b %Y %H:%M:%S +0000'),
+    }
+    headers.update(extra or {})
+    return [{'name': name, 'value': value} for name, value in headers.items()]
+
+
+def _ics(subject: str, start: datetime, uid: str) -> str:
+    fmt = '%Y%m%dT%H%M%SZ'
+    return (
+        'BEGIN:VCALENDAR\r\nMETHOD:REQUEST\r\nBEGIN:VEVENT\r\n'
+        f'DTSTART:{start.strftime(fmt)}\r\nDTEND:{(start + timedelta(hours=1)).strftime(fmt)}\r\n'
+        f'SUMMARY:{subject}\r\nLOCATION:Room 4\r\nUID:{uid}\r\n'
+        'END:VEVENT\r\nEND:VCALENDAR\r\n'
+    )
+
+
+def generate_mailbox(count: int, seed: int = 0, event_ratio: float = 0.3, invite_ratio: float = 0.1,
+                     newsletter_ratio: float = 0.3, now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Build `count` Gmail message resources (format='full') for benchmarks and tests.
+
+    The mix is controlled by the ratios: plain-text meeting requests, calendar
+    invites with a text/calendar part, HTML newsletters with List-Unsubscribe,
+    and ordinary chatter. Some messages carry long quoted reply history.
+    Messages are returned newest first, as Gmail lists them.
+    """
+    rng = random.Random(seed)
+    now = now or datetime(2025, 6, 2, 9, 0, tzinfo=timezone.utc)
+    messages = []
+
+    for index in range(count):
+        msg_id = f'{index + 1:016x}'
+        thread_id = f'{rng.randrange(max(1, count // 2)) + 1:016x}'
+        sent = now - timedelta(minutes=index * 7)
+        roll = rng.random()
+
+        if roll < invite_ratio:
+            subject = f'Invitation: {rng.choice(MEETING_TEMPLATES)[0]}'
+            start = (now + timedelta(days=rng.randint(1, 30))).replace(minute=0, second=0)
+            payload = {
+                'mimeType': 'multipart/mixed',
+                'headers': _headers(subject, rng.choice(SENDERS), sent),
+                'parts': [
+                    {
+                        'mimeType': 'multipart/alternative',
+                        'headers': [],
+                        'parts': [
+                            _part('text/plain', f'You have been invited to {subject}.'),
+                            _part('text/calendar', _ics(subject, start, f'{msg_id}@example.com')),
+                        ],
+                    },
+                    _part('application/ics', _ics(subject, start, f'{msg_id}@example.com'), 'invite.ics'),
+                ],
+            }
+            snippet = f'You have been invited to {subject}.'
+        elif roll < invite_ratio + event_ratio:
+            subject, template = rng.choice(MEETING_TEMPLATES)
+            body = template.format(when=rng.choice(WHEN_PHRASES))
+            if rng.random() < 0.5:
+                body += QUOTED_TAIL
+            payload = {
+                'mimeType': 'multipart/alternative',
+                'headers': _headers(subject, rng.choice(SENDERS), sent),
+                'parts': [_part('text/plain', body), _part('text/html', f'<p>{body}</p>')],
+            }
+            snippet = body[:100]
+        elif roll < invite_ratio + event_ratio + newsletter_ratio:
+            subject = rng.choice(['Our weekly deals', 'Your weekly digest'])
+            body = rng.choice(NEWSLETTER_BODIES) * rng.randint(5, 50)
+            payload = {
+                'mimeType': 'text/html',
+                'headers': _headers(subject, rng.choice(NEWSLETTER_SENDERS), sent, {
+                    'List-Unsubscribe': '<mailto:unsubscribe@news.example>',
+                    'Precedence': 'bulk',
+                }),
+                'body': {'size': len(body), 'data': _encode(body)},
+            }
+            snippet = 'This week only'
+        else:
+            subject, body = rng.choice(CHATTER)
+            payload = {
+                'mimeType': 'text/plain',
+                'headers': _headers(subject, rng.choice(SENDERS), sent),
+                'body': {'size': len(body), 'data': _encode(body)},
+            }
+            snippet = body[:100]
+
+        messages.append({
+            'id': msg_id,
+            'threadId': thread_id,
+            'labelIds': ['INBOX', 'UNREAD'],
+            'snippet': snippet,
+            'sizeEstimate': len(str(payload)),
+            'internalDate': str(int(sent.timestamp() * 1000)),
+            'payload': payload,
+        })
+
+    return messages
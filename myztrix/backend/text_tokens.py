@@ -0,0 +1,62 @@
+import os
+import re
+import logging
+from typing import FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Set to 'nltk' to tokenize with NLTK's punkt and use its stopword corpus.
+# The corpora must already be installed; nothing is downloaded at runtime.
+TOKENIZER_ENV = 'MYZTRIX_TOKENIZER'
+
+WORD = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+
+# NLTK's English stopword list, frozen here so detection never loads a corpus
+STOPWORDS: FrozenSet[str] = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself
+yourselves he him his himself she she's her hers herself it it's its itself they them
+their theirs themselves what which who whom this that that'll these those am is are was
+were be been being have has had having do does did doing a an the and but if or because
+as until while of at by for with about against between into through during before after
+above below to from up down in out on off over under again further then once here there
+when where why how all any both each few more most other some such no nor not only own
+same so than too very s t can will just don don't should should've now d ll m o re ve y
+ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't haven
+haven't isn isn't ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn
+shouldn't wasn wasn't weren weren't won won't wouldn wouldn't
+""".split())
+
+_nltk_stopwords: Optional[FrozenSet[str]] = None
+
+
+def use_nltk() -> bool:
+    return os.environ.get(TOKENIZER_ENV, '').lower() == 'nltk'
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; NLTK's word_tokenize only when configured."""
+    if use_nltk():
+        from nltk.tokenize import word_tokenize
+        return word_tokenize(text.lower())
+    return WORD.findall(text.lower())
+
+
+def stopword_set() -> FrozenSet[str]:
+    """The stopword set, loaded at most once per process."""
+    global _nltk_stopwords
+    if not use_nltk():
+        return STOPWORDS
+    if _nltk_stopwords is None:
+        try:
+            from nltk.corpus import stopwords
+            _nltk_stopwords = frozenset(stopwords.words('english'))
+        except LookupError:
+            logger.warning("NLTK stopwords corpus not installed; using the built-in list")
+            _nltk_stopwords = STOPWORDS
+    return _nltk_stopwords
+
+
+def content_tokens(text: str) -> List[str]:
+    """Tokens of text with stopwords removed."""
+    stop = stopword_set()
+    return [token for token in tokenize(text) if token not in stop]
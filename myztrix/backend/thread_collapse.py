@@ -0,0 +1,133 @@
+import os
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DECLINED = 'declined'
+CONFIRMED = 'confirmed'
+EVENT = 'event'
+NO_EVENT = 'no_event'
+
+# Threads not touched for this long are dropped from the decision file
+RETENTION_DAYS = 90
+
+
+def _recency(message_id: str) -> int:
+    # Gmail message ids are hex and grow with arrival time, so the largest id is the newest
+    try:
+        return int(message_id, 16)
+    except ValueError:
+        return -1
+
+
+def collapse_threads(message_ids: List[str], thread_ids: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """
+    Keep only the newest listed message of each thread.
+
+    Returns (kept, superseded): kept preserves the order of message_ids, and
+    messages with no known thread are always kept.
+    """
+    newest: Dict[str, str] = {}
+    for msg_id in message_ids:
+        thread_id = thread_ids.get(msg_id)
+        if thread_id and _recency(msg_id) > _recency(newest.get(thread_id, '')):
+            newest[thread_id] = msg_id
+
+    kept, superseded = [], []
+    for msg_id in message_ids:
+        thread_id = thread_ids.get(msg_id)
+        if not thread_id or newest[thread_id] == msg_id:
+            kept.append(msg_id)
+        else:
+            superseded.append(msg_id)
+    return kept, superseded
+
+
+class ThreadDecisions:
+    """
+    Last decision taken for each Gmail thread, persisted between cycles.
+
+    A thread the user declined is skipped before any body is downloaded; a
+    confirmed or detected thread is analysed again when a reply arrives,
+    but an event at the start time already recorded for it is a duplicate.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.threads: Dict[str, Dict] = self._load()
+        self.stats: Counter = Counter()
+
+    def _load(self) -> Dict[str, Dict]:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable thread decisions {self.path}: {e}")
+        return {}
+
+    def save(self) -> None:
+        cutoff = datetime.now().timestamp() - RETENTION_DAYS * 86400
+        self.threads = {
+            thread_id: entry for thread_id, entry in self.threads.items()
+            if entry.get('updated', 0) >= cutoff
+        }
+        with open(self.path, 'w') as f:
+            json.dump(self.threads, f, indent=2)
+
+    def decision(self, thread_id: Optional[str]) -> Optional[str]:
+        entry = self.threads.get(thread_id) if thread_id else None
+        return entry['decision'] if entry else None
+
+    def record(self, thread_id: Optional[str], decision: str, message_id: str,
+               start_time: Optional[str] = None) -> None:
+        if not thread_id:
+            return
+        entry = self.threads.get(thread_id, {})
+        # A user's answer outlives the detector's later guesses about the same thread
+        if entry.get('decision') in (DECLINED, CONFIRMED) and decision in (EVENT, NO_EVENT):
+            decision = entry['decision']
+        self.threads[thread_id] = {
+            'decision': decision,
+            'message_id': message_id,
+            'start_time': start_time or entry.get('start_time'),
+            'updated': datetime.now().timestamp(),
+        }
+
+    def record_answers(self, confirmed: Dict[str, Dict], declined: Dict[str, Dict]) -> None:
+        """Carry the user's confirm/decline answers over to the threads they came from."""
+        for events, decision in ((confirmed, CONFIRMED), (declined, DECLINED)):
+            if not isinstance(events, dict):
+                continue
+            for email_id, details in events.items():
+                if details.get('thread_id'):
+                    entry = self.threads.get(details['thread_id'], {})
+                    entry.update(decision=decision, message_id=email_id,
+                                 start_time=details.get('start_time'), updated=datetime.now().timestamp())
+                    self.threads[details['thread_id']] = entry
+
+    def filter(self, message_ids: List[str], thread_ids: Dict[str, str]) -> Tuple[List[str], List[str]]:
+        """
+        Collapse message_ids to one message per thread and drop declined threads.
+        Returns (to_fetch, skipped).
+        """
+        kept, superseded = collapse_threads(message_ids, thread_ids)
+        to_fetch, declined = [], []
+        for msg_id in kept:
+            (declined if self.decision(thread_ids.get(msg_id)) == DECLINED else to_fetch).append(msg_id)
+        self.stats['superseded'] += len(superseded)
+        self.stats['declined_threads'] += len(declined)
+        return to_fetch, superseded + declined
+
+    def is_duplicate(self, thread_id: Optional[str], start_time: Optional[str]) -> bool:
+        """Whether an event at start_time was already detected or confirmed for this thread."""
+        entry = self.threads.get(thread_id) if thread_id else None
+        duplicate = bool(entry and start_time and entry.get('decision') in (EVENT, CONFIRMED)
+                         and entry.get('start_time') == start_time)
+        if duplicate:
+            self.stats['duplicate_events'] += 1
+        return duplicate
@@ -1,12 +1,29 @@
 import os
+import sys
 import time
 import json
 import logging
+import multiprocessing
 import schedule
 from datetime import datetime
-from backend.gmail_agent import GmailAgent
-from backend.macos_notifications import MacOSNotifier
-from backend.calendar_manager import CalendarManager
+
+# Backend modules import their siblings flat; importing them the same way here
+# loads each module once, so the agent and the backend share its classes and state
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from gmail_agent import GmailAgent
+from gmail_sync import HistorySync
+from gmail_async import iter_emails
+from macos_notifications import MacOSNotifier
+from calendar_manager import CalendarManager
+from api_executor import executor
+from date_cache import date_cache
+from reply_stripper import stripping_stats
+from detection_pool import detector
+from prefilter import PreFilter, model_path
+from thread_collapse import EVENT, NO_EVENT, ThreadDecisions
+from fingerprint import FingerprintIndex
+from calendar_mirror import CalendarMirror
 
 # Configure logging
 logging.basicConfig(
@@ -24,6 +41,17 @@ CREDENTIALS_PATH = os.path.join('credentials', 'client_secrets.json')
 TOKEN_PATH = os.path.join('credentials', 'token.json')
 PENDING_EVENTS_PATH = 'pending_events.json'
 DECLINED_EVENTS_PATH = 'declined_events.json'
+SYNC_STATE_PATH = 'sync_state.json'
+THREAD_DECISIONS_PATH = 'thread_decisions.json'
+FINGERPRINTS_PATH = 'fingerprints.json'
+CALENDAR_MIRROR_PATH = 'calendar_mirror.json'
+# Bits two SimHash fingerprints may differ by and still be treated as copies of one email
+DUPLICATE_MAX_DISTANCE = int(os.environ.get('MYZTRIX_DUPLICATE_DISTANCE', '3'))
+# Fetch message bodies concurrently on an asyncio event loop instead of batched httplib2 calls.
+# Opt-in: it sends one HTTP request per message where the batch path sends one per 50, which
+# only pays off on high-latency links
+USE_ASYNC_FETCH = os.environ.get('MYZTRIX_ASYNC_FETCH') == '1'
+FETCH_CONCURRENCY = 20
 
 def load_json_file(file_path: str, default: dict = None) -> dict:
     """Load JSON file or return default if file doesn't exist."""
@@ -45,31 +73,84 @@ def check_emails():
         declined_events = load_json_file(DECLINED_EVENTS_PATH, {})
         
         # Initialize services
-        agent = GmailAgent(CREDENTIALS_PATH, TOKEN_PATH)
+        agent = GmailAgent(CREDENTIALS_PATH, TOKEN_PATH, defer_writes=True)
         notifier = MacOSNotifier(PENDING_EVENTS_PATH, DECLINED_EVENTS_PATH)
         calendar = CalendarManager(CREDENTIALS_PATH, TOKEN_PATH)
+        sync = HistorySync(SYNC_STATE_PATH)
+        # Each thread is analysed once per cycle, from its newest message
+        threads = ThreadDecisions(THREAD_DECISIONS_PATH)
+        threads.record_answers(pending_events, declined_events)
+        # Forwards, resends and list copies of an email already decided inherit that decision
+        duplicates = FingerprintIndex(FINGERPRINTS_PATH, max_distance=DUPLICATE_MAX_DISTANCE)
+        duplicates.record_answers(pending_events, declined_events)
         
         if not agent.authenticate():
             logger.error("Failed to authenticate with Gmail")
             return
         
-        # Get unread emails
-        emails = agent.get_unread_emails()
-        logger.info(f"Found {len(emails)} unread emails")
+        # What is already on the calendar, brought up to date with one delta request
+        on_calendar = CalendarMirror(CALENDAR_MIRROR_PATH)
+        try:
+            if calendar.authenticate():
+                on_calendar.sync(calendar.service)
+                on_calendar.save()
+        except Exception as e:
+            logger.warning(f"Calendar mirror not refreshed, using the saved copy: {str(e)}")
+        
+        # Stream unread emails added since the last completed cycle, one batch at a time
+        if USE_ASYNC_FETCH:
+            message_ids = agent.collapse_threads(sync.list_new_message_ids(agent.service), sync.thread_ids, threads)
+            # Downloaded and handed to detection one FETCH_CONCURRENCY-sized chunk at a time
+            emails = iter_emails(agent.credentials, message_ids, chunk_size=FETCH_CONCURRENCY,
+                                 concurrency=FETCH_CONCURRENCY, on_triaged_out=agent.mark_as_read)
+        else:
+            # Triaged-out mail is settled like mail without an event; the checkpoint moves past it
+            emails = agent.iter_new_emails(sync, threads, on_triaged_out=agent.mark_as_read)
         
-        for email in emails:
-            # Skip if email already processed
-            if email['id'] in pending_events or email['id'] in declined_events:
-                continue
-            
-            # Detect event
-            is_event, confidence, event_details = agent.detect_event(email)
-            
+        # Learned per user from their confirm/decline decisions; in shadow mode it only reports
+        prefilter = PreFilter(model_path(agent.account_email()))
+        prefilter.learn_decisions({}, declined_events)
+        # Emails the user answered a notification for this cycle; only these are confirmations
+        answered = {}
+        
+        email_count = 0
+
+        def unprocessed(emails):
+            nonlocal email_count
+            for email in emails:
+                email_count += 1
+                # Skip if email already processed
+                if email['id'] in pending_events or email['id'] in declined_events:
+                    agent.settled.add(email['id'])
+                    agent.resolve_thread(email.get('thread_id'), found_event=True)
+                    continue
+                if duplicates.lookup(email):
+                    agent.mark_as_read(email['id'])
+                    continue
+                if prefilter.admit(email):
+                    yield email
+                else:
+                    agent.mark_as_read(email['id'])
+
+        def handle(email, is_event, confidence, event_details):
+            prefilter.observe(email, is_event)
+            duplicates.record(email, EVENT if is_event else NO_EVENT)
+            if is_event and threads.is_duplicate(email.get('thread_id'), event_details['start_time']):
+                # A reply in a thread whose event is already known
+                agent.mark_as_read(email['id'])
+                return
+            threads.record(email.get('thread_id'), EVENT if is_event else NO_EVENT, email['id'],
+                           event_details['start_time'] if is_event else None)
+            if is_event and on_calendar.contains(event_details):
+                # The invite was accepted, or the event was created, already
+                agent.mark_as_read(email['id'])
+                return
             if is_event and confidence >= 0.6:
                 logger.info(f"Detected event in email: {email['subject']} (confidence: {confidence:.2f})")
                 
                 # Send notification
                 if notifier.send_notification(email['id'], event_details):
+                    answered[email['id']] = event_details
                     # Mark email as read if notification was sent successfully
                     agent.mark_as_read(email['id'])
                     
@@ -79,6 +160,33 @@ def check_emails():
             else:
                 # Mark non-event emails as read
                 agent.mark_as_read(email['id'])
+
+        # Detect events across worker processes; results keep the mailbox order
+        for email, (is_event, confidence, event_details) in detector.detect_stream(unprocessed(emails)):
+            handle(email, is_event, confidence, event_details)
+            # Older messages of the thread are only skipped if this one carried its event
+            agent.resolve_thread(email.get('thread_id'), found_event=is_event)
+
+        # A reply quotes away the invite it answers, so threads without an event are read in full
+        for email, result in detector.detect_stream(unprocessed(agent.iter_held_back_emails(on_triaged_out=agent.mark_as_read))):
+            handle(email, *result)
+        
+        logger.info(f"Processed {email_count} new unread emails")
+        
+        # Learn this cycle's answers before the pending events are turned into calendar entries
+        confirmed = load_json_file(PENDING_EVENTS_PATH, {})
+        declined = load_json_file(DECLINED_EVENTS_PATH, {})
+        prefilter.learn_decisions({email_id: confirmed[email_id] for email_id in answered if email_id in confirmed},
+                                  declined)
+        prefilter.save()
+        threads.record_answers(confirmed, declined)
+        threads.save()
+        duplicates.record_answers(confirmed, declined)
+        duplicates.save()
+        
+        # Write this cycle's read/label changes in a few batchModify calls
+        agent.flush_writes()
+        unwritten = agent.pending_writes()
         
         # Process any pending events that haven't been shown as notifications
         notifier.process_pending_events()
@@ -86,6 +194,26 @@ def check_emails():
         # Process any pending events for calendar creation
         calendar.process_pending_events(PENDING_EVENTS_PATH)
         
+        # Only advance the history checkpoint once the whole cycle succeeded; messages
+        # whose read/label changes were lost with this agent are listed again next cycle
+        if unwritten:
+            logger.warning(f"{unwritten} messages not marked in Gmail; replaying them next cycle")
+            sync.rollback()
+        else:
+            # Failed downloads and notifications are kept with the checkpoint and listed again
+            unprocessed = [msg_id for msg_id in sync.listed_ids if msg_id not in agent.settled]
+            if unprocessed:
+                logger.warning(f"{len(unprocessed)} messages not processed; retrying them next cycle")
+            sync.commit(unprocessed)
+        
+        logger.info(f"Google API usage so far: {executor.stats()}")
+        logger.info(f"Date parse cache: {date_cache.stats()}")
+        logger.info(f"Quoted text stripped before detection: {stripping_stats()}")
+        logger.info(f"Pre-filter: {prefilter.report()}")
+        logger.info(f"Thread collapsing: {dict(threads.stats)}")
+        logger.info(f"Near-duplicates: {dict(duplicates.stats)}")
+        logger.info(f"Calendar mirror: {len(on_calendar.events)} events, {dict(on_calendar.stats)}")
+        
     except Exception as e:
         logger.error(f"Error in check_emails: {str(e)}")
 
@@ -105,4 +233,6 @@ def main():
         time.sleep(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Detection workers re-run this module when the agent is a frozen executable
+    multiprocessing.freeze_support()
+    main()
\ No newline at end of file
@@ -1,11 +1,16 @@
 import os
+import sys
 import json
 import time
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Optional
-from backend.gmail_agent import GmailAgent
-from backend.calendar_manager import CalendarManager
+
+# Backend modules import their siblings flat, so backend/ goes on the path as in run_agent
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from gmail_agent import GmailAgent
+from calendar_manager import CalendarManager
 
 # Configure logging
 logging.basicConfig(
@@ -1,8 +1,35 @@
 import pytest
+from google.oauth2.credentials import Credentials
+
 from main import app as flask_app
+from fake_google_api import FakeGoogleState, serve
+from google_services import build_service
 
 @pytest.fixture
 def client():
     flask_app.config['TESTING'] = True
     with flask_app.test_client() as client:
-        yield client
\ No newline at end of file
+        yield client
+
+
+@pytest.fixture
+def fake_google(monkeypatch):
+    """Serves a FakeGoogleState and points every Google client at it; returns the state."""
+    servers = []
+
+    def start(state):
+        server = serve(state)
+        servers.append(server)
+        monkeypatch.setenv('MYZTRIX_GOOGLE_API_ROOT', f'http://127.0.0.1:{server.server_port}/')
+        return state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def calendar(fake_google):
+    """(fake API state, Calendar client talking to it)."""
+    state = fake_google(FakeGoogleState())
+    return state, build_service('calendar', 'v3', Credentials(token='test'))
@@ -14,3 +14,24 @@ def test_declined_api_flow(client):
     # Fetch declined page
     res = client.get('/declined')
     assert b"Sample Event" in res.data or b"No declined events" in res.data
+
+
+def test_scan_lists_mirrored_events_in_the_page_shape(client, monkeypatch):
+    import time
+    import main
+    from calendar_mirror import CalendarMirror
+
+    mirror = CalendarMirror()
+    mirror.sync_token, mirror.synced_at = 'token', time.time()
+    mirror._upsert({'id': 'e1', 'summary': 'Standup', 'htmlLink': 'https://calendar/e1',
+                    'start': {'dateTime': '2025-06-03T10:00:00Z'}, 'end': {'dateTime': '2025-06-03T11:00:00Z'}})
+    monkeypatch.setattr(main, 'calendar_mirror', mirror)
+    monkeypatch.setattr(main, 'get_calendar_service', lambda: None)
+
+    res = client.get('/scan?start=2025-06-01T00:00:00Z&end=2025-06-08T00:00:00Z')
+    assert res.status_code == 200
+    assert res.get_json()['events'] == [{
+        'id': 'e1', 'summary': 'Standup', 'description': '', 'location': '',
+        'start_time': '2025-06-03T10:00:00Z', 'end_time': '2025-06-03T11:00:00Z',
+        'html_link': 'https://calendar/e1', 'on_calendar': True,
+    }]
@@ -0,0 +1,63 @@
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import api_executor
+from api_executor import RequestExecutor
+
+
+class FlakyRequest:
+    methodId = 'gmail.users.messages.get'
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'id': 'm1'}
+
+
+def http_error(status, headers=None):
+    return HttpError(httplib2.Response({'status': status, **(headers or {})}), b'')
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(api_executor.time, 'sleep', calls.append)
+    return calls
+
+
+def test_retries_throttled_request_honouring_retry_after(sleeps):
+    executor = RequestExecutor()
+    request = FlakyRequest([http_error(429, {'retry-after': '7'}), http_error(503)])
+
+    assert executor.execute(request) == {'id': 'm1'}
+    assert request.calls == 3
+    assert sleeps[0] == 7.0
+    stats = executor.stats()
+    assert stats['throttled'] == {'gmail.users.messages.get': 1}
+    assert stats['retries'] == {'gmail.users.messages.get': 2}
+    assert stats['units'] == {'gmail.users.messages.get': 15}
+
+
+def test_client_errors_are_not_retried(sleeps):
+    executor = RequestExecutor()
+    request = FlakyRequest([http_error(404)])
+
+    with pytest.raises(HttpError):
+        executor.execute(request)
+    assert request.calls == 1
+    assert executor.stats()['failures'] == {'gmail.users.messages.get': 1}
+
+
+def test_gives_up_after_max_retries(sleeps):
+    executor = RequestExecutor(max_retries=2)
+    request = FlakyRequest([http_error(500)] * 5)
+
+    with pytest.raises(HttpError):
+        executor.execute(request)
+    assert request.calls == 3
@@ -0,0 +1,64 @@
+from calendar_batch import batch_insert_events, event_id, event_time
+from calendar_manager import CalendarManager
+
+
+def _event(index, **extra):
+    return dict({
+        'summary': f'Event {index}',
+        'start': {'dateTime': f'2025-06-{index % 28 + 1:02d}T10:00:00', 'timeZone': 'UTC'},
+        'end': {'dateTime': f'2025-06-{index % 28 + 1:02d}T11:00:00', 'timeZone': 'UTC'},
+    }, **extra)
+
+
+def test_inserts_go_out_in_batches(calendar):
+    state, service = calendar
+    # Kept small: inserts are still paced by the per-user Calendar quota
+    events = {f'email{i}': _event(i) for i in range(12)}
+
+    results = batch_insert_events(service, events, batch_size=5)
+
+    assert list(results) == list(events)
+    assert all(results[key]['summary'] == events[key]['summary'] for key in events)
+    assert len(state.events) == 12
+    assert state.requests == 3
+
+
+def test_failed_inserts_are_reported_per_event(calendar):
+    state, service = calendar
+    results = batch_insert_events(service, {
+        'bad': _event(2, id='Not_A_Valid_Id'),
+        'ok': _event(3),
+    })
+
+    assert results['bad'] is None
+    assert results['ok']['summary'] == 'Event 3'
+
+
+def test_retried_inserts_do_not_duplicate(calendar):
+    state, service = calendar
+    events = {f'email{i}': _event(i) for i in range(4)}
+    first = batch_insert_events(service, dict(list(events.items())[:2]))
+
+    results = batch_insert_events(service, events)
+
+    assert all(results.values())
+    assert len(state.events) == 4
+    assert results['email0']['id'] == first['email0']['id'] == event_id('email0', events['email0'])
+
+
+def test_event_id_is_valid_and_stable():
+    utc = _event(1)
+    offset = _event(1, start={'dateTime': '2025-06-02T12:00:00+02:00'})
+    assert event_id('email1', utc) == event_id('email1', offset)
+    assert event_id('email1', utc) != event_id('email2', utc)
+    assert set(event_id('email1', utc)) <= set('0123456789abcdefghijklmnopqrstuv')
+
+
+def test_naive_times_are_utc_on_every_insert_path():
+    pending = {'title': 'Standup', 'description': '', 'email_id': 'msg1',
+               'start_time': '2025-06-03T10:00:00', 'end_time': '2025-06-03T11:00:00'}
+    body = CalendarManager('credentials.json', 'token.json')._event_body(pending)
+
+    assert body['start'] == event_time(pending['start_time']) == {'dateTime': '2025-06-03T10:00:00', 'timeZone': 'UTC'}
+    assert event_id('msg1', body) == event_id('msg1', {'start': event_time('2025-06-03T12:00:00+02:00')})
+    assert event_time('2025-06-03T10:00:00', 'Europe/Paris')['timeZone'] == 'Europe/Paris'
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+
+from calendar_batch import batch_insert_events, event_id
+from calendar_mirror import CalendarMirror
+
+
+def _event(day, title='Standup', **extra):
+    return dict({
+        'summary': title,
+        'start': {'dateTime': f'2025-06-{day:02d}T10:00:00Z'},
+        'end': {'dateTime': f'2025-06-{day:02d}T11:00:00Z'},
+    }, **extra)
+
+
+def test_deltas_after_the_first_full_sync(calendar, tmp_path):
+    state, service = calendar
+    created = batch_insert_events(service, {'a': _event(3), 'b': _event(1), 'c': _event(5)})
+    mirror = CalendarMirror(str(tmp_path / 'mirror.json'))
+
+    assert mirror.sync(service) == 3
+    service.events().delete(calendarId='primary', eventId=created['b']['id']).execute()
+    batch_insert_events(service, {'d': _event(4, title='Review')})
+    requests = state.requests
+
+    assert mirror.sync(service) == 2
+    assert state.requests == requests + 1
+    assert mirror.stats['full_syncs'] == 1
+    mirror.save()
+
+    reloaded = CalendarMirror(str(tmp_path / 'mirror.json'))
+    june = reloaded.between(datetime(2025, 6, 1), datetime(2025, 6, 5))
+    assert [e['summary'] for e in june] == ['Standup', 'Review']
+
+
+def test_expired_sync_token_triggers_full_sync(calendar):
+    state, service = calendar
+    batch_insert_events(service, {'a': _event(3)})
+    mirror = CalendarMirror()
+    mirror.sync(service)
+    mirror.sync_token = 'expired'
+
+    assert mirror.sync(service) == 1
+    assert mirror.stats['full_syncs'] == 2
+    assert len(mirror.events) == 1
+
+
+def test_already_on_calendar_lookups():
+    mirror = CalendarMirror()
+    mirror._upsert(dict(_event(3), id='e1', iCalUID='invite-1@example.com'))
+
+    assert mirror.find('invite-1@example.com')['id'] == 'e1'
+    assert mirror.contains({'ical_uid': 'invite-1@example.com', 'start_time': '2030-01-01T00:00:00'})
+    assert mirror.contains({'title': 'Re: standup', 'start_time': '2025-06-03T12:00:00+02:00'})
+    assert not mirror.contains({'title': 'Standup', 'start_time': '2025-06-03T11:00:00+00:00'})
+    assert not mirror.contains({'title': 'Lunch', 'start_time': '2025-06-03T10:00:00'})
+    created = {'start': {'dateTime': '2025-06-07T09:00:00', 'timeZone': 'UTC'}}
+    mirror._upsert(dict(created, id=event_id('msg1', created), summary='Renamed by the user'))
+    assert mirror.contains({'email_id': 'msg1', 'title': 'Standup', 'start_time': '2025-06-07T09:00:00'})
+    assert mirror.between(datetime(2025, 6, 3, 10, tzinfo=timezone.utc), datetime(2025, 6, 4))[0]['id'] == 'e1'
+
+
+def test_recurring_series_are_expanded_per_query():
+    mirror = CalendarMirror()
+    mirror._upsert({
+        'id': 'weekly', 'iCalUID': 'weekly@example.com', 'summary': 'Standup',
+        'start': {'dateTime': '2025-01-06T09:00:00+01:00', 'timeZone': 'Europe/Paris'},
+        'end': {'dateTime': '2025-01-06T09:30:00+01:00', 'timeZone': 'Europe/Paris'},
+        'recurrence': ['RRULE:FREQ=WEEKLY;BYDAY=MO', 'EXDATE;TZID=Europe/Paris:20250609T090000'],
+    })
+    mirror._upsert({
+        'id': 'weekly_20250616T070000Z', 'recurringEventId': 'weekly', 'summary': 'Standup (moved)',
+        'originalStartTime': {'dateTime': '2025-06-16T09:00:00+02:00', 'timeZone': 'Europe/Paris'},
+        'start': {'dateTime': '2025-06-17T09:00:00+02:00'}, 'end': {'dateTime': '2025-06-17T09:30:00+02:00'},
+    })
+    mirror._upsert({
+        'id': 'weekly_20250623T070000Z', 'recurringEventId': 'weekly', 'status': 'cancelled',
+        'originalStartTime': {'dateTime': '2025-06-23T09:00:00+02:00', 'timeZone': 'Europe/Paris'},
+    })
+
+    june = mirror.between(datetime(2025, 6, 1), datetime(2025, 7, 1))
+    assert [(e['id'], e['start']['dateTime']) for e in june] == [
+        ('weekly_20250602T070000Z', '2025-06-02T09:00:00+02:00'),
+        ('weekly_20250616T070000Z', '2025-06-17T09:00:00+02:00'),
+        ('weekly_20250630T070000Z', '2025-06-30T09:00:00+02:00'),
+    ]
+    assert june[0]['recurringEventId'] == 'weekly' and 'recurrence' not in june[0]
+    assert mirror.contains({'title': 'Standup', 'start_time': '2025-06-30T07:00:00Z'})
+    assert not mirror.contains({'title': 'Standup', 'start_time': '2025-06-09T07:00:00Z'})
+    assert not mirror.contains({'title': 'Standup', 'start_time': '2025-06-23T07:00:00Z'})
+
+
+def test_between_includes_events_that_started_earlier():
+    mirror = CalendarMirror()
+    mirror._upsert({'id': 'trip', 'summary': 'Conference',
+                    'start': {'date': '2025-06-01'}, 'end': {'date': '2025-06-06'}})
+    mirror._upsert(dict(_event(2), id='e1'))
+    mirror._upsert({'id': 'daily', 'summary': 'Night shift', 'recurrence': ['RRULE:FREQ=DAILY;COUNT=10'],
+                    'start': {'dateTime': '2025-06-01T22:00:00Z'}, 'end': {'dateTime': '2025-06-02T06:00:00Z'}})
+
+    found = mirror.between(datetime(2025, 6, 4, 3), datetime(2025, 6, 4, 12))
+    assert [e['id'] for e in found] == ['trip', 'daily_20250603T220000Z']
+    # End times are exclusive: the trip is over by June 6th
+    found = mirror.between(datetime(2025, 6, 6), datetime(2025, 6, 7))
+    assert [e['id'] for e in found] == ['daily_20250605T220000Z', 'daily_20250606T220000Z']
@@ -0,0 +1,112 @@
+import json
+import os
+import stat
+import threading
+import time
+from datetime import datetime, timedelta
+
+from credential_manager import CredentialManager, ManagedCredentials, write_token
+
+TOKEN = {'token': 'old', 'refresh_token': 'r', 'client_id': 'id', 'client_secret': 's',
+         'token_uri': 'https://oauth2.googleapis.com/token'}
+
+
+class TokenResponse:
+    def __init__(self, token):
+        self.status = 200
+        self.headers = {}
+        self.data = json.dumps({'access_token': token, 'expires_in': 3600}).encode()
+
+
+class TokenEndpoint:
+    """Stands in for google.auth's Request, counting calls to the token endpoint."""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method='GET', body=None, headers=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            token = f'new-{self.calls}'
+        time.sleep(self.delay)
+        return TokenResponse(token)
+
+
+def write(path, expiry):
+    path.write_text(json.dumps(dict(TOKEN, expiry=expiry.strftime('%Y-%m-%dT%H:%M:%SZ'))))
+
+
+def load(path):
+    credentials = ManagedCredentials.from_authorized_user_file(str(path))
+    credentials.token_path = str(path)
+    return credentials
+
+
+def test_write_token_is_atomic_and_private(tmp_path):
+    path = tmp_path / 'token.json'
+    write_token(str(path), ManagedCredentials.from_authorized_user_info(TOKEN))
+    assert json.loads(path.read_text())['token'] == 'old'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert [p.name for p in tmp_path.iterdir()] == ['token.json']
+
+
+def test_concurrent_refreshes_hit_the_endpoint_once(tmp_path):
+    path = tmp_path / 'token.json'
+    write(path, datetime.utcnow() - timedelta(minutes=1))
+    credentials = load(path)
+    endpoint = TokenEndpoint(delay=0.05)
+
+    threads = [threading.Thread(target=credentials.refresh, args=(endpoint,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert endpoint.calls == 1
+    assert credentials.token == 'new-1'
+    assert json.loads(path.read_text())['token'] == 'new-1'
+
+
+def test_token_refreshed_by_another_process_is_adopted(tmp_path):
+    path = tmp_path / 'token.json'
+    write(path, datetime.utcnow() - timedelta(minutes=1))
+    credentials = load(path)
+    other = dict(TOKEN, token='from-disk', expiry=(datetime.utcnow() + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+    path.write_text(json.dumps(other))
+
+    endpoint = TokenEndpoint()
+    credentials.refresh(endpoint)
+    assert endpoint.calls == 0
+    assert credentials.token == 'from-disk'
+
+
+def test_manager_refreshes_within_margin(tmp_path, monkeypatch):
+    path = tmp_path / 'token.json'
+    write(path, datetime.utcnow() + timedelta(minutes=2))
+    endpoint = TokenEndpoint()
+    monkeypatch.setattr('credential_manager.Request', lambda: endpoint)
+    manager = CredentialManager(margin=timedelta(minutes=5), background=False)
+
+    credentials = manager.get(path)
+    assert endpoint.calls == 1
+    assert credentials.token == 'new-1'
+    assert manager.get(str(path)) is credentials
+    assert endpoint.calls == 1
+
+
+def test_background_refresh_runs_before_expiry(tmp_path, monkeypatch):
+    path = tmp_path / 'token.json'
+    write(path, datetime.utcnow() + timedelta(minutes=5, seconds=1))
+    endpoint = TokenEndpoint()
+    monkeypatch.setattr('credential_manager.Request', lambda: endpoint)
+    manager = CredentialManager(margin=timedelta(minutes=5))
+
+    credentials = manager.get(path)
+    assert credentials.token == 'old'
+    deadline = time.time() + 5
+    while credentials.token == 'old' and time.time() < deadline:
+        time.sleep(0.05)
+    manager.clear()
+    assert credentials.token == 'new-1'
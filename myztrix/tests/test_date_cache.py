@@ -0,0 +1,68 @@
+import threading
+from datetime import datetime
+
+from date_cache import DateParseCache
+
+SETTINGS = {'PREFER_DATES_FROM': 'future'}
+
+
+def test_repeated_phrase_is_a_hit():
+    cache = DateParseCache()
+    reference = datetime(2025, 6, 2, 9, 0)
+    first = cache.parse('Friday at 10 AM', reference, SETTINGS)
+    second = cache.parse('  friday at 10 am ', reference.replace(hour=15), SETTINGS)
+
+    assert first == second == datetime(2025, 6, 6, 10, 0)
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'uncacheable': 0, 'size': 1}
+
+
+def test_reference_day_is_part_of_the_key():
+    cache = DateParseCache()
+    assert cache.parse('tomorrow at 2 PM', datetime(2025, 6, 2, 9, 0), SETTINGS) == datetime(2025, 6, 3, 14, 0)
+    assert cache.parse('tomorrow at 2 PM', datetime(2025, 6, 5, 9, 0), SETTINGS) == datetime(2025, 6, 6, 14, 0)
+    assert cache.misses == 2
+
+
+def test_time_taken_from_reference_is_rebased():
+    cache = DateParseCache()
+    assert cache.parse('tomorrow', datetime(2025, 6, 2, 9, 0), SETTINGS) == datetime(2025, 6, 3, 9, 0)
+    assert cache.parse('tomorrow', datetime(2025, 6, 2, 16, 30), SETTINGS) == datetime(2025, 6, 3, 16, 30)
+    assert cache.hits == 1
+
+
+def test_sub_day_relative_phrases_bypass_the_cache():
+    cache = DateParseCache()
+    cache.parse('in 2 hours', datetime(2025, 6, 2, 9, 0))
+    assert cache.uncacheable == 1
+    assert len(cache) == 0
+
+
+def test_failures_are_cached_and_size_is_bounded():
+    cache = DateParseCache(maxsize=2)
+    reference = datetime(2025, 6, 2, 9, 0)
+    for phrase in ('not a date', 'also not a date', 'still not a date', 'not a date'):
+        assert cache.parse(phrase, reference) is None
+    assert len(cache) == 2
+    assert cache.hits == 0
+
+
+def test_explicit_time_equal_to_reference_is_not_rebased():
+    cache = DateParseCache()
+    assert cache.parse('tomorrow at 9 am', datetime(2025, 6, 2, 9, 0), SETTINGS) == datetime(2025, 6, 3, 9, 0)
+    assert cache.parse('tomorrow at 9 am', datetime(2025, 6, 2, 16, 30), SETTINGS) == datetime(2025, 6, 3, 9, 0)
+    assert cache.parse('June 5 2025', datetime(2025, 6, 2, 0, 0), SETTINGS) == datetime(2025, 6, 5, 0, 0)
+    assert cache.parse('June 5 2025', datetime(2025, 6, 2, 11, 0), SETTINGS) == datetime(2025, 6, 5, 0, 0)
+    assert cache.hits == 2
+
+
+def test_counters_are_consistent_across_threads():
+    cache = DateParseCache()
+    reference = datetime(2025, 6, 2, 9, 0)
+    cache.parse('not a date', reference)
+    threads = [threading.Thread(target=lambda: [cache.parse('not a date', reference) for _ in range(200)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()['hits'] == 1600
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from date_grammar import find_spans, parse_span
+
+REFERENCE = datetime(2025, 6, 2, 9, 0)  # a Monday
+
+
+@pytest.mark.parametrize('text, start', [
+    ('Departure on 2025-07-01 at 09:30 from gate 12', datetime(2025, 7, 1, 9, 30)),
+    ('Mon 12 Jun 14:00', datetime(2025, 6, 12, 14, 0)),
+    ('the conference on June 12th at 3pm', datetime(2025, 6, 12, 15, 0)),
+    ('12th of June 2025', datetime(2025, 6, 12, 0, 0)),
+    ('next Monday at 5 PM', datetime(2025, 6, 9, 17, 0)),
+    ('Friday, 10am', datetime(2025, 6, 6, 10, 0)),
+    ('2 p.m. tomorrow', datetime(2025, 6, 3, 14, 0)),
+    ('3pm on Friday', datetime(2025, 6, 6, 15, 0)),
+    ('noon tomorrow', datetime(2025, 6, 3, 12, 0)),
+    ('May 2nd at 4 PM', datetime(2026, 5, 2, 16, 0)),
+])
+def test_common_formats(text, start):
+    spans = find_spans(text, REFERENCE)
+    assert [span.start for span in spans] == [start]
+
+
+@pytest.mark.parametrize('text, start, end', [
+    ('today 2-3pm', datetime(2025, 6, 2, 14, 0), datetime(2025, 6, 2, 15, 0)),
+    ('Thursday from 2 to 4pm', datetime(2025, 6, 5, 14, 0), datetime(2025, 6, 5, 16, 0)),
+    ('11-1pm', datetime(2025, 6, 2, 11, 0), datetime(2025, 6, 2, 13, 0)),
+    ('14:00–15:30', datetime(2025, 6, 2, 14, 0), datetime(2025, 6, 2, 15, 30)),
+    ('10:30pm-1am', datetime(2025, 6, 2, 22, 30), datetime(2025, 6, 3, 1, 0)),
+])
+def test_ranges_give_an_end_time(text, start, end):
+    span = parse_span(text, REFERENCE)
+    assert (span.start, span.end) == (start, end)
+
+
+def test_ordinary_text_has_no_spans():
+    assert find_spans('I sat down on Wed. Call 555-1234 for version 10 to 12.', REFERENCE) == []
+    assert find_spans('31 June', REFERENCE) == []
+
+
+def test_leftovers_fall_back_to_dateparser():
+    span = parse_span('in 3 days', REFERENCE)
+    assert span.start.date() == datetime(2025, 6, 5).date()
+    assert span.end is None
+
+
+@pytest.mark.parametrize('text', ['Meeting on 6/12/2025 at 3pm', 'Meeting on 12.06.2025 at 3pm'])
+def test_numeric_dates(text):
+    assert parse_span(text, REFERENCE).start == datetime(2025, 6, 12, 15, 0)
+
+
+def test_time_only_spans_check_dateparser_for_the_day():
+    assert parse_span('in 3 days at 3pm', REFERENCE).start == datetime(2025, 6, 5, 15, 0)
+    assert parse_span('meeting at 3pm', REFERENCE).start == datetime(2025, 6, 2, 15, 0)
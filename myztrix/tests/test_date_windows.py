@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from date_windows import date_candidates, find_event_datetime
+
+REFERENCE = datetime(2025, 6, 2, 9, 0)
+KEYWORDS = {'meeting', 'call'}
+
+
+def test_finds_phrase_near_keyword():
+    text = 'Hi,\n\nCan we have a meeting tomorrow at 2 PM to go over the roadmap?\n\nThanks'
+    assert find_event_datetime(text, KEYWORDS, REFERENCE) == datetime(2025, 6, 3, 14, 0)
+
+
+def test_next_weekday_and_dotted_meridiem():
+    assert find_event_datetime('Free for a call next Monday at 5 PM?', KEYWORDS, REFERENCE) == \
+        datetime(2025, 6, 9, 17, 0)
+    assert find_event_datetime('call at 2 p.m. tomorrow please', KEYWORDS, REFERENCE) == \
+        datetime(2025, 6, 3, 14, 0)
+
+
+def test_quoted_history_does_not_outrank_the_new_message():
+    text = ('Meeting tomorrow at 2 PM.\n\nOn Tue, 3 Jun 2025 at 09:12, Someone wrote:\n'
+            + '> Earlier note about a meeting on May 2nd at 4 PM.\n' * 50)
+    assert find_event_datetime(text, KEYWORDS, REFERENCE) == datetime(2025, 6, 3, 14, 0)
+
+
+def test_ordinary_words_are_not_dates():
+    assert date_candidates('You may want to check this. It takes 30 minutes.') == []
+    assert find_event_datetime('Thanks, see attached.', KEYWORDS, REFERENCE) is None
+
+
+def test_long_bodies_are_only_scanned_near_the_top():
+    text = 'Meeting tomorrow at 2 PM. ' + 'Confidential footer. ' * 50000 + 'Call on Friday at 10 AM.'
+    assert [c.phrase for c in date_candidates(text, KEYWORDS)] == ['tomorrow at 2 pm']
+
+
+def test_numeric_dates_are_not_read_as_today():
+    text = 'Team meeting on 6/12/2025 at 3pm in room 4.'
+    assert find_event_datetime(text, KEYWORDS, REFERENCE) == datetime(2025, 6, 12, 15, 0)
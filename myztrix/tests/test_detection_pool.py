@@ -0,0 +1,28 @@
+from detection_pool import DetectionExecutor
+from event_detector import detect_event
+from gmail_message import parse_message
+from synthetic_mailbox import generate_mailbox
+
+
+def _summary(results):
+    return [(is_event, round(confidence, 3), details and details['email_id'])
+            for is_event, confidence, details in results]
+
+
+def test_pool_matches_inline_detection_in_order():
+    emails = [parse_message(msg) for msg in generate_mailbox(80, seed=3)]
+    inline = [detect_event(email) for email in emails]
+
+    with DetectionExecutor(workers=2, min_batch=10, chunksize=8) as pool:
+        assert _summary(pool.map(emails)) == _summary(inline)
+        assert pool._pool is not None
+
+
+def test_small_batches_stay_inline():
+    emails = [parse_message(msg) for msg in generate_mailbox(5, seed=1)]
+    with DetectionExecutor(workers=2, min_batch=10) as pool:
+        streamed = list(pool.detect_stream(emails, batch_size=3))
+        assert pool._pool is None
+
+    assert [email['id'] for email, _ in streamed] == [email['id'] for email in emails]
+    assert _summary(result for _, result in streamed) == _summary(detect_event(email) for email in emails)
@@ -0,0 +1,31 @@
+from email_triage import TRIAGE_THRESHOLD, score_metadata
+
+
+def metadata(subject, snippet='', **headers):
+    header_list = [{'name': 'Subject', 'value': subject}]
+    header_list += [{'name': name.replace('_', '-'), 'value': value} for name, value in headers.items()]
+    return {'id': 'm1', 'snippet': snippet, 'sizeEstimate': 2048, 'payload': {'headers': header_list}}
+
+
+def test_meeting_with_date_passes():
+    msg = metadata('Project meeting', 'Can we meet tomorrow at 2 PM?')
+    assert score_metadata(msg) >= TRIAGE_THRESHOLD
+
+
+def test_calendar_invite_always_passes():
+    msg = metadata('Lunch', Content_Type='text/calendar; method=REQUEST')
+    assert score_metadata(msg) == 1.0
+
+
+def test_newsletter_is_filtered():
+    msg = metadata('Our weekly deals', 'Save 20% on everything', List_Unsubscribe='<mailto:x@y.z>')
+    assert score_metadata(msg) < TRIAGE_THRESHOLD
+
+
+def test_multipart_invites_pass_on_metadata_signals():
+    assert score_metadata(metadata('Invitation: Sync @ Thu 12 Jun', Content_Type='multipart/mixed')) == 1.0
+    assert score_metadata(metadata('Lunch', Content_Type='multipart/alternative',
+                                   Sender='Google Calendar <calendar-notification@google.com>')) == 1.0
+    assert score_metadata(metadata('Sync', Content_Class='urn:content-classes:calendarmessage')) == 1.0
+    assert score_metadata(metadata('Sync', 'invite.ics')) == 1.0
+    assert score_metadata(metadata('Invitations are open for the gala')) < 1.0
@@ -0,0 +1,137 @@
+import base64
+import threading
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from event_detector import detect_event
+from fake_google_api import FakeGoogleState
+from gmail_agent import GmailAgent
+from gmail_batch import batch_get_messages
+from gmail_labels import LabelRegistry, ModifyBatcher
+from gmail_sync import HistorySync, list_unread_message_ids
+from google_services import build_service
+from synthetic_mailbox import generate_mailbox
+from thread_collapse import ThreadDecisions
+
+
+@pytest.fixture
+def fake_api(fake_google):
+    return fake_google(FakeGoogleState(generate_mailbox(20)))
+
+
+def test_batch_get_round_trips_through_fake_server(fake_api):
+    service = build_service('gmail', 'v1', Credentials(token='test'))
+    ids = list_unread_message_ids(service)
+    messages = batch_get_messages(service, ids, format='metadata', metadata_headers=['Subject'])
+
+    assert len(ids) == 20
+    assert [m['id'] for m in messages] == ids
+    assert all(h['name'] == 'Subject' for m in messages for h in m['payload']['headers'])
+
+
+def test_history_sync_sees_only_new_messages(fake_api, tmp_path):
+    service = build_service('gmail', 'v1', Credentials(token='test'))
+    sync = HistorySync(str(tmp_path / 'sync_state.json'))
+    assert len(sync.list_new_message_ids(service)) == 20
+    sync.commit()
+
+    fake_api.add_message(dict(generate_mailbox(1, seed=1)[0], id='new'))
+    assert sync.list_new_message_ids(service) == ['new']
+
+
+def test_agent_downloads_one_message_per_thread(fake_api, tmp_path):
+    agent = GmailAgent(triage_threshold=None, defer_writes=True)
+    agent.credentials = Credentials(token='test')
+    agent.service = build_service('gmail', 'v1', agent.credentials)
+    agent.labels = LabelRegistry(agent.service)
+    agent.modifications = ModifyBatcher(agent.service, agent.labels)
+    threads = ThreadDecisions(str(tmp_path / 'threads.json'))
+
+    emails = agent.get_new_emails(HistorySync(str(tmp_path / 'sync_state.json')), threads)
+    thread_ids = {m['threadId'] for m in fake_api.messages.values()}
+
+    assert sorted(e['thread_id'] for e in emails) == sorted(thread_ids)
+    assert threads.stats['superseded'] == 20 - len(thread_ids)
+
+
+def test_calendar_insert_conflict(fake_api):
+    service = build_service('calendar', 'v3', Credentials(token='test'))
+    body = {'id': 'abc123', 'summary': 'Demo', 'start': {'dateTime': '2025-06-03T10:00:00Z'}}
+    service.events().insert(calendarId='primary', body=body).execute()
+
+    with pytest.raises(Exception) as error:
+        service.events().insert(calendarId='primary', body=body).execute()
+    assert error.value.resp.status == 409
+
+
+def test_invite_answered_in_the_same_cycle_is_not_lost(tmp_path, fake_google):
+    invite = dict(generate_mailbox(1, invite_ratio=1.0)[0], id='00000000000000a1', threadId='t1')
+    reply = dict(generate_mailbox(1, invite_ratio=0.0, event_ratio=0.0, newsletter_ratio=0.0)[0],
+                 id='00000000000000a2', threadId='t1')
+    quoted = 'Sounds good, see you there!\n\nOn Mon, 2 Jun 2025 at 09:00, Alice <alice@example.com> wrote:\n> ' \
+             + invite['snippet']
+    reply['payload'] = dict(reply['payload'], mimeType='text/plain', parts=[],
+                            body={'data': base64.urlsafe_b64encode(quoted.encode()).decode()})
+    state = fake_google(FakeGoogleState([reply, invite]))
+    agent = GmailAgent(triage_threshold=None)
+    agent.credentials = Credentials(token='test')
+    agent.service = build_service('gmail', 'v1', agent.credentials)
+    threads = ThreadDecisions(str(tmp_path / 'threads.json'))
+
+    [newest] = agent.get_new_emails(HistorySync(str(tmp_path / 'sync_state.json')), threads)
+    assert newest['id'] == reply['id']
+    is_event, _, _ = detect_event(newest)
+    agent.resolve_thread(newest['thread_id'], found_event=is_event)
+
+    assert not is_event
+    assert 'UNREAD' in state.messages[invite['id']]['labelIds']
+    [older] = agent.iter_held_back_emails()
+    assert detect_event(older)[0]
+
+
+def test_triaged_out_messages_are_marked_read(fake_api, tmp_path):
+    agent = GmailAgent()
+    agent.credentials = Credentials(token='test')
+    agent.service = build_service('gmail', 'v1', agent.credentials)
+
+    emails = agent.get_new_emails(HistorySync(str(tmp_path / 'sync_state.json')), on_triaged_out=agent.mark_as_read)
+    downloaded = {e['id'] for e in emails}
+
+    assert len(downloaded) < 20
+    assert all('UNREAD' not in m['labelIds'] for m in fake_api.messages.values() if m['id'] not in downloaded)
+
+
+def test_listing_unread_mail_writes_nothing(fake_api):
+    agent = GmailAgent()
+    agent.credentials = Credentials(token='test')
+    agent.service = build_service('gmail', 'v1', agent.credentials)
+    reported = []
+
+    emails = list(agent.iter_unread_emails(
+        on_triaged_out=lambda msg_id: reported.append((msg_id, threading.current_thread()))))
+
+    assert reported and len(emails) + len(reported) == 20
+    assert all(thread is threading.current_thread() for _, thread in reported)
+    assert all('UNREAD' in m['labelIds'] for m in fake_api.messages.values())
+
+
+def test_failed_flush_leaves_writes_pending(fake_api):
+    agent = GmailAgent(defer_writes=True)
+    agent.service = build_service('gmail', 'v1', Credentials(token='test'))
+    agent.modifications = ModifyBatcher(agent.service)
+    agent.mark_as_read(next(iter(fake_api.messages)))
+    fake_api.error_rate, fake_api.error_status = 1.0, 400
+
+    assert agent.flush_writes() == 0
+    assert agent.pending_writes() == 1
+
+
+def test_account_email_is_fetched_once_per_token(fake_api, tmp_path):
+    token_path = str(tmp_path / 'token.json')
+    for _ in range(2):
+        agent = GmailAgent(token_path=token_path)
+        agent.service = build_service('gmail', 'v1', Credentials(token='test'))
+        requests = fake_api.requests
+        assert agent.account_email()
+    assert fake_api.requests == requests
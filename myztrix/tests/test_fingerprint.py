@@ -0,0 +1,62 @@
+from fingerprint import FingerprintIndex, distance, email_fingerprint
+from thread_collapse import DECLINED, EVENT, NO_EVENT
+
+INVITE = {
+    'id': 'a1',
+    'subject': 'Quarterly planning review',
+    'body': ("Hi all,\n\nPlease join the quarterly planning review on Thursday June 12 at 3pm in room 4B. "
+             "We will go through the roadmap, the hiring plan and the budget for next quarter. "
+             "Bring your team's top three priorities.\n\nThanks,\nDana"),
+}
+FORWARD = {
+    'id': 'b7',
+    'subject': 'Fwd: Quarterly planning review',
+    'body': ("FYI, see below.\n\n---------- Forwarded message ---------\nFrom: Dana <dana@example.com>\n"
+             "Date: Mon, 9 Jun 2025 at 10:02\nSubject: Quarterly planning review\nTo: Team <team@example.com>\n\n"
+             + INVITE['body']),
+}
+OTHER = {
+    'id': 'c3',
+    'subject': 'Lunch order',
+    'body': 'What does everyone want from the sandwich place today? Orders by 11 please.',
+}
+
+
+def test_copies_are_close_and_unrelated_mail_is_not():
+    invite, forward, other = email_fingerprint(INVITE), email_fingerprint(FORWARD), email_fingerprint(OTHER)
+    assert distance(invite[0], forward[0]) <= 3 and invite[1] == forward[1]
+    assert distance(invite[0], other[0]) > 10
+
+
+def test_near_duplicate_inherits_the_decision():
+    index = FingerprintIndex()
+    assert index.lookup(INVITE) is None
+    index.record(INVITE, EVENT)
+    index.record(OTHER, NO_EVENT)
+
+    assert index.lookup(FORWARD) == EVENT
+    assert index.lookup(dict(OTHER, id='c4')) == NO_EVENT
+    assert index.lookup(dict(INVITE, body=INVITE['body'].replace('June 12', 'June 19'), id='d1')) is None
+
+
+def test_similarity_is_configurable():
+    moved = dict(INVITE, id='d1', body=INVITE['body'].replace('the roadmap', 'the product roadmap'))
+    strict = FingerprintIndex(max_distance=0)
+    strict.record(INVITE, EVENT)
+    loose = FingerprintIndex(max_distance=12)
+    loose.record(INVITE, EVENT)
+
+    assert strict.lookup(moved) is None
+    assert loose.lookup(moved) == EVENT
+
+
+def test_answers_override_and_persist(tmp_path):
+    path = str(tmp_path / 'fingerprints.json')
+    index = FingerprintIndex(path)
+    index.record(INVITE, EVENT)
+    index.record_answers({}, {'a1': {'title': INVITE['subject']}})
+    index.save()
+
+    restored = FingerprintIndex(path)
+    assert restored.lookup(FORWARD) == DECLINED
+    assert restored.stats == {'inherited_declined': 1}
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+import gmail_async
+from fake_google_api import FakeGoogleState
+from gmail_async import AsyncGmailClient, iter_emails
+from synthetic_mailbox import generate_mailbox
+
+
+@pytest.fixture
+def fake_api(fake_google):
+    return fake_google(FakeGoogleState(generate_mailbox(6)))
+
+
+def test_api_root_is_read_per_client(fake_api):
+    client = AsyncGmailClient(Credentials(token='test'))
+    assert client.api_root.startswith('http://127.0.0.1:')
+
+
+def test_emails_arrive_one_chunk_at_a_time(fake_api):
+    message_ids = list(fake_api.order)
+    emails = iter_emails(Credentials(token='test'), message_ids, chunk_size=4, triage_threshold=None)
+
+    first = next(emails)
+    requests = fake_api.requests
+    assert first['id'] == message_ids[0]
+    assert [e['id'] for e in emails] == message_ids[1:]
+    assert fake_api.requests == requests + 2
+
+
+def test_rate_limit_403_is_retried(fake_api, monkeypatch):
+    monkeypatch.setattr(gmail_async, 'backoff_delay', lambda attempt: 0)
+    fake_api.error_rate, fake_api.error_status, fake_api.error_reason = 0.3, 403, 'rateLimitExceeded'
+
+    emails = list(iter_emails(Credentials(token='test'), list(fake_api.order), triage_threshold=None))
+    assert len(emails) == 6
+
+
+def test_timeouts_are_retried(fake_api, monkeypatch):
+    monkeypatch.setattr(gmail_async, 'backoff_delay', lambda attempt: 0.4)
+    fake_api.latency = 0.5
+    threading.Timer(0.2, setattr, (fake_api, 'latency', 0.0)).start()
+
+    emails = list(iter_emails(Credentials(token='test'), list(fake_api.order)[:2], timeout=0.2,
+                              triage_threshold=None))
+    assert len(emails) == 2
+
+
+def test_stopping_early_closes_the_session(fake_api):
+    emails = iter_emails(Credentials(token='test'), list(fake_api.order), chunk_size=2, triage_threshold=None)
+    next(emails)
+    emails.close()
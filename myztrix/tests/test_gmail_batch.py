@@ -0,0 +1,75 @@
+import httplib2
+from googleapiclient.errors import HttpError
+
+from gmail_batch import batch_get_messages
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'')
+
+
+class FakeRequest:
+    def __init__(self, service, msg_id):
+        self.service = service
+        self.msg_id = msg_id
+
+    def execute(self):
+        self.service.single_calls.append(self.msg_id)
+        return {'id': self.msg_id, 'payload': {}}
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batch_sizes.append(len(self.requests))
+        for request_id, request in self.requests:
+            if request_id in self.service.flaky:
+                self.callback(request_id, None, http_error(500))
+            else:
+                self.callback(request_id, {'id': request.msg_id, 'payload': {}}, None)
+
+
+class FakeService:
+    def __init__(self, flaky=()):
+        self.flaky = set(flaky)
+        self.batch_sizes = []
+        self.single_calls = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, userId, id, format, **kwargs):
+        return FakeRequest(self, id)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def test_batches_are_chunked_and_ordered():
+    service = FakeService()
+    ids = [f"m{i}" for i in range(7)]
+
+    messages = batch_get_messages(service, ids, batch_size=3)
+
+    assert [m['id'] for m in messages] == ids
+    assert service.batch_sizes == [3, 3, 1]
+    assert service.single_calls == []
+
+
+def test_failed_sub_request_is_retried_alone():
+    service = FakeService(flaky={'m2'})
+
+    messages = batch_get_messages(service, ['m1', 'm2', 'm3'], batch_size=10)
+
+    assert [m['id'] for m in messages] == ['m1', 'm2', 'm3']
+    assert service.single_calls == ['m2']
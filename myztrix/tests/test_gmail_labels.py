@@ -0,0 +1,69 @@
+from gmail_labels import LabelRegistry, ModifyBatcher
+
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeService:
+    def __init__(self):
+        self.list_calls = 0
+        self.created = []
+        self.batch_bodies = []
+
+    def users(self):
+        return self
+
+    def labels(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId):
+        self.list_calls += 1
+        return Call({'labels': [{'name': 'Declined', 'id': 'Label_1'}]})
+
+    def create(self, userId, body):
+        self.created.append(body['name'])
+        return Call({'id': 'Label_2', 'name': body['name']})
+
+    def batchModify(self, userId, body):
+        self.batch_bodies.append(body)
+        return Call({})
+
+
+def test_label_ids_are_cached_until_invalidated():
+    service = FakeService()
+    labels = LabelRegistry(service)
+
+    assert labels.get_id('Declined') == 'Label_1'
+    assert labels.get_id('Declined') == 'Label_1'
+    assert labels.get_id('CalendarAdded') == 'Label_2'
+    assert labels.get_id('CalendarAdded') == 'Label_2'
+    assert service.list_calls == 1
+    assert service.created == ['CalendarAdded']
+
+    labels.invalidate()
+    labels.get_id('Declined')
+    assert service.list_calls == 2
+
+
+def test_changes_are_grouped_by_label_set():
+    service = FakeService()
+    batcher = ModifyBatcher(service)
+    for msg_id in ('a', 'b', 'c'):
+        batcher.add(msg_id, remove_label_ids=['UNREAD'])
+    batcher.add('c', add_label_ids=['Label_1'])
+
+    assert batcher.flush() == 3
+    assert len(batcher) == 0
+    bodies = sorted(service.batch_bodies, key=lambda body: len(body['ids']))
+    assert bodies == [
+        {'ids': ['c'], 'addLabelIds': ['Label_1'], 'removeLabelIds': ['UNREAD']},
+        {'ids': ['a', 'b'], 'addLabelIds': [], 'removeLabelIds': ['UNREAD']},
+    ]
@@ -0,0 +1,103 @@
+import httplib2
+from googleapiclient.errors import HttpError
+
+from gmail_sync import HistorySync
+
+
+class Call:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeService:
+    def __init__(self, history_result):
+        self.history_result = history_result
+        self.full_scans = 0
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return self
+
+    def getProfile(self, userId):
+        return Call({'historyId': '500'})
+
+    def list(self, userId, **kwargs):
+        if 'startHistoryId' in kwargs:
+            return Call(self.history_result)
+        self.full_scans += 1
+        return Call({'messages': [{'id': 'a'}, {'id': 'b'}]})
+
+
+def test_first_run_scans_then_commits_checkpoint(tmp_path):
+    sync = HistorySync(str(tmp_path / 'sync.json'))
+    service = FakeService({})
+
+    assert sync.list_new_message_ids(service) == ['a', 'b']
+    sync.commit()
+
+    assert HistorySync(str(tmp_path / 'sync.json')).history_id == '500'
+
+
+def test_history_lists_only_new_unread_messages(tmp_path):
+    sync = HistorySync(str(tmp_path / 'sync.json'))
+    sync.state['history_id'] = '400'
+    service = FakeService({
+        'historyId': '450',
+        'history': [
+            {'messagesAdded': [{'message': {'id': 'c', 'threadId': 't1', 'labelIds': ['INBOX', 'UNREAD']}}]},
+            {'messagesAdded': [{'message': {'id': 'd', 'labelIds': ['INBOX']}}]},
+        ],
+    })
+
+    assert sync.list_new_message_ids(service) == ['c']
+    assert sync.thread_ids == {'c': 't1'}
+    assert service.full_scans == 0
+    assert sync.pending_history_id == '450'
+
+
+def test_expired_history_falls_back_to_full_scan(tmp_path):
+    sync = HistorySync(str(tmp_path / 'sync.json'))
+    sync.state['history_id'] = '1'
+    service = FakeService(HttpError(httplib2.Response({'status': 404}), b''))
+
+    assert sync.list_new_message_ids(service) == ['a', 'b']
+    assert service.full_scans == 1
+
+
+def test_unprocessed_messages_are_listed_again(tmp_path):
+    sync = HistorySync(str(tmp_path / 'sync.json'))
+    sync.state['history_id'] = '400'
+    service = FakeService({
+        'historyId': '450',
+        'history': [{'messagesAdded': [{'message': {'id': 'c', 'threadId': 't1', 'labelIds': ['UNREAD']}}]}],
+    })
+    assert sync.list_new_message_ids(service) == ['c']
+    sync.commit(['c'])
+
+    resumed = HistorySync(str(tmp_path / 'sync.json'))
+    service.history_result = {'historyId': '460', 'history': []}
+    assert resumed.history_id == '450'
+    assert resumed.list_new_message_ids(service) == ['c']
+    assert resumed.thread_ids == {'c': 't1'}
+    resumed.commit()
+    assert HistorySync(str(tmp_path / 'sync.json')).list_new_message_ids(service) == []
+
+
+def test_retries_are_given_up_eventually(tmp_path):
+    sync = HistorySync(str(tmp_path / 'sync.json'))
+    sync.state['history_id'] = '400'
+    service = FakeService({'historyId': '450', 'history': []})
+    sync.state['retry'] = {'c': {'thread_id': None, 'attempts': 5}}
+    assert sync.list_new_message_ids(service) == ['c']
+    sync.commit(['c'])
+    assert sync.state['retry'] == {}
@@ -0,0 +1,56 @@
+import json
+import threading
+
+from google.oauth2.credentials import Credentials
+
+from google_services import ServiceContainer, discovery_document
+
+TOKEN = {'token': 'abc', 'refresh_token': 'r', 'client_id': 'id', 'client_secret': 's',
+         'token_uri': 'https://oauth2.googleapis.com/token', 'expiry': '2999-01-01T00:00:00Z'}
+
+
+def test_clients_are_shared_across_threads():
+    container = ServiceContainer()
+    credentials = Credentials(token='test')
+    gmail = container.gmail(credentials)
+    assert container.gmail(credentials) is gmail
+    assert container.calendar(credentials) is not gmail
+    assert container.gmail(Credentials(token='other')) is not gmail
+
+    transports = []
+    request = lambda: transports.append(gmail.users().messages().list(userId='me').http)
+    thread = threading.Thread(target=request)
+    thread.start()
+    thread.join()
+    request()
+    request()
+    assert transports[0] is not transports[1]
+    assert transports[1] is transports[2]
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(container.gmail(credentials)))
+    thread.start()
+    thread.join()
+    assert other[0] is gmail
+
+
+def test_discovery_documents_are_read_once():
+    assert discovery_document('gmail', 'v1') is discovery_document('gmail', 'v1')
+    assert json.loads(discovery_document('gmail', 'v1', 'http://localhost:1/'))['rootUrl'] == 'http://localhost:1/'
+
+
+def test_clients_do_not_share_a_document():
+    document = discovery_document('calendar', 'v3')
+    ServiceContainer().calendar(Credentials(token='test')).events().list(calendarId='primary')
+    assert discovery_document('calendar', 'v3') == document
+
+
+def test_token_file_is_read_once(tmp_path):
+    path = tmp_path / 'token.json'
+    path.write_text(json.dumps(TOKEN))
+    container = ServiceContainer()
+
+    credentials = container.credentials(path)
+    path.write_text('not json')
+    assert container.credentials(str(path)) is credentials
+    assert credentials.token == 'abc'
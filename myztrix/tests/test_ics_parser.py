@@ -0,0 +1,88 @@
+import base64
+from datetime import datetime, timezone
+
+from calendar_handler import create_event_payload
+from event_detector import detect_event
+from gmail_message import parse_message
+from ics_parser import parse_vevent
+
+INVITE = (
+    "BEGIN:VCALENDAR\r\n"
+    "METHOD:REQUEST\r\n"
+    "BEGIN:VEVENT\r\n"
+    "DTSTART:20250612T140000Z\r\n"
+    "DTEND:20250612T150000Z\r\n"
+    "SUMMARY:Quarterly planning\\, Q3\r\n"
+    "LOCATION:Room 4\r\n"
+    "DESCRIPTION:Agenda attached.\\nBring laptops.\r\n"
+    "UID:abc123@google.com\r\n"
+    "BEGIN:VALARM\r\n"
+    "DESCRIPTION:Reminder\r\n"
+    "END:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+def test_parse_vevent():
+    event = parse_vevent(INVITE)
+
+    assert event['title'] == 'Quarterly planning, Q3'
+    assert event['start_time'] == datetime(2025, 6, 12, 14, 0, tzinfo=timezone.utc)
+    assert event['end_time'] == datetime(2025, 6, 12, 15, 0, tzinfo=timezone.utc)
+    assert event['location'] == 'Room 4'
+    assert event['description'] == 'Agenda attached.\nBring laptops.'
+    assert event['uid'] == 'abc123@google.com'
+
+
+def test_folded_lines_and_duration():
+    event = parse_vevent("BEGIN:VEVENT\nDTSTART:20250612T090000\nDURATION:PT30M\nSUMMARY:Stand\n up\nEND:VEVENT\n")
+
+    assert event['title'] == 'Standup'
+    assert event['end_time'] == datetime(2025, 6, 12, 9, 30)
+
+
+def test_invite_part_reaches_email_dict():
+    data = base64.urlsafe_b64encode(INVITE.encode()).decode()
+    msg = {
+        'id': 'm1',
+        'payload': {
+            'mimeType': 'multipart/mixed',
+            'headers': [{'name': 'Subject', 'value': 'Invitation: Quarterly planning'}],
+            'parts': [
+                {'mimeType': 'text/plain', 'body': {'data': base64.urlsafe_b64encode(b'Join us').decode()}},
+                {'mimeType': 'text/calendar', 'filename': 'invite.ics', 'body': {'data': data}},
+            ],
+        },
+    }
+
+    email = parse_message(msg)
+
+    assert email['body'] == 'Join us'
+    assert email['calendar_event']['uid'] == 'abc123@google.com'
+
+
+def _invite(method='REQUEST', event_lines=''):
+    return INVITE.replace('METHOD:REQUEST', f'METHOD:{method}').replace('UID:', event_lines + 'UID:')
+
+
+def test_cancellations_and_replies_are_not_events():
+    assert parse_vevent(INVITE)['actionable']
+    assert not parse_vevent(_invite('CANCEL'))['actionable']
+    assert not parse_vevent(_invite('REPLY'))['actionable']
+    assert not parse_vevent(_invite(event_lines='STATUS:CANCELLED\r\n'))['actionable']
+
+    email = {'id': 'm1', 'subject': 'Canceled: Quarterly planning', 'body': '',
+             'calendar_event': parse_vevent(_invite('CANCEL'))}
+    assert detect_event(email) == (False, 0.0, None)
+
+
+def test_all_day_and_windows_zones():
+    all_day = parse_vevent("BEGIN:VEVENT\nDTSTART;VALUE=DATE:20250612\nSUMMARY:Offsite\nEND:VEVENT\n")
+    assert all_day['all_day'] and all_day['end_time'] == datetime(2025, 6, 13)
+    payload = create_event_payload('Offsite', '', all_day['start_time'], end_date=all_day['end_time'], all_day=True)
+    assert payload['start'] == {'date': '2025-06-12'} and payload['end'] == {'date': '2025-06-13'}
+
+    outlook = parse_vevent("BEGIN:VEVENT\nDTSTART;TZID=South Africa Standard Time:20250612T090000\nEND:VEVENT\n")
+    assert outlook['timezone'] == 'Africa/Johannesburg'
+    assert outlook['start_time'].utcoffset().total_seconds() == 2 * 3600
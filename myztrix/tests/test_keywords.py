@@ -0,0 +1,27 @@
+from keywords import KeywordMatcher, TRIGGERS, matcher_for
+
+
+def test_hits_carry_positions_and_weights():
+    matcher = KeywordMatcher({'meeting': 1.0, 'call': 0.5})
+    hits = matcher.hits('Meeting first, then two calls.')
+
+    assert [(h.keyword, h.start, h.weight) for h in hits] == [('meeting', 0, 1.0), ('call', 24, 0.5)]
+    assert matcher.score('Meeting first, then two calls.') == 1.5
+
+
+def test_word_boundaries_and_inflections():
+    matcher = KeywordMatcher(['call', 'invite', 'invitation', 'event'])
+
+    assert not matcher.search('Please recall the preventive steps')
+    assert matcher.distinct('You are invited. Invitation attached, see the events page') == \
+        {'invite', 'invitation', 'event'}
+
+
+def test_matching_lines_is_one_pass_over_the_text():
+    text = 'Hi\nMeeting on Friday\r\nnothing here\nflight at 6am, another flight later\nbye'
+    assert TRIGGERS.matching_lines(text) == ['Meeting on Friday', 'flight at 6am, another flight later']
+
+
+def test_matchers_are_compiled_once_per_keyword_set():
+    assert matcher_for({'meeting', 'call'}) is matcher_for(['call', 'meeting'])
+    assert matcher_for(TRIGGERS) is TRIGGERS
@@ -0,0 +1,43 @@
+import base64
+
+from mime_walker import decode_part, extract_text, iter_parts
+
+
+def encoded(text):
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def part(mime, text, filename=''):
+    return {'mimeType': mime, 'filename': filename, 'body': {'data': encoded(text)}}
+
+
+def test_nested_alternative_prefers_plain_text():
+    payload = {
+        'mimeType': 'multipart/mixed',
+        'parts': [
+            {
+                'mimeType': 'multipart/alternative',
+                'parts': [
+                    part('text/html', '<p>Meeting <b>Friday</b></p>'),
+                    part('text/plain', 'Meeting Friday at 10 AM'),
+                ],
+            },
+            part('application/pdf', 'binary', filename='agenda.pdf'),
+        ],
+    }
+
+    assert extract_text(payload) == 'Meeting Friday at 10 AM'
+    assert [p['mimeType'] for p in iter_parts(payload)] == ['text/html', 'text/plain', 'application/pdf']
+
+
+def test_html_only_body_is_stripped():
+    payload = {'mimeType': 'multipart/alternative', 'parts': [part('text/html', '<div>Call <i>tomorrow</i></div>')]}
+
+    assert extract_text(payload) == 'Call tomorrow'
+
+
+def test_decoding_is_capped():
+    body = decode_part(part('text/plain', 'x' * 1000), max_bytes=10)
+
+    assert isinstance(body, memoryview)
+    assert bytes(body) == b'x' * 10
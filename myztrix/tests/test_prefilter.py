@@ -0,0 +1,73 @@
+from prefilter import PreFilter, features, model_path
+
+MEETING = {'title': 'Project sync', 'sender': 'Alice <alice@work.example>',
+           'description': 'Can we meet Thursday at 3pm to review the plan?'}
+NEWSLETTER = {'title': 'Weekly deals', 'sender': 'Shop <deals@shop.example>',
+              'description': 'Save 20% on everything this week only'}
+
+
+def _trained(mode, **kwargs):
+    prefilter = PreFilter(mode=mode, min_examples=10, **kwargs)
+    for round_ in range(20):
+        prefilter.learn_decisions({f'm{round_}': MEETING}, {f'n{round_}': NEWSLETTER})
+    return prefilter
+
+
+def _email(details, email_id):
+    return {'id': email_id, 'subject': details['title'], 'sender': details['sender'], 'body': details['description']}
+
+
+def test_features_are_stable_hashes():
+    first = features('Project sync', 'alice@work.example', 'meet Thursday')
+    assert first == features('project SYNC', 'Alice@Work.example', 'meet thursday')
+    assert first != features('Project sync', 'bob@work.example', 'meet Thursday')
+
+
+def test_decisions_are_learned_once():
+    prefilter = PreFilter(mode='shadow')
+    assert prefilter.learn_decisions({'a': MEETING}, {'b': NEWSLETTER}) == 2
+    assert prefilter.learn_decisions({'a': MEETING}, {'b': NEWSLETTER}) == 0
+    assert prefilter.learn_decisions([], {}) == 0
+
+
+def test_learns_confirmations_from_declines():
+    prefilter = _trained('shadow')
+    assert prefilter.score(_email(MEETING, 'x')) > 0.9
+    assert prefilter.score(_email(NEWSLETTER, 'y')) < 0.05
+
+
+def test_shadow_mode_reports_without_skipping():
+    prefilter = _trained('shadow', threshold=0.5)
+    newsletter, meeting = _email(NEWSLETTER, 'y'), _email(MEETING, 'x')
+    assert prefilter.admit(newsletter) and prefilter.admit(meeting)
+    prefilter.observe(newsletter, is_event=True)
+    prefilter.observe(meeting, is_event=True)
+    assert prefilter.report()['would_skip'] == 1
+    assert prefilter.report()['would_miss'] == 1
+
+
+def test_on_mode_gates_only_once_trusted():
+    assert PreFilter(mode='on').admit(_email(NEWSLETTER, 'y'))
+    prefilter = _trained('on')
+    assert not prefilter.admit(_email(NEWSLETTER, 'y'))
+    assert prefilter.admit(_email(MEETING, 'x'))
+
+
+def test_model_persists_per_user(tmp_path):
+    path = model_path('Me+work@Example.com', str(tmp_path))
+    assert path.endswith('me_work_example.com.json')
+    prefilter = _trained('shadow', path=path)
+    prefilter.save()
+
+    restored = PreFilter(path=path, mode='shadow')
+    assert restored.examples == prefilter.examples
+    assert abs(restored.score(_email(MEETING, 'x')) - prefilter.score(_email(MEETING, 'x'))) < 1e-4
+    assert restored.learn_decisions({'m0': MEETING}, {}) == 0
+
+
+def test_detector_verdicts_are_not_learned():
+    prefilter = PreFilter(mode='shadow', min_examples=1)
+    for index in range(5):
+        prefilter.observe(_email(NEWSLETTER, f'n{index}'), is_event=False)
+    assert prefilter.examples == 0 and not prefilter.trusted
+    assert prefilter.score(_email(NEWSLETTER, 'y')) == 0.5
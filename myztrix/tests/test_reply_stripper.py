@@ -0,0 +1,56 @@
+from reply_stripper import clean_body, stats, strip_quoted
+
+GMAIL_REPLY = (
+    "Can we meet tomorrow at 2 PM?\n\nThanks\n\n"
+    "On Tue, 3 Jun 2025 at 09:12, Someone <someone@example.com> wrote:\n"
+    + "> Earlier message about a meeting on May 2nd at 4 PM.\n" * 20
+)
+OUTLOOK_REPLY = (
+    "Let's do Friday.\n\n________________________________\n"
+    "From: Alice <alice@example.com>\nSent: Monday, June 2, 2025 9:00 AM\n"
+    "To: Bob\nSubject: Meeting\n\nCould we meet Thursday at 4pm?"
+)
+
+
+def test_reply_history_is_removed():
+    text, removed = strip_quoted(GMAIL_REPLY)
+    assert text == "Can we meet tomorrow at 2 PM?\n\nThanks"
+    assert removed == len(GMAIL_REPLY.encode('utf-8')) - len(text.encode('utf-8'))
+    assert strip_quoted(OUTLOOK_REPLY)[0] == "Let's do Friday."
+
+
+def test_wrapped_header_without_quote_markers_ends_the_message():
+    text = "Sounds good.\n\nOn Tue, 3 Jun 2025 at 09:12, Someone <someone@example.com>\nwrote:\nOld text, May 2nd"
+    assert strip_quoted(text)[0] == 'Sounds good.'
+
+
+def test_interleaved_replies_keep_new_text():
+    text = "On Mon, Alice wrote:\n> Can you do Friday?\nYes, Friday at 10 works.\n> And the room?\nRoom 4."
+    assert strip_quoted(text)[0] == 'Yes, Friday at 10 works.\nRoom 4.'
+
+
+def test_signatures_and_disclaimers():
+    assert strip_quoted("Moved to 3pm.\n\nBob\n-- \nBob Smith\n555-1234")[0] == 'Moved to 3pm.\n\nBob'
+    assert strip_quoted("Ok see you then\n\nSent from my iPhone")[0] == 'Ok see you then'
+    assert strip_quoted(
+        "Agenda below.\n\nThis email and any attachments are confidential and intended solely for the addressee."
+    )[0] == 'Agenda below.'
+
+
+def test_disclaimer_wording_in_the_body_is_kept():
+    text = "This email is intended for the whole team: offsite meeting June 12 at 3pm.\nThanks"
+    assert strip_quoted(text) == (text, 0)
+    text = "Hi all,\n\nThis email is intended for the whole team: offsite June 12.\n" + "Details.\n" * 20 + "Thanks"
+    assert strip_quoted(text) == (text, 0)
+
+
+def test_forwarded_messages_are_kept():
+    text = ("---------- Forwarded message ---------\nFrom: Airline <x@example.com>\nDate: Mon, 2 Jun 2025\n"
+            "Subject: Flight\n\nYour flight departs Friday at 6am")
+    assert strip_quoted(text) == (text, 0)
+
+
+def test_clean_body_records_savings():
+    before = stats['bytes_removed']
+    assert clean_body(GMAIL_REPLY).startswith('Can we meet')
+    assert stats['bytes_removed'] - before == strip_quoted(GMAIL_REPLY)[1]
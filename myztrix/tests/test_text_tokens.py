@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import text_tokens
+from text_tokens import STOPWORDS, content_tokens, stopword_set, tokenize
+
+
+def test_builtin_tokenizer():
+    assert tokenize("Can't we MEET at 10:30, Bob's office?") == \
+        ["can't", 'we', 'meet', 'at', '10', '30', "bob's", 'office']
+    assert content_tokens('Can we have a meeting about the roadmap?') == ['meeting', 'roadmap']
+
+
+def test_stopwords_do_not_need_nltk(monkeypatch):
+    monkeypatch.delenv('MYZTRIX_TOKENIZER', raising=False)
+    assert stopword_set() is STOPWORDS
+    assert {'the', 'and', "don't"} <= STOPWORDS
+    assert 'meeting' not in STOPWORDS
+
+
+def test_detection_modules_do_not_import_nltk():
+    # A fresh interpreter, since anything imported earlier in the session may have loaded nltk
+    backend = os.path.dirname(text_tokens.__file__)
+    script = "import sys, gmail_agent, keywords; sys.exit('nltk' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', script], cwd=backend).returncode == 0
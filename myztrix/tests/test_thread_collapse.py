@@ -0,0 +1,43 @@
+from thread_collapse import CONFIRMED, DECLINED, EVENT, NO_EVENT, ThreadDecisions, collapse_threads
+
+THREADS = {'00a1': 't1', '00a5': 't1', '00a3': 't1', '00b2': 't2', '00c4': 't3'}
+
+
+def test_only_newest_message_per_thread_is_kept():
+    kept, superseded = collapse_threads(['00a1', '00a5', '00b2', '00a3', 'ffff'], THREADS)
+    assert kept == ['00a5', '00b2', 'ffff']
+    assert sorted(superseded) == ['00a1', '00a3']
+
+
+def test_declined_threads_are_skipped_without_download(tmp_path):
+    threads = ThreadDecisions(str(tmp_path / 'threads.json'))
+    threads.record_answers({}, {'00c0': {'thread_id': 't3', 'start_time': '2025-06-06T10:00:00'}})
+
+    to_fetch, skipped = threads.filter(['00a1', '00a5', '00b2', '00c4'], THREADS)
+    assert to_fetch == ['00a5', '00b2']
+    assert skipped == ['00a1', '00c4']
+    assert threads.stats == {'superseded': 1, 'declined_threads': 1}
+
+
+def test_user_answers_survive_later_detections(tmp_path):
+    path = str(tmp_path / 'threads.json')
+    threads = ThreadDecisions(path)
+    threads.record_answers({'00a1': {'thread_id': 't1', 'start_time': '2025-06-06T10:00:00'}}, {})
+    threads.record('t1', NO_EVENT, '00a5')
+    threads.record('t2', EVENT, '00b2', '2025-06-07T09:00:00')
+    threads.save()
+
+    restored = ThreadDecisions(path)
+    assert restored.decision('t1') == CONFIRMED
+    assert restored.decision('t2') == EVENT
+    assert restored.decision('t3') is None
+    assert restored.decision(None) is None
+
+
+def test_same_event_in_a_thread_is_a_duplicate(tmp_path):
+    threads = ThreadDecisions(str(tmp_path / 'threads.json'))
+    threads.record('t2', EVENT, '00b2', '2025-06-07T09:00:00')
+    assert threads.is_duplicate('t2', '2025-06-07T09:00:00')
+    assert not threads.is_duplicate('t2', '2025-06-08T09:00:00')
+    threads.record('t2', DECLINED, '00b3')
+    assert not threads.is_duplicate('t2', '2025-06-07T09:00:00')